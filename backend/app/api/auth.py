@@ -1,24 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+from typing import List
 from app.db.database import get_db
 from app.models.user import User
-from app.api.schemas import UserCreate, UserResponse, Token, PasswordResetRequest, PasswordReset
-from app.core.security import get_password_hash, verify_password, create_access_token, decode_access_token
+from app.models.api_key import ApiKey
+from app.api.schemas import (
+    UserCreate, UserResponse, Token, PasswordResetRequest, PasswordReset,
+    ApiKeyCreate, ApiKeyResponse, ApiKeyCreated
+)
+from app.api.deps import get_current_active_user, API_KEY_SCOPES
+from app.core.security import (
+    get_password_hash, verify_password, create_access_token, decode_access_token,
+    generate_api_key, hash_api_key
+)
 from app.core.config import settings
+from app.core.invalidation import invalidate
+from app.core.throttle import account_key, login_throttle, get_client_ip
 from app.services.email import EmailService
+from app.services.outbox import enqueue_email, outbox_sender
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     # Check if user already exists
-    db_user = db.query(User).filter(
-        (User.email == user.email) | (User.username == user.username)
-    ).first()
+    result = await db.execute(
+        select(User).where((User.email == user.email) | (User.username == user.username))
+    )
+    db_user = result.scalars().first()
     
     if db_user:
         raise HTTPException(
@@ -26,8 +42,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Email or username already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user (bcrypt runs off the event loop)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -36,24 +52,46 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login and get an access token."""
+    client_ip = get_client_ip(request)
+    
     # Find user by username or email
-    user = db.query(User).filter(
-        (User.username == form_data.username) | (User.email == form_data.username)
-    ).first()
+    result = await db.execute(
+        select(User).where((User.username == form_data.username) | (User.email == form_data.username))
+    )
+    user = result.scalars().first()
+    # Throttle per account, whichever name it was addressed by
+    account = account_key(form_data.username, user.id if user else None)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Reject throttled attempts before doing any password hashing
+    retry_after = await login_throttle.retry_after(db, account, client_ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Try again later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    password_ok = False
+    if user:
+        started = time.perf_counter()
+        password_ok = await run_in_threadpool(verify_password, form_data.password, user.hashed_password)
+        login_throttle.observe_verify(time.perf_counter() - started)
+    
+    if not password_ok:
+        await login_throttle.record_failure(db, account, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -66,6 +104,8 @@ def login(
             detail="Inactive user"
         )
     
+    await login_throttle.record_success(db, account)
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -77,12 +117,13 @@ def login(
 
 
 @router.post("/password-reset-request", status_code=status.HTTP_200_OK)
-def request_password_reset(
+async def request_password_reset(
     request: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Request a password reset email."""
-    user = db.query(User).filter(User.email == request.email).first()
+    result = await db.execute(select(User).where(User.email == request.email))
+    user = result.scalars().first()
     
     if not user:
         # Don't reveal if user exists or not
@@ -94,20 +135,19 @@ def request_password_reset(
         expires_delta=timedelta(minutes=30)
     )
     
-    # Send email
-    email_sent = EmailService.send_password_reset_email(user.email, reset_token)
-    
-    if not email_sent:
-        # Still return success to not reveal if email exists
-        pass
+    # Queue the email; the outbox sender delivers it in the background
+    subject, text, html = EmailService.password_reset_email(reset_token)
+    enqueue_email(db, user.email, subject, text, html)
+    await db.commit()
+    outbox_sender.notify()
     
     return {"message": "If the email exists, a password reset link has been sent"}
 
 
 @router.post("/password-reset", status_code=status.HTTP_200_OK)
-def reset_password(
+async def reset_password(
     reset_data: PasswordReset,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Reset password using the token from email."""
     # Decode token
@@ -127,7 +167,8 @@ def reset_password(
         )
     
     # Find user and update password
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -135,7 +176,91 @@ def reset_password(
         )
     
     # Update password
-    user.hashed_password = get_password_hash(reset_data.new_password)
-    db.commit()
+    user.hashed_password = await run_in_threadpool(get_password_hash, reset_data.new_password)
+    await db.commit()
+    await invalidate(db, f"user:{user.username}")
     
     return {"message": "Password reset successfully"}
+
+
+def _api_key_response(api_key: ApiKey) -> dict:
+    return {
+        "id": api_key.id,
+        "name": api_key.name,
+        "prefix": api_key.prefix,
+        "scopes": api_key.scopes.split(","),
+        "created_at": api_key.created_at,
+    }
+
+
+@router.post("/api-keys", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_api_key(
+    key_data: ApiKeyCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create an API key for the current user. The key is only returned once."""
+    scopes = sorted(set(key_data.scopes))
+    invalid = [scope for scope in scopes if scope not in API_KEY_SCOPES]
+    if not scopes or invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid scopes: {', '.join(invalid) or 'none given'}"
+        )
+    
+    key = generate_api_key()
+    db_key = ApiKey(
+        user_id=current_user.id,
+        name=key_data.name,
+        prefix=key[:10],
+        key_hash=hash_api_key(key),
+        scopes=",".join(scopes)
+    )
+    
+    db.add(db_key)
+    await db.commit()
+    await db.refresh(db_key)
+    
+    return {**_api_key_response(db_key), "key": key}
+
+
+@router.get("/api-keys", response_model=List[ApiKeyResponse])
+async def list_api_keys(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """List the current user's API keys."""
+    result = await db.execute(
+        select(ApiKey).where(ApiKey.user_id == current_user.id).order_by(ApiKey.id)
+    )
+    keys = result.scalars().all()
+    return [_api_key_response(key) for key in keys]
+
+
+@router.delete("/api-keys/{key_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_api_key(
+    key_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Revoke (delete) an API key."""
+    result = await db.execute(
+        select(ApiKey).where(
+            ApiKey.id == key_id,
+            ApiKey.user_id == current_user.id
+        )
+    )
+    db_key = result.scalars().first()
+    
+    if not db_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key not found"
+        )
+    
+    key_hash = db_key.key_hash
+    await db.delete(db_key)
+    await db.commit()
+    await invalidate(db, f"apikey:{key_hash}")
+    
+    return None
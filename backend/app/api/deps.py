@@ -1,43 +1,153 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from typing import Callable, FrozenSet, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, APIKeyHeader
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_read_db
 from app.models.user import User
-from app.core.security import decode_access_token
+from app.models.api_key import ApiKey
+from app.core.config import settings
+from app.core import tracing
+from app.core.cache import Cache
+from app.core.security import decode_access_token, hash_api_key, verify_api_key_hash
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Scopes that can be granted to API keys
+API_KEY_SCOPES = frozenset({"read", "track"})
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user from JWT token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+
+# Verified API keys by key hash; shared by all workers with a shared CACHE_BACKEND
+api_key_cache = Cache("apikey", max_entries=settings.API_KEY_CACHE_SIZE)
+# Users resolved from JWT subjects, by username; evicted on every worker by app.core.invalidation
+user_cache = Cache("user", max_entries=settings.USER_CACHE_SIZE)
+
+
+async def _authenticate_api_key(db: AsyncSession, api_key: str) -> Optional[Tuple[User, FrozenSet[str]]]:
+    """Resolve an API key to its user and scopes, using the cache when possible."""
+    key_hash = hash_api_key(api_key)
+    principal = await api_key_cache.get(key_hash)
+
+    if principal is None:
+        result = await db.execute(
+            select(ApiKey, User).join(User, ApiKey.user_id == User.id).where(ApiKey.key_hash == key_hash)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        db_key, db_user = row
+        principal = {
+            "key_hash": db_key.key_hash,
+            "scopes": db_key.scopes.split(","),
+            "user_id": db_user.id,
+            "username": db_user.username,
+            "email": db_user.email,
+            "is_active": db_user.is_active,
+        }
+        await api_key_cache.set(key_hash, principal, settings.API_KEY_CACHE_TTL_SECONDS)
+
+    if not verify_api_key_hash(api_key, principal["key_hash"]):
+        return None
+
+    # Detached user snapshot; routes only need its identity and status
+    user = User(
+        id=principal["user_id"],
+        username=principal["username"],
+        email=principal["email"],
+        is_active=principal["is_active"],
     )
-    
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-    
-    return user
-
-
-def get_current_active_user(
+    return user, frozenset(principal["scopes"])
+
+
+async def get_current_user(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    api_key: Optional[str] = Depends(api_key_header),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """Get the current authenticated user from a JWT token or an API key."""
+    with tracing.span("auth.get_current_user") as span:
+        credentials_exception = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+        if api_key:
+            authenticated = await _authenticate_api_key(db, api_key)
+            if authenticated is None:
+                raise credentials_exception
+            user, scopes = authenticated
+            request.state.api_key_scopes = scopes
+            if span is not None:
+                span.set_attribute("auth.method", "api_key")
+            return user
+
+        if not token:
+            raise credentials_exception
+
+        payload = decode_access_token(token)
+        if payload is None:
+            raise credentials_exception
+
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+
+        cached = await user_cache.get(username)
+        if cached is None:
+            result = await db.execute(select(User).where(User.username == username))
+            db_user = result.scalars().first()
+            if db_user is None:
+                raise credentials_exception
+            cached = {
+                "id": db_user.id,
+                "username": db_user.username,
+                "email": db_user.email,
+                "is_active": db_user.is_active,
+            }
+            if settings.USER_CACHE_TTL_SECONDS > 0:
+                await user_cache.set(username, cached, settings.USER_CACHE_TTL_SECONDS)
+        # Detached user snapshot, as for API keys
+        user = User(**cached)
+
+        # Interactive (JWT) sessions are not scope-restricted
+        request.state.api_key_scopes = None
+        if span is not None:
+            span.set_attribute("auth.method", "jwt")
+        return user
+
+
+async def get_current_active_user(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ) -> User:
-    """Get the current active user."""
+    """Get the current active user authenticated with a JWT token."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if getattr(request.state, "api_key_scopes", None) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API keys are not allowed for this operation"
+        )
     return current_user
+
+
+def require_scope(scope: str) -> Callable[..., User]:
+    """Build a dependency accepting JWT users or API keys granted ``scope``."""
+    async def dependency(
+        request: Request,
+        current_user: User = Depends(get_current_user)
+    ) -> User:
+        if not current_user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        scopes = getattr(request.state, "api_key_scopes", None)
+        if scopes is not None and scope not in scopes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"API key lacks the '{scope}' scope"
+            )
+        return current_user
+
+    return dependency
@@ -1,37 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-import json
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import orjson
+from app.core.compression import StaticPayload
+from app.db.database import get_db, get_read_db, get_sessionmaker, replica_router
 from app.models.user import User
 from app.models.package import Package
-from app.api.schemas import PackageCreate, PackageResponse, PackageUpdate, TrackingInfo, CarrierInfo
-from app.api.deps import get_current_active_user
+from app.api.schemas import (
+    PackageCreate, PackageResponse, PackageUpdate, TrackingInfo, CarrierInfo, ImportReport,
+    PackageFilter, BulkPackageUpdate, BulkResult
+)
+from app.api.deps import get_current_active_user, require_scope
+from app.api.serializers import (
+    FastJSONResponse, ORJSON_OPTIONS, PACKAGE_COLUMNS, PACKAGE_FIELDS, package_rows_json, tracking_info_json
+)
 from app.strategies import keydelivery
-from app.data.carriers import CARRIERS
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import invalidate
+from app.services import package_export, package_import, tracking
 
 router = APIRouter()
 
+# Encoded package detail responses by package id. Every write to a package
+# calls invalidate("package:<id>") after committing, which evicts it here and,
+# over LISTEN/NOTIFY, in every other worker.
+package_cache = Cache("package", max_entries=settings.PACKAGE_CACHE_SIZE)
+
+
+# The carrier catalog (900+ entries) is loaded on first use, not at import
+@lru_cache(maxsize=None)
+def supported_carriers() -> frozenset:
+    """Carrier ids as a set for O(1) validation."""
+    from app.data.carriers import CARRIERS
+
+    return frozenset(carrier_id for carrier_id, _ in CARRIERS)
+
+
+@lru_cache(maxsize=None)
+def carriers_payload() -> StaticPayload:
+    """The carriers response never changes: encode it once, compressed variants on first use."""
+    from app.data.carriers import CARRIERS
+
+    return StaticPayload(orjson.dumps({"carriers": [carrier_id for carrier_id, _ in CARRIERS]}))
+
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
 
 @router.get("/carriers", response_model=CarrierInfo)
-def get_supported_carriers():
+async def get_supported_carriers(request: Request):
     """Get list of supported carriers with IDs and names."""
-    carrier_ids = [carrier_id for carrier_id, _ in CARRIERS]
-    return {"carriers": carrier_ids}
+    return carriers_payload().response(request.headers.get("accept-encoding"))
 
 
 @router.post("/", response_model=PackageResponse, status_code=status.HTTP_201_CREATED)
-def create_package(
+async def create_package(
     package: PackageCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Add a new package to track."""
     # Validate carrier is supported
     carrier_lower = package.carrier.lower()
-    supported_carriers = [carrier_id for carrier_id, _ in CARRIERS]
     
-    if carrier_lower != "auto" and carrier_lower not in supported_carriers:
+    if carrier_lower != "auto" and carrier_lower not in supported_carriers():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Unsupported carrier: {package.carrier}"
@@ -53,60 +96,250 @@ def create_package(
     )
     
     db.add(db_package)
-    db.commit()
-    db.refresh(db_package)
+    await db.commit()
+    await db.refresh(db_package)
     
     return db_package
 
 
+def _detect_import_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in IMPORT_CONTENT_TYPES:
+        return IMPORT_CONTENT_TYPES[media_type]
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension == "csv":
+            return "csv"
+        if extension in ("ndjson", "jsonl"):
+            return "ndjson"
+    return None
+
+
+@router.post("/import", response_model=ImportReport)
+async def import_packages(
+    request: Request,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Bulk-import packages from a CSV or NDJSON upload.
+    
+    Send the file as the raw request body (Content-Type ``text/csv`` or
+    ``application/x-ndjson``) or as a multipart form field named ``file``.
+    Returns a per-row report; rows already tracked by the user are reported
+    as duplicates instead of failing the import.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        # Streamed like the raw body: the file is parsed as its parts arrive
+        upload = package_import.MultipartFile(request.stream(), content_type)
+        try:
+            found = await upload.open()
+        except package_import.ImportFormatError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Multipart upload must include a 'file' field"
+            )
+        import_format = format or _detect_import_format(upload.content_type, upload.filename)
+        chunks = upload.chunks()
+    else:
+        import_format = format or _detect_import_format(content_type)
+        chunks = request.stream()
+    
+    if import_format not in ("csv", "ndjson"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported import format; use CSV or NDJSON"
+        )
+    
+    lines = package_import.iter_lines(chunks)
+    if import_format == "csv":
+        records = package_import.iter_csv_records(lines)
+    else:
+        records = package_import.iter_ndjson_records(lines)
+    
+    try:
+        return await package_import.import_packages(db, current_user.id, records, supported_carriers())
+    except package_import.ImportFormatError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _bulk_conditions(package_filter: PackageFilter, user_id: int) -> list:
+    """Translate a bulk filter into WHERE conditions scoped to the user."""
+    conditions = []
+    if package_filter.ids is not None:
+        conditions.append(Package.id.in_(package_filter.ids))
+    if package_filter.status is not None:
+        conditions.append(Package.status == package_filter.status)
+    if package_filter.carrier is not None:
+        conditions.append(Package.carrier == package_filter.carrier.lower())
+    if package_filter.older_than_days is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=package_filter.older_than_days)
+        conditions.append(Package.created_at < cutoff)
+    
+    # Refuse to touch every package just because the filter was left empty
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one filter is required"
+        )
+    
+    return [Package.user_id == user_id, *conditions]
+
+
+@router.post("/bulk-update", response_model=BulkResult)
+async def bulk_update_packages(
+    bulk_update: BulkPackageUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Update every matching package with a single UPDATE statement."""
+    values = {}
+    if bulk_update.description is not None:
+        values["description"] = bulk_update.description
+    if bulk_update.carrier is not None:
+        carrier_lower = bulk_update.carrier.lower()
+        if carrier_lower != "auto" and carrier_lower not in supported_carriers():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported carrier: {bulk_update.carrier}"
+            )
+        values["carrier"] = carrier_lower
+    
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to update"
+        )
+    
+    result = await db.execute(
+        update(Package)
+        .where(*_bulk_conditions(bulk_update.filter, current_user.id))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate(db, "package:*")
+    
+    return {"affected": result.rowcount}
+
+
+@router.post("/bulk-delete", response_model=BulkResult)
+async def bulk_delete_packages(
+    package_filter: PackageFilter,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Delete every matching package with a single DELETE statement."""
+    result = await db.execute(
+        delete(Package)
+        .where(*_bulk_conditions(package_filter, current_user.id))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await invalidate(db, "package:*")
+    
+    return {"affected": result.rowcount}
+
+
 @router.get("/", response_model=List[PackageResponse])
-def list_packages(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+async def list_packages(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(require_scope("read")),
     skip: int = 0,
     limit: int = 100
 ):
-    """List all packages for the current user."""
-    packages = db.query(Package).filter(
-        Package.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    """List all packages for the current user, newest first."""
+    # A stable order keeps skip/limit pages consistent; served by idx_packages_user_created
+    # Plain row tuples encoded straight to JSON: no ORM objects or per-row model validation
+    result = await db.execute(
+        select(*PACKAGE_COLUMNS).where(
+            Package.user_id == current_user.id
+        ).order_by(Package.created_at.desc(), Package.id.desc()).offset(skip).limit(limit)
+    )
+    
+    return FastJSONResponse(package_rows_json(result.all()))
+
+
+@router.get("/export")
+async def export_packages(
+    request: Request,
+    format: str = "ndjson",
+    package_status: Optional[str] = Query(default=None, alias="status"),
+    sessionmaker: async_sessionmaker = Depends(get_sessionmaker),
+    current_user: User = Depends(require_scope("read"))
+):
+    """Stream all of the user's packages, including tracking data, as NDJSON or CSV."""
+    if format not in package_export.EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported export format; use ndjson or csv"
+        )
     
-    return packages
+    # Exports are long reads: prefer a replica, opened by the stream itself so
+    # the session cannot outlive it (e.g. when the client goes away first)
+    return StreamingResponse(
+        package_export.export_packages(
+            sessionmaker, current_user.id, format, package_status,
+            read_session=lambda: replica_router.read_session(request),
+        ),
+        media_type=package_export.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="packages.{format}"'}
+    )
 
 
 @router.get("/{package_id}", response_model=PackageResponse)
-def get_package(
+async def get_package(
     package_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_scope("read"))
 ):
     """Get a specific package."""
-    package = db.query(Package).filter(
-        Package.id == package_id,
-        Package.user_id == current_user.id
-    ).first()
+    # Misses read the primary (a replica may still have the row we just
+    # evicted), and a write committed during the read cancels the set
+    generation = package_cache.generation(str(package_id))
+    cached = await package_cache.get(str(package_id))
+    if cached is None:
+        result = await db.execute(select(*PACKAGE_COLUMNS).where(Package.id == package_id))
+        row = result.first()
+        if row is not None:
+            body = orjson.dumps(dict(zip(PACKAGE_FIELDS, row)), option=ORJSON_OPTIONS)
+            cached = {"user_id": row.user_id, "body": body.decode()}
+            if settings.PACKAGE_CACHE_TTL_SECONDS > 0:
+                await package_cache.set(
+                    str(package_id), cached, settings.PACKAGE_CACHE_TTL_SECONDS, generation=generation
+                )
     
-    if not package:
+    if cached is None or cached["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Package not found"
         )
     
-    return package
+    return FastJSONResponse(cached["body"].encode())
 
 
 @router.put("/{package_id}", response_model=PackageResponse)
-def update_package(
+async def update_package(
     package_id: int,
     package_update: PackageUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a package."""
-    package = db.query(Package).filter(
-        Package.id == package_id,
-        Package.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Package).where(
+            Package.id == package_id,
+            Package.user_id == current_user.id
+        )
+    )
+    package = result.scalars().first()
     
     if not package:
         raise HTTPException(
@@ -117,23 +350,27 @@ def update_package(
     if package_update.description is not None:
         package.description = package_update.description
     
-    db.commit()
-    db.refresh(package)
+    await db.commit()
+    await db.refresh(package)
+    await invalidate(db, f"package:{package.id}")
     
     return package
 
 
 @router.delete("/{package_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_package(
+async def delete_package(
     package_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a package."""
-    package = db.query(Package).filter(
-        Package.id == package_id,
-        Package.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Package).where(
+            Package.id == package_id,
+            Package.user_id == current_user.id
+        )
+    )
+    package = result.scalars().first()
     
     if not package:
         raise HTTPException(
@@ -141,23 +378,29 @@ def delete_package(
             detail="Package not found"
         )
     
-    db.delete(package)
-    db.commit()
+    await db.delete(package)
+    await db.commit()
+    await invalidate(db, f"package:{package_id}")
     
     return None
 
 
 @router.get("/{package_id}/track", response_model=TrackingInfo)
-def track_package(
+async def track_package(
     package_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    max_age: Optional[int] = Query(None, ge=0, description="Serve a stored result up to this many seconds old (0 forces an upstream lookup)"),
+    db: AsyncSession = Depends(get_db),
+    sessionmaker: async_sessionmaker = Depends(get_sessionmaker),
+    current_user: User = Depends(require_scope("track"))
 ):
-    """Get real-time tracking information for a package."""
-    package = db.query(Package).filter(
-        Package.id == package_id,
-        Package.user_id == current_user.id
-    ).first()
+    """Get tracking information for a package, from its stored snapshot when fresh enough."""
+    result = await db.execute(
+        select(Package).where(
+            Package.id == package_id,
+            Package.user_id == current_user.id
+        )
+    )
+    package = result.scalars().first()
     
     if not package:
         raise HTTPException(
@@ -165,14 +408,37 @@ def track_package(
             detail="Package not found"
         )
     
-    # Track the package using KeyDelivery
-    tracking_info = keydelivery.track(package.tracking_number, package.carrier)
+    if max_age is None:
+        max_age = settings.TRACKING_MAX_AGE_SECONDS
+    now = datetime.now(timezone.utc)
+    snapshot = tracking.load_snapshot(package)
+    age = tracking.snapshot_age(snapshot, now) if snapshot is not None else None
     
-    # Update package with latest info
+    if age is not None and max_age > 0:
+        if age <= max_age:
+            tracking.snapshot_requests_total.inc(result="fresh")
+            return _snapshot_response(snapshot, age, stale=False)
+        if age <= max_age + settings.TRACKING_STALE_WHILE_REVALIDATE_SECONDS:
+            tracking.snapshot_requests_total.inc(result="stale")
+            tracking.tracking_refresher.schedule(sessionmaker, package.id)
+            return _snapshot_response(snapshot, age, stale=True)
+    
+    tracking_info = await tracking.fetch(package)
     if tracking_info.get("error") is None:
-        package.status = tracking_info.get("status")
-        package.last_location = tracking_info.get("location")
-        package.tracking_data = json.dumps(tracking_info)
-        db.commit()
+        tracking_info = tracking.apply_result(db, package, tracking_info, now)
+        await db.commit()
+        await invalidate(db, f"package:{package.id}")
+    elif age is not None and age <= max_age + settings.TRACKING_STALE_IF_ERROR_SECONDS:
+        # Upstream failed: the last known state beats an error
+        tracking.snapshot_requests_total.inc(result="stale_if_error")
+        return _snapshot_response(snapshot, age, stale=True)
+    tracking.snapshot_requests_total.inc(result="upstream")
     
-    return tracking_info
+    return FastJSONResponse(tracking_info_json(tracking_info))
+
+
+def _snapshot_response(snapshot: dict, age: float, stale: bool) -> FastJSONResponse:
+    return FastJSONResponse(
+        tracking_info_json({**snapshot, "stale": stale}),
+        headers={"Age": str(max(0, int(age)))},
+    )
@@ -45,6 +45,24 @@ class PasswordReset(BaseModel):
     new_password: str = Field(min_length=8)
 
 
+# API key schemas
+class ApiKeyCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    scopes: List[str] = ["read", "track"]
+
+
+class ApiKeyResponse(BaseModel):
+    id: int
+    name: str
+    prefix: str
+    scopes: List[str]
+    created_at: datetime
+
+
+class ApiKeyCreated(ApiKeyResponse):
+    key: str
+
+
 # Package schemas
 class PackageCreate(BaseModel):
     tracking_number: str
@@ -72,12 +90,47 @@ class PackageResponse(BaseModel):
         from_attributes = True
 
 
+# Bulk operations select the current user's packages; at least one filter is required
+class PackageFilter(BaseModel):
+    ids: Optional[List[int]] = Field(default=None, max_length=10000)
+    status: Optional[str] = None
+    carrier: Optional[str] = None
+    older_than_days: Optional[int] = Field(default=None, ge=0)
+
+
+class BulkPackageUpdate(BaseModel):
+    filter: PackageFilter
+    description: Optional[str] = None
+    carrier: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    affected: int
+
+
+class ImportRowResult(BaseModel):
+    row: int
+    tracking_number: Optional[str]
+    status: str  # created, duplicate or invalid
+    error: Optional[str] = None
+
+
+class ImportReport(BaseModel):
+    total: int
+    created: int
+    duplicate: int
+    invalid: int
+    rows: List[ImportRowResult]
+
+
 class TrackingInfo(BaseModel):
     status: Optional[str]
     location: Optional[str]
     history: List[Dict[str, Any]]
     error: Optional[str]
     carrier: Optional[str] = None
+    stale: bool = False  # served from a snapshot older than the requested max age
+    fetched_at: Optional[datetime] = None  # when the result was fetched from KeyDelivery
 
 
 class CarrierInfo(BaseModel):
@@ -0,0 +1,45 @@
+"""Fast JSON serialization for the hot read endpoints.
+
+``list_packages`` and ``track_package`` skip per-row Pydantic validation:
+rows are selected as plain tuples (no ORM objects), zipped with the field
+names of the response schema and encoded once by orjson. The output is
+byte-for-byte what ``PackageResponse`` / ``TrackingInfo`` would produce
+(``OPT_UTC_Z`` matches Pydantic's ``Z`` suffix for UTC datetimes), and the
+schemas stay on the routes for the OpenAPI docs.
+"""
+from typing import Any, Dict, Iterable, Sequence
+import orjson
+from fastapi.responses import ORJSONResponse
+from app.api.schemas import PackageResponse, TrackingInfo
+from app.models.package import Package
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+# Columns selected for list responses, in PackageResponse field order
+PACKAGE_FIELDS = tuple(PackageResponse.model_fields)
+PACKAGE_COLUMNS = tuple(getattr(Package, name) for name in PACKAGE_FIELDS)
+TRACKING_FIELDS = tuple(TrackingInfo.model_fields)
+TRACKING_DEFAULTS = {name: None if field.is_required() else field.default for name, field in TrackingInfo.model_fields.items()}
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response rendering datetimes like Pydantic; ``bytes`` content is sent as is."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def package_rows_json(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Encode rows selected with ``PACKAGE_COLUMNS`` as a ``List[PackageResponse]`` payload."""
+    fields = PACKAGE_FIELDS
+    return orjson.dumps([dict(zip(fields, row)) for row in rows], option=ORJSON_OPTIONS)
+
+
+def tracking_info_json(tracking_info: Dict[str, Any]) -> bytes:
+    """Encode a KeyDelivery result as a ``TrackingInfo`` payload (extra keys dropped)."""
+    defaults = TRACKING_DEFAULTS
+    return orjson.dumps(
+        {field: tracking_info.get(field, defaults[field]) for field in TRACKING_FIELDS}, option=ORJSON_OPTIONS
+    )
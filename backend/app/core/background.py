@@ -0,0 +1,69 @@
+"""Polling background workers that run inside the API process."""
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWorker:
+    """Calls ``run_once`` in a loop, sleeping between empty rounds.
+
+    Subclasses implement ``run_once`` (returning how many items were handled)
+    and the ``poll_interval`` / ``batch_size`` properties. ``notify`` wakes the
+    worker early, e.g. right after new work was committed.
+    """
+
+    name = "background worker"
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def poll_interval(self) -> float:
+        raise NotImplementedError
+
+    @property
+    def batch_size(self) -> int:
+        raise NotImplementedError
+
+    async def run_once(self) -> int:
+        raise NotImplementedError
+
+    def notify(self) -> None:
+        """Wake the worker instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("%s round failed", self.name)
+                processed = 0
+            if processed >= self.batch_size:
+                # A full batch: more work is probably waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            # Created here so the event belongs to the running loop
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
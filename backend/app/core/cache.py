@@ -0,0 +1,453 @@
+"""Namespaced TTL cache with pluggable backends, shared by the API's caches.
+
+``Cache`` stores JSON-compatible values (encoded with orjson by every
+backend, the in-process one included), so a value reads back the same
+whichever backend CACHE_BACKEND selects: a copy, with tuples and sets as
+lists. Entries expire ``ttl`` seconds after they are written.
+
+- ``memory``: a per-process LRU, one per cache, bounded by ``max_entries``
+- ``database``: the ``cache_entries`` table (UNLOGGED on PostgreSQL), shared
+  by all workers and nodes
+- ``redis``: any server speaking the Redis protocol (Redis, Valkey, or
+  ``tools/resp_server.py`` locally), through a small built-in client
+
+With a shared backend, CACHE_NEAR_TTL_SECONDS > 0 adds a near cache: entries
+read or written are also kept in the worker for that long, so hot keys skip
+the round trip while other workers' writes show up within the near TTL.
+
+Backend errors and timeouts are counted and treated as misses: an
+unavailable cache makes requests slower, never failing.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core import metrics
+from app.core.config import settings
+from app.models.cache_entry import CacheEntry
+
+hits_total = metrics.counter(
+    "cache_hits_total",
+    "Cache hits by cache and tier (near, memory, database or redis)",
+    ("cache", "tier"),
+)
+misses_total = metrics.counter(
+    "cache_misses_total",
+    "Cache misses",
+    ("cache",),
+)
+errors_total = metrics.counter(
+    "cache_errors_total",
+    "Failed or timed out cache backend calls, served as misses",
+    ("cache", "operation"),
+)
+operation_seconds = metrics.histogram(
+    "cache_operation_seconds",
+    "Cache backend call latency",
+    ("backend", "operation"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+# Invalidation counters per cache: keys hash into this many slots
+GENERATION_SLOTS = 4096
+
+
+class CacheError(Exception):
+    """A cache backend call failed."""
+
+
+def encode(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+
+def decode(data: bytes) -> Any:
+    return orjson.loads(data)
+
+
+class MemoryCacheBackend:
+    """Per-process LRU of encoded values with absolute expiry times."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self.discard(key)
+
+    async def clear(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseCacheBackend:
+    """Entries in the ``cache_entries`` table, upserted with ``ON CONFLICT``."""
+
+    name = "database"
+    # Delete expired rows once every this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, sessionmaker: Optional[async_sessionmaker] = None, clock: Callable[[], float] = time.time):
+        self.sessionmaker = sessionmaker
+        self.clock = clock
+        self._writes = 0
+
+    def _session(self):
+        if self.sessionmaker is None:
+            from app.db.database import open_session
+            return open_session()
+        return self.sessionmaker()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        async with self._session() as db:
+            row = (await db.execute(
+                select(CacheEntry.value).where(CacheEntry.key == key, CacheEntry.expires_at > self.clock())
+            )).first()
+        return row[0] if row is not None else None
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        # The dialect modules load with the backend's first write, not at import
+        from sqlalchemy.dialects import postgresql, sqlite
+
+        async with self._session() as db:
+            dialect = db.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert(CacheEntry).values(key=key, value=value, expires_at=self.clock() + ttl)
+            statement = statement.on_conflict_do_update(
+                index_elements=[CacheEntry.key],
+                set_={"value": statement.excluded.value, "expires_at": statement.excluded.expires_at},
+            )
+            await db.execute(statement)
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                await db.execute(delete(CacheEntry).where(CacheEntry.expires_at <= self.clock()))
+            await db.commit()
+
+    async def delete(self, key: str) -> None:
+        async with self._session() as db:
+            await db.execute(delete(CacheEntry).where(CacheEntry.key == key))
+            await db.commit()
+
+    async def clear(self, prefix: str) -> None:
+        async with self._session() as db:
+            await db.execute(delete(CacheEntry).where(CacheEntry.key.startswith(prefix, autoescape=True)))
+            await db.commit()
+
+
+class _RespConnection:
+    """One connection speaking RESP2, the Redis wire protocol."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def command(self, *args) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.writer.write(b"".join(parts))
+        await self.writer.drain()
+        return await self._reply()
+
+    async def _reply(self) -> Any:
+        line = await self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise CacheError("connection closed by the server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise CacheError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._reply() for _ in range(length)]
+        raise CacheError(f"unexpected reply {line[:20]!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _glob_escape(text: str) -> str:
+    return "".join("\\" + char if char in "*?[]\\" else char for char in text)
+
+
+class RedisCacheBackend:
+    """Redis-protocol backend using only GET, SET PX, DEL and SCAN, over pooled connections."""
+
+    name = "redis"
+
+    def __init__(self, url: str, pool_size: int = 10):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.username = unquote(parts.username) if parts.username else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.pool_size = pool_size
+        self._idle: List[_RespConnection] = []
+
+    async def _connect(self) -> _RespConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = _RespConnection(reader, writer)
+        if self.password:
+            if self.username:
+                await connection.command("AUTH", self.username, self.password)
+            else:
+                await connection.command("AUTH", self.password)
+        if self.db:
+            await connection.command("SELECT", self.db)
+        return connection
+
+    async def execute(self, *args) -> Any:
+        connection = self._idle.pop() if self._idle else await self._connect()
+        try:
+            reply = await connection.command(*args)
+        except BaseException:
+            # Unknown protocol state (or cancelled mid-reply): never reuse the connection
+            connection.close()
+            raise
+        if len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        return reply
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str) -> None:
+        await self.execute("DEL", key)
+
+    async def clear(self, prefix: str) -> None:
+        cursor = b"0"
+        while True:
+            cursor, keys = await self.execute("SCAN", cursor, "MATCH", _glob_escape(prefix) + "*", "COUNT", 1000)
+            if keys:
+                await self.execute("DEL", *keys)
+            if cursor in (b"0", "0", 0):
+                return
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+_shared_backends: Dict[Tuple[str, str], Any] = {}
+_caches: "weakref.WeakSet[Cache]" = weakref.WeakSet()
+
+
+def shared_backend(kind: str):
+    """The process-wide backend for ``database`` or ``redis`` (one connection pool each)."""
+    key = (kind, settings.CACHE_REDIS_URL if kind == "redis" else "")
+    backend = _shared_backends.get(key)
+    if backend is None:
+        if kind == "database":
+            backend = DatabaseCacheBackend()
+        elif kind == "redis":
+            backend = RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_POOL_SIZE)
+        else:
+            raise ValueError(f"Unknown cache backend: {kind!r}")
+        _shared_backends[key] = backend
+    return backend
+
+
+class Cache:
+    """A namespace of the cache, e.g. ``Cache("apikey", max_entries=10000)``.
+
+    The backend is looked up from settings on every call unless one is passed
+    in, so CACHE_BACKEND can be changed at runtime (and in tests).
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 10000, backend=None, near_ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.memory = MemoryCacheBackend(max_entries)
+        self.near = MemoryCacheBackend(settings.CACHE_NEAR_MAX_ENTRIES)
+        self._backend = backend
+        self._near_ttl = near_ttl
+        # Invalidation counters: one for the namespace, one per slot of keys
+        self._epoch = 0
+        self._versions = [0] * GENERATION_SLOTS
+        _caches.add(self)
+
+    @property
+    def backend(self):
+        if self._backend is not None:
+            return self._backend
+        if settings.CACHE_BACKEND == "memory":
+            return self.memory
+        return shared_backend(settings.CACHE_BACKEND)
+
+    @property
+    def near_ttl(self) -> float:
+        if self.backend.name == "memory":
+            return 0.0  # already in the worker
+        return settings.CACHE_NEAR_TTL_SECONDS if self._near_ttl is None else self._near_ttl
+
+    def key(self, key: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}{self.namespace}:{key}"
+
+    def _slot(self, full_key: str) -> int:
+        return hash(full_key) % GENERATION_SLOTS
+
+    def generation(self, key: str) -> Tuple[int, int]:
+        """Invalidation counter of ``key`` in this worker; take it before reading the source.
+
+        It changes whenever the key (or the namespace) is deleted, cleared or
+        evicted, locally or through invalidate() from another worker. Keys
+        share counters, so an unrelated write can also change it.
+        """
+        return self._epoch, self._versions[self._slot(self.key(key))]
+
+    def _bump(self, full_key: str) -> None:
+        self._versions[self._slot(full_key)] += 1
+
+    async def _call(self, backend, operation: str, *args) -> Any:
+        started = time.perf_counter()
+        try:
+            if backend.name == "memory":
+                return await getattr(backend, operation)(*args)
+            return await asyncio.wait_for(getattr(backend, operation)(*args), settings.CACHE_TIMEOUT_SECONDS)
+        except Exception as exc:  # includes asyncio.TimeoutError
+            errors_total.inc(cache=self.namespace, operation=operation)
+            raise CacheError(f"{backend.name} cache {operation} failed: {exc!r}") from exc
+        finally:
+            operation_seconds.observe(time.perf_counter() - started, backend=backend.name, operation=operation)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """The cached value, or None on a miss (or a backend error)."""
+        full_key = self.key(key)
+        near_ttl = self.near_ttl
+        if near_ttl > 0:
+            data = await self.near.get(full_key)
+            if data is not None:
+                hits_total.inc(cache=self.namespace, tier="near")
+                return decode(data)
+        backend = self.backend
+        try:
+            data = await self._call(backend, "get", full_key)
+        except CacheError:
+            data = None
+        if data is None:
+            misses_total.inc(cache=self.namespace)
+            return None
+        hits_total.inc(cache=self.namespace, tier=backend.name)
+        if near_ttl > 0:
+            await self.near.set(full_key, data, near_ttl)
+        return decode(data)
+
+    async def set(self, key: str, value: Any, ttl: float, generation: Optional[Tuple[int, int]] = None) -> None:
+        """Store ``value``; skipped when ``generation`` is no longer current.
+
+        Read-through callers pass the generation() taken before their read, so
+        a value read while the key was being invalidated is never cached.
+        """
+        if generation is not None and generation != self.generation(key):
+            return
+        full_key = self.key(key)
+        data = encode(value)
+        near_ttl = self.near_ttl
+        if near_ttl > 0:
+            await self.near.set(full_key, data, min(near_ttl, ttl))
+        try:
+            await self._call(self.backend, "set", full_key, data, ttl)
+        except CacheError:
+            pass
+
+    async def delete(self, key: str) -> None:
+        """Remove the entry from the backend and this worker's near cache."""
+        full_key = self.key(key)
+        self._bump(full_key)
+        self.near.discard(full_key)
+        try:
+            await self._call(self.backend, "delete", full_key)
+        except CacheError:
+            pass
+
+    async def clear(self) -> None:
+        """Remove every entry of the namespace."""
+        prefix = self.key("")
+        self._epoch += 1
+        self.near.reset()
+        try:
+            await self._call(self.backend, "clear", prefix)
+        except CacheError:
+            pass
+
+    def clear_local(self) -> None:
+        """Drop this worker's copies (the memory backend and the near cache)."""
+        self._epoch += 1
+        self.memory.reset()
+        self.near.reset()
+
+    def evict_local(self, key: str) -> None:
+        """Drop this worker's copies of ``key`` (``*``: the whole namespace)."""
+        if key == "*":
+            self.clear_local()
+            return
+        full_key = self.key(key)
+        self._bump(full_key)
+        self.memory.discard(full_key)
+        self.near.discard(full_key)
+
+
+def caches(namespace: str) -> List[Cache]:
+    """The caches of ``namespace`` in this process."""
+    return [cache for cache in list(_caches) if cache.namespace == namespace]
+
+
+def reset_all() -> None:
+    """Drop the per-worker entries of every cache (used by tests)."""
+    for cache in list(_caches):
+        cache.clear_local()
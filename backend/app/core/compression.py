@@ -0,0 +1,209 @@
+"""Negotiated gzip/brotli response compression.
+
+A pure ASGI middleware compressing JSON, NDJSON, CSV and text responses of
+at least COMPRESSION_MIN_SIZE bytes with the best encoding the client
+accepts (brotli when the optional ``brotli`` package is installed, else
+gzip). Levels default to the cheap end (gzip 5, brotli 4): repetitive
+tracking JSON compresses nearly as well as at the maximum levels for a
+fraction of the CPU. Streaming responses such as exports are compressed
+chunk by chunk and flushed, so they keep streaming.
+
+Static payloads (the carriers list) are compressed once at the highest level
+by ``StaticPayload`` and served as is, skipping the middleware.
+"""
+import gzip
+import time
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+from fastapi.responses import Response
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+compression_bytes_in_total = metrics.counter(
+    "http_compression_bytes_in_total",
+    "Response bytes before compression",
+    ("encoding",),
+)
+compression_bytes_out_total = metrics.counter(
+    "http_compression_bytes_out_total",
+    "Response bytes after compression",
+    ("encoding",),
+)
+compression_bytes_saved_total = metrics.counter(
+    "http_compression_bytes_saved_total",
+    "Bytes saved by compressing responses",
+    ("encoding",),
+)
+compression_cpu_seconds_total = metrics.counter(
+    "http_compression_cpu_seconds_total",
+    "CPU time spent compressing responses",
+    ("encoding",),
+)
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Supported encodings, most preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Sequence[str]) -> Optional[str]:
+    """Pick an encoding from an ``Accept-Encoding`` header, honouring q-values and ``*``."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor that records size and CPU metrics."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def _measure(self, data: bytes, produce) -> bytes:
+        started = time.thread_time()
+        out = produce()
+        compression_cpu_seconds_total.inc(time.thread_time() - started, encoding=self.encoding)
+        compression_bytes_in_total.inc(len(data), encoding=self.encoding)
+        compression_bytes_out_total.inc(len(out), encoding=self.encoding)
+        compression_bytes_saved_total.inc(len(data) - len(out), encoding=self.encoding)
+        return out
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        compressor = self._compressor
+        if self.encoding == "br":
+            if final:
+                return self._measure(data, lambda: compressor.process(data) + compressor.finish())
+            return self._measure(data, lambda: compressor.process(data) + compressor.flush())
+        if final:
+            return self._measure(data, lambda: compressor.compress(data) + compressor.flush())
+        return self._measure(data, lambda: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+
+def _header(headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses the client accepts compressed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            (_header(scope.get("headers", ()), b"accept-encoding") or b"").decode("latin-1"),
+            available_encodings(),
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+                if compressible and _header(headers, b"vary") is None:
+                    message = {**message, "headers": [*headers, (b"vary", b"Accept-Encoding")]}
+                if not compressible or _header(headers, b"content-encoding") is not None:
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the start until the first body chunk shows whether compression pays off
+                    start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                start, start_message = start_message, None
+                if not more_body and len(body) < settings.COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                body = compressor.compress(body, final=not more_body)
+                if not more_body:
+                    headers.append((b"content-length", str(len(body)).encode()))
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class StaticPayload:
+    """A constant response body, compressed at the highest level once per encoding on first use."""
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=11)
+            else:
+                data = gzip.compress(self.body, compresslevel=9, mtime=0)
+            self._encoded[encoding] = data
+        return data
+
+    def response(self, accept_encoding: Optional[str]) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate_encoding(accept_encoding, available_encodings()) if settings.COMPRESSION_ENABLED else None
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.encoded(encoding), media_type=self.media_type, headers=headers)
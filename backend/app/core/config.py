@@ -5,6 +5,16 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "postgresql://packagetracker:packagetracker@db:5432/packagetracker"
+    DB_POOL_MODE: str = "queue"  # "queue", or "null" when an external pooler (PgBouncer) is used
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 to disable
+    DB_POOL_PRE_PING: bool = True
+    DB_PGBOUNCER: bool = False  # disable asyncpg prepared statement caches
+    DATABASE_REPLICA_URLS: str = ""  # comma-separated read replica URLs
+    DB_REPLICA_HEALTH_CHECK_INTERVAL: float = 10.0  # seconds before re-probing a failed replica
+    DB_REPLICA_STICKY_SECONDS: float = 5.0  # read-your-writes window after a write
     
     # JWT
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
@@ -17,6 +27,45 @@ class Settings(BaseSettings):
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
     SMTP_FROM: str = ""
+    SMTP_USE_TLS: bool = True  # STARTTLS after connecting
+    SMTP_TIMEOUT: float = 10.0
+    SMTP_IDLE_SECONDS: float = 60.0  # reconnect when the pooled connection sat idle longer
+    
+    # Email outbox (background delivery with retries)
+    EMAIL_OUTBOX_ENABLED: bool = True
+    EMAIL_OUTBOX_POLL_INTERVAL: float = 5.0
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_SECONDS: float = 30.0  # doubled after every failed attempt
+    EMAIL_RETRY_MAX_SECONDS: float = 3600.0
+    
+    # Status change notifications (merged into one digest email per user)
+    STATUS_NOTIFICATIONS_ENABLED: bool = True
+    STATUS_DIGEST_WINDOW_SECONDS: float = 900.0  # collect changes this long before sending
+    STATUS_DIGEST_POLL_INTERVAL: float = 60.0
+    STATUS_DIGEST_BATCH_USERS: int = 200
+    
+    # Observability
+    METRICS_ENABLED: bool = True  # expose /metrics to scrapers sending METRICS_TOKEN
+    METRICS_TOKEN: str = ""  # scraper secret, sent as "Authorization: Bearer <token>" (empty: /metrics is off)
+    TRACING_EXPORTER: str = "none"  # "none", "memory" or "file"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 0.01  # fraction of requests without an incoming traceparent
+    TRACING_MAX_SPANS_PER_TRACE: int = 500
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0  # log statements slower than this (0 disables)
+    DB_QUERY_BUDGET: int = 20  # warn about requests issuing more statements (0 disables)
+    DB_QUERY_COUNT_HEADER: bool = True  # report X-DB-Query-Count on responses
+    PROFILING_TOKEN: str = ""  # admin secret; profile requests sending it in X-Profile-Token
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of all requests profiled
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_MAX_PROFILES: int = 100  # kept in memory
+    PROFILING_DIR: str = ""  # also write <profile id>.folded files here
+    
+    # Response compression (gzip, or brotli when the optional package is installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 4
     
     # Application
     APP_NAME: str = "Package Tracker"
@@ -26,7 +75,51 @@ class Settings(BaseSettings):
     KEYDELIVERY_API_KEY: str = ""
     KD100_APIKEY: str = ""
     KD100_SECRET: str = ""
+    KD100_DETECT_URL: str = "https://www.kd100.com/api/v1/carriers/detect"
+    KD100_TRACK_URL: str = "https://www.kd100.com/api/v1/tracking/realtime"  # point both at tools/kd100_simulator.py locally
+    
+    # Tracking snapshots (Package.tracking_data) served instead of calling KeyDelivery
+    TRACKING_MAX_AGE_SECONDS: int = 300  # default for ?max_age=; younger snapshots are served as is
+    TRACKING_STALE_WHILE_REVALIDATE_SECONDS: int = 86400  # past max age: serve stale, refresh in the background
+    TRACKING_STALE_IF_ERROR_SECONDS: int = 604800  # past max age: serve stale when KeyDelivery fails
     
+    # Bulk import
+    IMPORT_MAX_ROWS: int = 100000
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_COPY_MIN_ROWS: int = 200  # use COPY on PostgreSQL for batches at least this large
+    
+    # Streaming export
+    EXPORT_BATCH_SIZE: int = 1000  # rows fetched from the server-side cursor per chunk
+
+    # Login throttling (failed attempts per sliding window)
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_THROTTLE_BACKEND: str = "memory"  # "memory" or "database"
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 300
+    LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME: int = 5
+    LOGIN_THROTTLE_MAX_FAILURES_PER_IP: int = 20
+    LOGIN_THROTTLE_TRUST_FORWARDED_FOR: bool = False
+    
+    # Shared cache behind the API's caches (API keys, ...)
+    CACHE_BACKEND: str = "memory"  # "memory" (per worker), "database" (UNLOGGED table) or "redis"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"  # any Redis-protocol server
+    CACHE_REDIS_POOL_SIZE: int = 10
+    CACHE_TIMEOUT_SECONDS: float = 0.25  # slower backend calls count as errors (a miss)
+    CACHE_NEAR_TTL_SECONDS: float = 0.0  # >0: per-worker copy in front of a shared backend
+    CACHE_NEAR_MAX_ENTRIES: int = 10000
+    CACHE_KEY_PREFIX: str = "pt:"
+    CACHE_INVALIDATION_ENABLED: bool = True  # evict across workers over LISTEN/NOTIFY (PostgreSQL only)
+    CACHE_INVALIDATION_CHANNEL: str = "cache_invalidation"
+    CACHE_INVALIDATION_URL: str = ""  # direct server URL for LISTEN (PgBouncer transaction mode drops it); defaults to DATABASE_URL
+    USER_CACHE_TTL_SECONDS: int = 60  # users resolved from JWTs (0 disables)
+    USER_CACHE_SIZE: int = 10000
+    PACKAGE_CACHE_TTL_SECONDS: int = 60  # package detail responses (0 disables)
+    PACKAGE_CACHE_SIZE: int = 10000
+    
+    # API keys for machine clients
+    API_KEY_HASH_SECRET: str = ""  # falls back to SECRET_KEY when empty
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_CACHE_SIZE: int = 10000
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,92 @@
+"""HTTP request metrics middleware.
+
+A pure ASGI middleware (no BaseHTTPMiddleware task/queue overhead) that
+records latency per route template, status codes, unhandled exceptions and
+the number of in-flight requests. Routes are labelled by their path template
+(``/api/packages/{package_id}``), never the raw path, to keep label
+cardinality bounded.
+"""
+import time
+from typing import Any, Callable, Dict
+from app.core import metrics
+
+requests_total = metrics.counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code",
+    ("method", "route", "status"),
+)
+request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template",
+    ("method", "route"),
+)
+request_exceptions_total = metrics.counter(
+    "http_request_exceptions_total",
+    "Unhandled exceptions raised while serving a request",
+    ("route", "exception"),
+)
+# In-flight = started - finished; two lock-free counters instead of a locked gauge
+_requests_started = metrics.counter("http_requests_started_total", "HTTP requests started")
+_requests_finished = metrics.counter("http_requests_finished_total", "HTTP requests finished")
+requests_in_progress = metrics.gauge("http_requests_in_progress", "HTTP requests currently being served")
+requests_in_progress.set_function(
+    lambda: {(): _requests_started.value() - _requests_finished.value()}
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(scope: Dict[str, Any], cache: Dict[Callable, str]) -> str:
+    # The router stores the matched endpoint in the scope; map it back to its path template
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    template = cache.get(endpoint)
+    if template is None:
+        app = scope.get("app")
+        for route in getattr(app, "routes", ()):
+            if getattr(route, "endpoint", None) is endpoint:
+                template = route.path
+                break
+        else:
+            template = UNMATCHED_ROUTE
+        cache[endpoint] = template
+    return template
+
+
+class MetricsMiddleware:
+    """Record request count, latency, status and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Dict[Callable, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+        _requests_started.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            request_exceptions_total.inc(
+                route=route_template(scope, self._templates), exception=type(e).__name__
+            )
+            status_code = 500
+            raise
+        finally:
+            _requests_finished.inc()
+            route = route_template(scope, self._templates)
+            method = scope["method"]
+            request_duration_seconds.observe(time.perf_counter() - started, method=method, route=route)
+            requests_total.inc(method=method, route=route, status=str(status_code))
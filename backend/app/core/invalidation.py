@@ -0,0 +1,189 @@
+"""Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Write paths call ``invalidate(db, "user:alice", "package:42")`` after
+committing. The keys (``<cache namespace>:<key>``, or ``<namespace>:*``
+for a whole namespace) are evicted from this worker's caches and the shared
+cache backend right away, then sent to the other workers with ``pg_notify``.
+Every worker runs an ``InvalidationListener`` holding one LISTEN connection;
+it evicts the keys it receives from its local tiers (the memory backend and
+the near cache), typically within a few milliseconds of the commit.
+
+Notifications sent while a listener is disconnected are lost, so each
+(re)connect drops all local cache entries. On SQLite (tests, single
+process) only the local eviction happens.
+"""
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import cache, metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+published_total = metrics.counter(
+    "cache_invalidations_published_total",
+    "Cache keys invalidated by this worker",
+)
+received_total = metrics.counter(
+    "cache_invalidations_received_total",
+    "Cache keys evicted on notifications from the invalidation channel",
+)
+lag_seconds = metrics.histogram(
+    "cache_invalidation_lag_seconds",
+    "Time from publishing an invalidation to its eviction in a listening worker",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+listener_reconnects_total = metrics.counter(
+    "cache_invalidation_listener_reconnects_total",
+    "Invalidation listener connection failures",
+)
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_PAYLOAD_BYTES = 7900
+
+
+def encode_payloads(keys: Iterable[str], sent_at: float) -> List[str]:
+    """Pack keys into ``<sent_at>|key\\nkey...`` payloads that fit one NOTIFY each."""
+    header = f"{sent_at:.6f}|"
+    payloads, batch, size = [], [], len(header)
+    for key in keys:
+        length = len(key.encode()) + 1
+        if batch and size + length > MAX_PAYLOAD_BYTES:
+            payloads.append(header + "\n".join(batch))
+            batch, size = [], len(header)
+        batch.append(key)
+        size += length
+    if batch:
+        payloads.append(header + "\n".join(batch))
+    return payloads
+
+
+def evict_local(key: str) -> None:
+    namespace, _, name = key.partition(":")
+    for namespace_cache in cache.caches(namespace):
+        namespace_cache.evict_local(name)
+
+
+def handle_payload(payload: str) -> int:
+    """Evict the keys of one notification locally; returns how many there were."""
+    sent_at, _, body = payload.partition("|")
+    keys = body.split("\n") if body else []
+    for key in keys:
+        evict_local(key)
+    received_total.inc(len(keys))
+    try:
+        lag_seconds.observe(max(0.0, time.time() - float(sent_at)))
+    except ValueError:
+        pass
+    return len(keys)
+
+
+async def invalidate(db: AsyncSession, *keys: str) -> None:
+    """Invalidate cache keys everywhere; call after the write has been committed.
+
+    Runs after the commit so that no worker can re-cache the old row between
+    the eviction and the commit. Keys of namespaces nothing caches are
+    skipped: every worker runs the same code, so no other worker caches them.
+    """
+    published = []
+    for key in keys:
+        namespace, _, name = key.partition(":")
+        for namespace_cache in cache.caches(namespace):
+            if name == "*":
+                await namespace_cache.clear()
+            else:
+                await namespace_cache.delete(name)
+        if cache.caches(namespace):
+            published.append(key)
+    if not published:
+        return
+    published_total.inc(len(published))
+    if not settings.CACHE_INVALIDATION_ENABLED or db.get_bind().dialect.name != "postgresql":
+        return
+    try:
+        for payload in encode_payloads(published, time.time()):
+            await db.execute(select(func.pg_notify(settings.CACHE_INVALIDATION_CHANNEL, payload)))
+        await db.commit()
+    except Exception:
+        # The write itself succeeded: other workers catch up when their entries expire
+        logger.exception("Publishing cache invalidations failed")
+
+
+def listener_dsn() -> str:
+    """A plain ``postgresql://`` URL for asyncpg, from CACHE_INVALIDATION_URL or DATABASE_URL."""
+    url = make_url(settings.CACHE_INVALIDATION_URL or settings.DATABASE_URL)
+    return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def _connect():
+    import asyncpg
+
+    return await asyncpg.connect(listener_dsn())
+
+
+class InvalidationListener:
+    """Background task LISTENing on the invalidation channel, reconnecting with backoff."""
+
+    # Seconds between liveness checks of the LISTEN connection
+    ping_interval = 10.0
+    min_backoff = 0.5
+    max_backoff = 30.0
+
+    def __init__(self, connect=_connect):
+        self._connect = connect
+        self._task: Optional[asyncio.Task] = None
+        self.connected = asyncio.Event()
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        handle_payload(payload)
+
+    async def _listen_once(self) -> None:
+        connection = await self._connect()
+        try:
+            await connection.add_listener(settings.CACHE_INVALIDATION_CHANNEL, self._on_notify)
+            # Anything published while we were not listening is lost: start over
+            cache.reset_all()
+            self.connected.set()
+            while True:
+                await asyncio.sleep(self.ping_interval)
+                await connection.execute("SELECT 1")
+        finally:
+            self.connected.clear()
+            await connection.close()
+
+    async def _run(self) -> None:
+        backoff = self.min_backoff
+        while True:
+            started = time.monotonic()
+            try:
+                await self._listen_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                listener_reconnects_total.inc()
+                logger.exception("Cache invalidation listener disconnected")
+            if time.monotonic() - started > self.max_backoff:
+                backoff = self.min_backoff  # it was up for a while: reconnect quickly
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def start(self) -> None:
+        if self._task is None:
+            self.connected = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+invalidation_listener = InvalidationListener()
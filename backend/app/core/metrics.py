@@ -0,0 +1,276 @@
+"""Lightweight in-process metrics.
+
+Counters and histograms keep one value dict per thread, so the hot path is a
+plain dict update without taking a lock. Shards are only merged when the
+metric is read, e.g. when ``/metrics`` renders the Prometheus text format.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+LabelKey = Tuple[str, ...]
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelKey, float]] = []
+        self._shards_lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _shard(self) -> Dict[LabelKey, float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[LabelKey, float] = {}
+            self._local.values = values
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Increment the counter for the given label values."""
+        key = self._key(labels)
+        shard = self._shard()
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def collect(self) -> Dict[LabelKey, float]:
+        """Merge all per-thread shards into a single label -> value mapping."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals: Dict[LabelKey, float] = {}
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for the given label values."""
+        return self.collect().get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        """Reset all values (used by tests)."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Gauge:
+    """Value that can go up and down, or is computed from a callback at read time."""
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], Dict[LabelKey, float]]] = None
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Dict[LabelKey, float]]) -> None:
+        """Compute the gauge from ``function`` (label key -> value) whenever it is read."""
+        self._function = function
+
+    def collect(self) -> Dict[LabelKey, float]:
+        if self._function is not None:
+            return dict(self._function())
+        with self._lock:
+            return dict(self._values)
+
+    def value(self, **labels: str) -> float:
+        return self.collect().get(self._key(labels), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative histogram of observed values (typically durations in seconds).
+
+    Like ``Counter``, observations go to a per-thread shard without locking.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: List[Dict[LabelKey, List[float]]] = []
+        self._shards_lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _shard(self) -> Dict[LabelKey, List[float]]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[LabelKey, List[float]] = {}
+            self._local.values = values
+            with self._shards_lock:
+                self._shards.append(values)
+            return values
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = self._key(labels)
+        shard = self._shard()
+        # Layout: one count per bucket, then +Inf count, then sum
+        state = shard.get(key)
+        if state is None:
+            state = [0.0] * (len(self.buckets) + 2)
+            shard[key] = state
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self) -> Dict[LabelKey, Tuple[List[float], float, float]]:
+        """Return label key -> (cumulative bucket counts, count, sum)."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[LabelKey, List[float]] = {}
+        for shard in shards:
+            for key, state in shard.copy().items():
+                total = merged.setdefault(key, [0.0] * (len(self.buckets) + 2))
+                for i, value in enumerate(list(state)):
+                    total[i] += value
+        result = {}
+        for key, state in merged.items():
+            cumulative, running = [], 0.0
+            for count in state[:-2]:
+                running += count
+                cumulative.append(running)
+            count = running + state[-2]
+            result[key] = (cumulative, count, state[-1])
+        return result
+
+    def count(self, **labels: str) -> float:
+        entry = self.collect().get(self._key(labels))
+        return entry[1] if entry else 0.0
+
+    def sum(self, **labels: str) -> float:
+        entry = self.collect().get(self._key(labels))
+        return entry[2] if entry else 0.0
+
+    def reset(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            _registry[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+        return metric
+
+
+def counter(name: str, description: str, labelnames: Iterable[str] = ()) -> Counter:
+    """Get or create a counter registered under ``name``."""
+    return _get_or_create(Counter, name, description, labelnames)
+
+
+def gauge(name: str, description: str, labelnames: Iterable[str] = ()) -> Gauge:
+    """Get or create a gauge registered under ``name``."""
+    return _get_or_create(Gauge, name, description, labelnames)
+
+
+def histogram(
+    name: str,
+    description: str,
+    labelnames: Iterable[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Get or create a histogram registered under ``name``."""
+    return _get_or_create(Histogram, name, description, labelnames, buckets)
+
+
+def reset_all() -> None:
+    """Reset every registered metric (used by tests)."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.reset()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_prometheus() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines: List[str] = []
+    for metric in metrics:
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+        lines.append(f"# HELP {metric.name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        if isinstance(metric, Histogram):
+            for key, (cumulative, count, total) in sorted(metric.collect().items()):
+                for bound, bucket_count in zip(metric.buckets, cumulative):
+                    labels = _format_labels(metric.labelnames, key, f'le="{float(bound)!r}"')
+                    lines.append(f"{metric.name}_bucket{labels} {_format_value(bucket_count)}")
+                labels = _format_labels(metric.labelnames, key, 'le="+Inf"')
+                lines.append(f"{metric.name}_bucket{labels} {_format_value(count)}")
+                labels = _format_labels(metric.labelnames, key)
+                lines.append(f"{metric.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{labels} {_format_value(count)}")
+        else:
+            for key, value in sorted(metric.collect().items()):
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,214 @@
+"""On-demand statistical CPU profiling of single requests.
+
+A request is profiled when it carries ``X-Profile-Token: <PROFILING_TOKEN>``
+or is picked by PROFILING_SAMPLE_RATE. While it runs, a background thread
+samples the Python stacks every PROFILING_INTERVAL_SECONDS and the result is
+stored as folded stacks (``frame;frame;frame count`` per line), the input
+format of flamegraph.pl and speedscope, under a server-generated profile id
+(the client's X-Request-ID is kept alongside it).
+
+On the event loop thread only the profiled request's own stacks are kept.
+Samples taken while the loop idles in ``select`` count as ``(io wait)`` and
+samples taken while it runs other tasks as ``(other tasks)``, without their
+stacks. Work the request hands to other tasks (e.g. a StreamingResponse body)
+falls under ``(other tasks)`` too. Threadpool threads cannot be tied to a
+task: they are sampled whenever they run application code (bcrypt,
+KeyDelivery calls), so their stacks may include concurrent requests' work.
+Only one request is profiled at a time, and with profiling off the
+middleware only inspects the headers.
+"""
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from inspect import CO_ASYNC_GENERATOR, CO_COROUTINE
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+PROFILE_HEADER = b"x-profile-token"
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One profile at a time keeps the overhead bounded
+_profile_lock = threading.Lock()
+
+TASK_FLAGS = CO_COROUTINE | CO_ASYNC_GENERATOR
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(APP_DIR):
+        filename = "app" + filename[len(APP_DIR):]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of running threads from a background thread.
+
+    With ``root_frame`` (a frame of the profiled task), loop thread stacks
+    that do not pass through it are folded into ``(io wait)`` or
+    ``(other tasks)``.
+    """
+
+    def __init__(self, interval: float, loop_thread: int, root_frame=None):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.root_frame = root_frame
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels: List[str] = []
+                on_loop = ident == self.loop_thread
+                in_app = in_task = in_root = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    in_task = in_task or bool(code.co_flags & TASK_FLAGS)
+                    in_root = in_root or frame is self.root_frame
+                    labels.append(_frame_label(code))
+                    frame = frame.f_back
+                if on_loop and self.root_frame is not None and not in_root:
+                    labels = ["(other tasks)" if in_task else "(io wait)"]
+                elif not (on_loop or in_app):
+                    continue
+                if ident not in names:
+                    names.update((t.ident, t.name) for t in threading.enumerate())
+                labels.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the folded stacks."""
+        self._stop.set()
+        self._thread.join()
+        self.root_frame = None
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Keeps the most recent profiles in memory, optionally also writing them to PROFILING_DIR."""
+
+    def __init__(self):
+        self._profiles: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, profile_id: str, folded: str, **info) -> None:
+        """Store a profile; blocks on file I/O when PROFILING_DIR is set."""
+        with self._lock:
+            self._profiles[profile_id] = {"id": profile_id, "folded": folded, **info}
+            self._profiles.move_to_end(profile_id)
+            while len(self._profiles) > settings.PROFILING_MAX_PROFILES:
+                self._profiles.popitem(last=False)
+        if settings.PROFILING_DIR:
+            os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+            with open(os.path.join(settings.PROFILING_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+                f.write(folded)
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {key: value for key, value in profile.items() if key != "folded"}
+                for profile in reversed(self._profiles.values())
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_store = ProfileStore()
+
+
+def token_matches(candidate: Optional[str]) -> bool:
+    """Check a profiling token; always False while PROFILING_TOKEN is unset."""
+    return bool(settings.PROFILING_TOKEN and candidate) and hmac.compare_digest(
+        candidate.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling requests on demand."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, headers) -> bool:
+        if settings.PROFILING_TOKEN:
+            for key, value in headers:
+                if key == PROFILE_HEADER:
+                    return token_matches(value.decode("latin-1"))
+        return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope.get("headers", ())):
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            # Another request is being profiled
+            await self.app(scope, receive, send)
+            return
+
+        # Ids are always ours, so a client cannot overwrite another profile
+        profile_id = uuid.uuid4().hex
+        request_id = None
+        for key, value in scope.get("headers", ()):
+            if key == REQUEST_ID_HEADER and REQUEST_ID_RE.match(value.decode("latin-1")):
+                request_id = value.decode("latin-1")
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        sampler = StackSampler(settings.PROFILING_INTERVAL_SECONDS, threading.get_ident(), sys._getframe())
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Joining the sampler and writing PROFILING_DIR would block the loop
+            try:
+                folded = await asyncio.to_thread(sampler.stop)
+            finally:
+                _profile_lock.release()
+            await asyncio.to_thread(
+                profile_store.save,
+                profile_id,
+                folded,
+                request_id=request_id,
+                method=scope["method"],
+                path=scope["path"],
+                status=status_code,
+                duration_ms=round((time.perf_counter() - started) * 1000, 3),
+                samples=sampler.samples,
+                created_at=time.time(),
+            )
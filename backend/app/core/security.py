@@ -1,27 +1,55 @@
 
+import hashlib
+import hmac
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core import metrics
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hash_seconds = metrics.histogram(
+    "password_hash_seconds",
+    "Time spent in bcrypt hashing and verification",
+    ("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Password hashing context, built on first use: passlib is only needed to log in."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
+    started = time.perf_counter()
+    try:
+        return get_pwd_context().verify(plain_password, hashed_password)
+    finally:
+        password_hash_seconds.observe(time.perf_counter() - started, operation="verify")
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storage."""
-    return pwd_context.hash(password)
+    started = time.perf_counter()
+    try:
+        return get_pwd_context().hash(password)
+    finally:
+        password_hash_seconds.observe(time.perf_counter() - started, operation="hash")
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
+    # jose loads the cryptography backend, the slowest import of the app:
+    # deferred to the first token instead of worker boot
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -35,8 +63,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode and verify a JWT access token."""
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
         return None
+
+
+API_KEY_PREFIX = "pt_"
+
+
+def generate_api_key() -> str:
+    """Generate a new random API key."""
+    return API_KEY_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash an API key for storage.
+    
+    API keys are long random strings, so a keyed SHA-256 is sufficient and
+    keeps verification in the microsecond range (unlike bcrypt).
+    """
+    secret = (settings.API_KEY_HASH_SECRET or settings.SECRET_KEY).encode()
+    return hmac.new(secret, api_key.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_api_key_hash(api_key: str, key_hash: str) -> bool:
+    """Verify an API key against a stored hash in constant time."""
+    return hmac.compare_digest(hash_api_key(api_key), key_hash)
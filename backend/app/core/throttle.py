@@ -0,0 +1,209 @@
+"""Sliding-window throttling of failed logins.
+
+Failed attempts are counted per account and per client IP. Once either
+counter reaches its limit, further attempts are rejected before the
+(deliberately slow) bcrypt verification runs. The account is the resolved
+user when the login name matches one, so signing in with the username and
+with the email share a window (see ``account_key``).
+"""
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from fastapi import Request
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core import metrics
+from app.models.login_attempt import LoginAttempt
+
+throttled_total = metrics.counter(
+    "login_throttled_total",
+    "Login attempts rejected by the failed-login throttle",
+    ("scope",),
+)
+verifications_shed_total = metrics.counter(
+    "login_password_verifications_shed_total",
+    "Password hash verifications skipped because the attempt was throttled",
+)
+verify_seconds_shed_total = metrics.counter(
+    "login_password_verify_seconds_shed_total",
+    "Estimated CPU seconds of password hashing avoided by throttling",
+)
+
+
+class MemoryWindowStore:
+    """Per-process sliding window of attempt timestamps."""
+
+    # Seconds between sweeps of keys whose attempts have all expired
+    sweep_interval = 60.0
+
+    def __init__(self):
+        self._events: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def _prune(self, key: str, cutoff: float) -> Deque[float]:
+        events = self._events.get(key)
+        if events is None:
+            return deque()
+        while events and events[0] <= cutoff:
+            events.popleft()
+        if not events:
+            del self._events[key]
+        return events
+
+    async def window(self, db: AsyncSession, key: str, now: float, window_seconds: float) -> Tuple[int, Optional[float]]:
+        """Return (attempt count, oldest attempt time) within the window."""
+        with self._lock:
+            events = self._prune(key, now - window_seconds)
+            return len(events), (events[0] if events else None)
+
+    def _sweep(self, now: float) -> None:
+        # Keys that failed once and never came back (credential stuffing) are
+        # only pruned here: drop every key whose newest attempt has expired
+        cutoff = now - settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        self._events = {key: events for key, events in self._events.items() if events[-1] > cutoff}
+        self._next_sweep = now + self.sweep_interval
+
+    async def add(self, db: AsyncSession, key: str, now: float) -> None:
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            self._events.setdefault(key, deque()).append(now)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def reset(self, db: AsyncSession, key: str) -> None:
+        with self._lock:
+            self._events.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self._next_sweep = 0.0
+
+
+class DatabaseWindowStore:
+    """Sliding window stored in the ``login_attempts`` table, shared by all workers."""
+
+    # Seconds between deletes of expired rows (per worker)
+    sweep_interval = 60.0
+
+    def __init__(self):
+        self._next_sweep = 0.0
+
+    async def window(self, db: AsyncSession, key: str, now: float, window_seconds: float) -> Tuple[int, Optional[float]]:
+        result = await db.execute(
+            select(func.count(LoginAttempt.id), func.min(LoginAttempt.attempted_at)).where(
+                LoginAttempt.key == key,
+                LoginAttempt.attempted_at > now - window_seconds
+            )
+        )
+        count, oldest = result.one()
+        return count, oldest
+
+    async def add(self, db: AsyncSession, key: str, now: float) -> None:
+        if now >= self._next_sweep:
+            # Expired rows of every key, not just this one: most keys of a
+            # credential-stuffing run are never written again
+            self._next_sweep = now + self.sweep_interval
+            await db.execute(
+                delete(LoginAttempt).where(LoginAttempt.attempted_at <= now - settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+            )
+        db.add(LoginAttempt(key=key, attempted_at=now))
+        await db.commit()
+
+    async def reset(self, db: AsyncSession, key: str) -> None:
+        await db.execute(delete(LoginAttempt).where(LoginAttempt.key == key))
+        await db.commit()
+
+    def clear(self) -> None:
+        self._next_sweep = 0.0
+
+
+def account_key(identifier: str, user_id: Optional[int] = None) -> str:
+    """Throttle key of a login: the user id when it resolved to a user, else the normalized identifier."""
+    if user_id is not None:
+        return f"id:{user_id}"
+    return f"name:{identifier.strip().lower()}"
+
+
+class LoginThrottle:
+    """Failed-login throttle keyed by account (``account_key``) and client IP."""
+
+    def __init__(self, store=None):
+        self.store = store
+        # Running average of a bcrypt verification, used to estimate shed work
+        self._avg_verify_seconds = 0.1
+
+    def _store(self):
+        if self.store is not None:
+            return self.store
+        if settings.LOGIN_THROTTLE_BACKEND == "database":
+            return _database_store
+        return _memory_store
+
+    @staticmethod
+    def _keys(account: str, client_ip: str) -> List[Tuple[str, str, int]]:
+        return [
+            ("username", f"user:{account}", settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME),
+            ("ip", f"ip:{client_ip}", settings.LOGIN_THROTTLE_MAX_FAILURES_PER_IP),
+        ]
+
+    async def retry_after(self, db: AsyncSession, account: str, client_ip: str) -> Optional[int]:
+        """Return seconds until the next attempt is allowed, or None if not throttled."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return None
+
+        now = time.time()
+        window_seconds = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        store = self._store()
+        for scope, key, limit in self._keys(account, client_ip):
+            count, oldest = await store.window(db, key, now, window_seconds)
+            if count >= limit:
+                throttled_total.inc(scope=scope)
+                verifications_shed_total.inc()
+                verify_seconds_shed_total.inc(self._avg_verify_seconds)
+                return max(1, int(oldest + window_seconds - now) + 1)
+        return None
+
+    async def record_failure(self, db: AsyncSession, account: str, client_ip: str) -> None:
+        """Count a failed attempt against both the account and the client IP."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        now = time.time()
+        store = self._store()
+        for _, key, _ in self._keys(account, client_ip):
+            await store.add(db, key, now)
+
+    async def record_success(self, db: AsyncSession, account: str) -> None:
+        """Clear the account window after a successful login."""
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return
+        await self._store().reset(db, f"user:{account}")
+
+    def observe_verify(self, seconds: float) -> None:
+        """Feed the duration of a real password verification into the estimate."""
+        self._avg_verify_seconds = 0.9 * self._avg_verify_seconds + 0.1 * seconds
+
+    def clear(self) -> None:
+        """Forget all in-memory state (used by tests)."""
+        _memory_store.clear()
+        _database_store.clear()
+
+
+def get_client_ip(request: Request) -> str:
+    """Return the client IP, honouring X-Forwarded-For when configured."""
+    if settings.LOGIN_THROTTLE_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+_memory_store = MemoryWindowStore()
+_database_store = DatabaseWindowStore()
+
+login_throttle = LoginThrottle()
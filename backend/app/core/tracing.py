@@ -0,0 +1,259 @@
+"""Request tracing with W3C ``traceparent`` propagation.
+
+Each sampled request gets a root span; DB statements, KeyDelivery calls and a
+few application steps add child spans. The active span lives in a context
+variable, so it follows the request through ``await``, the threadpool and
+SQLAlchemy's greenlets. Finished traces are handed to an exporter (in-memory
+for tests and debugging, or a JSON-lines file).
+
+Sampling is head-based: the decision is made once at the root (or taken from
+an incoming ``traceparent``), and unsampled requests skip span creation
+entirely.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from app.core.config import settings
+from app.core.http_metrics import route_template
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Trace:
+    """Spans collected for one sampled request, exported together when the root ends."""
+
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_time", "_started", "duration", "attributes", "status")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:500]
+
+    def finish(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(span.to_dict() for span in spans)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileExporter:
+    """Appends spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+memory_exporter = InMemoryExporter()
+_file_exporters: Dict[str, FileExporter] = {}
+
+
+def get_exporter():
+    """Return the exporter selected by TRACING_EXPORTER, or None when tracing is off."""
+    if settings.TRACING_EXPORTER == "memory":
+        return memory_exporter
+    if settings.TRACING_EXPORTER == "file":
+        exporter = _file_exporters.get(settings.TRACING_FILE)
+        if exporter is None:
+            exporter = _file_exporters.setdefault(settings.TRACING_FILE, FileExporter(settings.TRACING_FILE))
+        return exporter
+    return None
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Optional[Span]:
+    """Start a root span, or return None if the request is not sampled."""
+    match = TRACEPARENT_RE.match(traceparent or "")
+    if match:
+        # Honour the caller's sampling decision and continue its trace
+        trace_id, parent_id, flags = match.groups()
+        if not int(flags, 16) & 1:
+            return None
+    else:
+        if random.random() >= settings.TRACING_SAMPLE_RATE:
+            return None
+        trace_id, parent_id = _new_id(128), None
+    trace = Trace(trace_id)
+    root = Span(trace, name, parent_id, attributes)
+    trace.spans.append(root)
+    return root
+
+
+def finish_trace(root: Span, exporter) -> None:
+    """End the root span and export the whole trace."""
+    root.finish()
+    if root.trace.dropped:
+        root.attributes["trace.dropped_spans"] = root.trace.dropped
+    for span in root.trace.spans:
+        span.finish()
+    exporter.export(root.trace.spans)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def activate(span: Span):
+    """Make ``span`` the current span; returns a token for ``deactivate``."""
+    return _current_span.set(span)
+
+
+def deactivate(token) -> None:
+    _current_span.reset(token)
+
+
+def start_child(name: str, **attributes: Any) -> Optional[Span]:
+    """Start a leaf span under the current span (not made current). None if not tracing."""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    trace = parent.trace
+    if len(trace.spans) >= settings.TRACING_MAX_SPANS_PER_TRACE:
+        trace.dropped += 1
+        return None
+    child = Span(trace, name, parent.span_id, attributes)
+    trace.spans.append(child)
+    return child
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Run a block inside a child span of the current span (a no-op when not tracing)."""
+    child = start_child(name, **attributes)
+    if child is None:
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+def inject_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add a ``traceparent`` header for the current span to outgoing request headers."""
+    current = _current_span.get()
+    if current is not None:
+        headers["traceparent"] = current.traceparent
+    return headers
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a root span per sampled HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+        self._templates: Dict[Any, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        exporter = get_exporter() if scope["type"] == "http" else None
+        if exporter is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        method = scope["method"]
+        root = start_trace(method, traceparent, **{"http.method": method, "http.target": scope["path"]})
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = "error"
+                # Let clients correlate the response with the exported trace
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", root.traceparent.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = activate(root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.record_error(e)
+            raise
+        finally:
+            deactivate(token)
+            route = route_template(scope, self._templates)
+            root.name = f"{method} {route}"
+            root.set_attribute("http.route", route)
+            finish_trace(root, exporter)
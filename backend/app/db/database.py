@@ -1,13 +1,117 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from functools import lru_cache
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 from app.core.config import settings
+from app.core import tracing
+from app.db.instrumentation import instrument_queries
+from app.db.pool import engine_options, instrument_engine
+from app.db.routing import ReplicaRouter, parse_replica_urls
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers for each supported sync URL scheme
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_async_url(url: str) -> str:
+    """Translate a database URL to its asyncio driver (asyncpg / aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None or parsed.get_driver_name() == driver:
+        return url
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+class TracedAsyncSession(AsyncSession):
+    """AsyncSession whose commits show up as ``db.commit`` spans when tracing."""
+
+    async def commit(self) -> None:
+        with tracing.span("db.commit"):
+            await super().commit()
+
+
+# Engines are created on first use rather than at import time: importing the
+# app stays free of driver imports and pool setup, and tools that never touch
+# the database never create one.
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Sync engine, used by tooling and migrations."""
+    engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+    instrument_engine(engine, "sync")
+    instrument_queries(engine, "sync")
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    """Sync session factory bound to ``get_engine()``."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """Async engine, used by the API."""
+    async_engine = create_async_engine(
+        get_async_url(settings.DATABASE_URL), **engine_options(settings.DATABASE_URL, is_async=True)
+    )
+    instrument_engine(async_engine, "primary")
+    instrument_queries(async_engine, "primary")
+    return async_engine
+
+
+@lru_cache(maxsize=None)
+def get_async_session_factory() -> async_sessionmaker:
+    """Async session factory on the primary."""
+    return async_sessionmaker(
+        get_async_engine(), class_=TracedAsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+def open_session() -> AsyncSession:
+    """A new session on the primary, for work outside requests (background tasks)."""
+    return get_async_session_factory()()
+
+
+async def dispose_engines() -> None:
+    """Release pooled connections of the engines created so far."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    await replica_router.dispose()
+
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "SessionLocal": get_session_factory,
+    "async_engine": get_async_engine,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+
+def __getattr__(name: str):
+    # Keeps ``from app.db.database import async_engine`` working for tools and
+    # scripts; application code calls the getters
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Optional read replicas for read-only dependencies (their engines are lazy too)
+replica_router = ReplicaRouter(
+    [get_async_url(url) for url in parse_replica_urls(settings.DATABASE_REPLICA_URLS)]
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_committed(session):
+    session.info["committed"] = True
 
 
 # Create base class for models using SQLAlchemy 2.0
@@ -15,10 +119,28 @@ class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+def get_sessionmaker() -> async_sessionmaker:
+    """Dependency returning the primary session factory (overridden in tests)."""
+    return get_async_session_factory()
+
+
+async def get_db(request: Request, sessionmaker: async_sessionmaker = Depends(get_sessionmaker)):
+    """Dependency to get an async database session on the primary."""
+    async with sessionmaker() as db:
+        yield db
+        if db.sync_session.info.get("committed"):
+            replica_router.record_write(request)
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)):
+    """Dependency for read-only work: a healthy replica, else the primary session.
+    
+    Clients that wrote within DB_REPLICA_STICKY_SECONDS keep reading from the
+    primary so they see their own writes.
+    """
+    replica_db = await replica_router.read_session(request)
+    if replica_db is None:
         yield db
-    finally:
-        db.close()
+        return
+    async with replica_db:
+        yield replica_db
@@ -0,0 +1,167 @@
+"""SQL statement metrics, trace spans, slow-query log and per-request query counts.
+
+Cursor-execute hooks time every statement and count it by engine and
+operation (SELECT, INSERT, ...). Each hook is a ``perf_counter`` call and a
+dict update, so the overhead is a few microseconds per statement. Inside a
+sampled trace each statement also becomes a ``db.query`` span.
+
+``QueryCountMiddleware`` counts the statements issued while serving each
+request and reports them in ``X-DB-Query-Count``, so N+1 patterns show up in
+responses and tests can hold endpoints to a query budget. Statements slower
+than SLOW_QUERY_THRESHOLD_MS are logged with the route that issued them and
+the shape (types, never values) of their bound parameters.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core import metrics, tracing
+from app.core.config import settings
+from app.core.http_metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+query_duration_seconds = metrics.histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ("engine", "operation"),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+query_errors_total = metrics.counter(
+    "db_query_errors_total",
+    "SQL statements that raised an error",
+    ("engine", "operation"),
+)
+
+slow_queries_total = metrics.counter(
+    "db_slow_queries_total",
+    "SQL statements slower than SLOW_QUERY_THRESHOLD_MS",
+    ("engine", "operation"),
+)
+query_budget_exceeded_total = metrics.counter(
+    "db_query_budget_exceeded_total",
+    "Requests that issued more than DB_QUERY_BUDGET statements",
+    ("route",),
+)
+
+OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"})
+
+
+def statement_operation(statement: str) -> str:
+    """Return the leading SQL keyword, or OTHER for DDL and anything unusual."""
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in OPERATIONS else "OTHER"
+
+
+class RequestQueries:
+    """Statements issued while serving one request."""
+
+    __slots__ = ("scope", "count")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.count = 0
+
+
+_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+_templates: Dict[Callable, str] = {}
+
+
+def current_route() -> Optional[str]:
+    """``METHOD /route/{template}`` of the request being served, if any."""
+    queries = _request_queries.get()
+    if queries is None:
+        return None
+    return f"{queries.scope['method']} {route_template(queries.scope, _templates)}"
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Describe bound parameters by type so logs carry no user data."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def instrument_queries(engine: Engine, name: str) -> None:
+    """Attach statement timing hooks to ``engine`` (sync or ``AsyncEngine``)."""
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracing.start_child(
+            "db.query",
+            **{"db.engine": name, "db.operation": statement_operation(statement), "db.statement": statement[:1000]}
+        )
+        conn.info.setdefault("query_started", []).append((time.perf_counter(), span))
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.count += 1
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started, span = conn.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        operation = statement_operation(statement)
+        query_duration_seconds.observe(elapsed, engine=name, operation=operation)
+        if span is not None:
+            span.finish()
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold and elapsed * 1000 >= threshold:
+            slow_queries_total.inc(engine=name, operation=operation)
+            logger.warning(
+                "Slow query (%.1f ms) on %s from %s: %s params=%s",
+                elapsed * 1000, name, current_route() or "background",
+                " ".join(statement.split())[:2000], parameter_shape(parameters, executemany),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            _, span = conn.info["query_started"].pop()
+            if span is not None:
+                span.record_error(exception_context.original_exception)
+                span.finish()
+        statement = exception_context.statement or ""
+        query_errors_total.inc(engine=name, operation=statement_operation(statement))
+
+
+class QueryCountMiddleware:
+    """Pure ASGI middleware counting SQL statements per request (``X-DB-Query-Count``)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.DB_QUERY_COUNT_HEADER:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-query-count", str(queries.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_queries.set(queries)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            budget = settings.DB_QUERY_BUDGET
+            if budget and queries.count > budget:
+                route = route_template(scope, _templates)
+                query_budget_exceeded_total.inc(route=route)
+                logger.warning(
+                    "%s %s issued %d queries (budget %d)", scope["method"], route, queries.count, budget
+                )
@@ -0,0 +1,76 @@
+"""Helpers for online (non-blocking) schema migrations.
+
+Used from Alembic revision scripts. On PostgreSQL indexes are built with
+``CREATE INDEX CONCURRENTLY`` and backfills commit in small batches, so large
+tables stay writable while a migration runs. Other dialects (SQLite in tests)
+fall back to the plain operations.
+"""
+from typing import List, Optional
+from alembic import op
+from sqlalchemy import text
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_concurrently(name: str, table: str, columns: List[str], **kw) -> None:
+    """Create an index without taking a write lock on PostgreSQL.
+
+    ``CONCURRENTLY`` cannot run inside a transaction, so the statement runs in
+    an autocommit block. If a previous attempt failed it may have left an
+    INVALID index behind; drop it before re-running the migration.
+    """
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    """Drop an index without taking a write lock on PostgreSQL."""
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def batched_backfill(
+    table: str,
+    set_clause: str,
+    where_clause: Optional[str] = None,
+    batch_size: int = 5000,
+    key: str = "id",
+) -> int:
+    """Run ``UPDATE table SET set_clause`` over primary-key ranges of ``batch_size``.
+
+    On PostgreSQL each batch commits on its own, so row locks are short-lived
+    and replication is not hit by one huge transaction. Returns the number of
+    rows updated.
+    """
+    bind = op.get_bind()
+    bounds = bind.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+    if bounds[0] is None:
+        return 0
+
+    condition = f" AND ({where_clause})" if where_clause else ""
+    statement = text(
+        f"UPDATE {table} SET {set_clause} "
+        f"WHERE {key} >= :low AND {key} < :high{condition}"
+    )
+
+    def run_batches() -> int:
+        updated = 0
+        low, last = bounds
+        while low <= last:
+            result = bind.execute(statement, {"low": low, "high": low + batch_size})
+            updated += result.rowcount or 0
+            low += batch_size
+        return updated
+
+    if _is_postgresql():
+        with op.get_context().autocommit_block():
+            return run_batches()
+    return run_batches()
@@ -0,0 +1,146 @@
+"""Connection pool configuration and instrumentation."""
+import time
+import weakref
+from typing import Any, Dict
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core.config import settings
+from app.core import metrics
+
+checkout_seconds = metrics.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of the pool",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+checkout_timeouts_total = metrics.counter(
+    "db_pool_checkout_timeouts_total",
+    "Pool checkouts that gave up after DB_POOL_TIMEOUT",
+    ("pool",),
+)
+checkouts_total = metrics.counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool",
+    ("pool",),
+)
+connections_opened_total = metrics.counter(
+    "db_pool_connections_opened_total",
+    "New DBAPI connections opened by the pool",
+    ("pool",),
+)
+in_use = metrics.gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out",
+    ("pool",),
+)
+overflow = metrics.gauge(
+    "db_pool_overflow",
+    "Connections open beyond DB_POOL_SIZE (negative while the pool is still filling)",
+    ("pool",),
+)
+pool_size = metrics.gauge(
+    "db_pool_size",
+    "Configured pool size",
+    ("pool",),
+)
+
+# Pool name -> engine, read when the gauges are collected
+_engines: "weakref.WeakValueDictionary[str, Engine]" = weakref.WeakValueDictionary()
+# Pool name -> connections currently checked out, maintained by the pool events
+_checked_out: Dict[str, int] = {}
+
+
+class _TimedPoolMixin:
+    """Measure how long ``_do_get`` waits for a connection and count timeouts."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            checkout_timeouts_total.inc(pool=self.metrics_name)
+            raise
+        checkout_seconds.observe(time.perf_counter() - started, pool=self.metrics_name)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Build ``create_engine`` pool arguments from settings for ``url``."""
+    parsed = make_url(url)
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if parsed.get_backend_name() == "sqlite":
+        # SQLite uses SingletonThreadPool/QueuePool defaults chosen by the dialect
+        return options
+
+    if settings.DB_POOL_MODE == "null":
+        # An external pooler (e.g. PgBouncer) owns the connections
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if settings.DB_PGBOUNCER and is_async and parsed.get_backend_name() == "postgresql":
+        # Transaction-mode PgBouncer cannot keep server-side prepared statements
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+
+    return options
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Attach pool event hooks and register ``engine`` for the pool gauges.
+
+    Accepts sync engines and ``AsyncEngine`` (whose events live on ``sync_engine``).
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    if isinstance(engine.pool, _TimedPoolMixin):
+        engine.pool.metrics_name = name
+    _engines[name] = engine
+    _checked_out[name] = 0
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts_total.inc(pool=name)
+        _checked_out[name] += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        _checked_out[name] -= 1
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connections_opened_total.inc(pool=name)
+
+
+def _queue_pool_stat(stat: str) -> Dict[tuple, float]:
+    values = {}
+    for name, engine in list(_engines.items()):
+        if isinstance(engine.pool, QueuePool):
+            values[(name,)] = float(getattr(engine.pool, stat)())
+    return values
+
+
+in_use.set_function(lambda: {(name,): float(count) for name, count in _checked_out.items()})
+overflow.set_function(lambda: _queue_pool_stat("overflow"))
+pool_size.set_function(lambda: _queue_pool_stat("size"))
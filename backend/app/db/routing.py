@@ -0,0 +1,143 @@
+"""Routing of read-only sessions to database replicas."""
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core import metrics
+from app.db.instrumentation import instrument_queries
+from app.db.pool import engine_options, instrument_engine
+
+logger = logging.getLogger(__name__)
+
+read_sessions_total = metrics.counter(
+    "db_read_sessions_total",
+    "Read-only sessions by target (replica name or primary) and reason",
+    ("target", "reason"),
+)
+
+# Bound on remembered clients for read-your-writes stickiness
+MAX_STICKY_CLIENTS = 10000
+
+
+class Replica:
+    """One replica database and its health state."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self._engine: Optional[AsyncEngine] = None
+        self._sessionmaker: Optional[async_sessionmaker] = None
+        self.healthy = True
+        self.retry_at = 0.0
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """The replica's engine, created on the first read routed to it."""
+        if self._engine is None:
+            self._engine = create_async_engine(self.url, **engine_options(self.url, is_async=True))
+            instrument_engine(self._engine, self.name)
+            instrument_queries(self._engine, self.name)
+        return self._engine
+
+    @property
+    def sessionmaker(self) -> async_sessionmaker:
+        if self._sessionmaker is None:
+            self._sessionmaker = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        return self._sessionmaker
+
+    def available(self, now: float) -> bool:
+        """Healthy, or unhealthy long enough ago to be probed again."""
+        return self.healthy or now >= self.retry_at
+
+    def mark_unhealthy(self, now: float) -> None:
+        self.healthy = False
+        self.retry_at = now + settings.DB_REPLICA_HEALTH_CHECK_INTERVAL
+
+
+class ReplicaRouter:
+    """Round-robin router over healthy replicas with read-your-writes stickiness."""
+
+    def __init__(self, urls: List[str]):
+        """Create a router over async-driver ``urls`` (see ``get_async_url``)."""
+        self.replicas = [Replica(f"replica-{i}", url) for i, url in enumerate(urls)]
+        self._cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._recent_writers: Dict[str, float] = {}
+
+    @staticmethod
+    def _client_key(request: Request) -> Optional[str]:
+        credentials = request.headers.get("authorization") or request.headers.get("x-api-key")
+        if not credentials:
+            return None
+        return hashlib.sha256(credentials.encode()).hexdigest()
+
+    def record_write(self, request: Request) -> None:
+        """Pin the client to the primary for DB_REPLICA_STICKY_SECONDS after a write."""
+        key = self._client_key(request)
+        if key is None or not self.replicas:
+            return
+        now = time.monotonic()
+        if len(self._recent_writers) >= MAX_STICKY_CLIENTS:
+            self._recent_writers = {k: t for k, t in self._recent_writers.items() if t > now}
+        self._recent_writers[key] = now + settings.DB_REPLICA_STICKY_SECONDS
+
+    def is_sticky(self, request: Request) -> bool:
+        key = self._client_key(request)
+        if key is None:
+            return False
+        until = self._recent_writers.get(key)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            self._recent_writers.pop(key, None)
+            return False
+        return True
+
+    async def read_session(self, request: Request) -> Optional[AsyncSession]:
+        """Open a session on a healthy replica, or return None to use the primary."""
+        if not self.replicas:
+            return None
+        if self.is_sticky(request):
+            read_sessions_total.inc(target="primary", reason="sticky")
+            return None
+
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cycle)]
+            if not replica.available(now):
+                continue
+            session = replica.sessionmaker()
+            try:
+                # Checking out a connection doubles as the health check
+                await session.connection()
+            except (exc.DBAPIError, exc.TimeoutError, asyncio.TimeoutError, OSError) as e:
+                # Down (connection errors) or saturated (pool checkout / connect timeouts)
+                await session.close()
+                replica.mark_unhealthy(now)
+                logger.warning("Replica %s unavailable, skipping: %s", replica.name, e)
+                continue
+            replica.healthy = True
+            read_sessions_total.inc(target=replica.name, reason="replica")
+            return session
+
+        read_sessions_total.inc(target="primary", reason="no_healthy_replica")
+        return None
+
+    def clear(self) -> None:
+        """Forget stickiness state (used by tests)."""
+        self._recent_writers.clear()
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            if replica._engine is not None:
+                await replica._engine.dispose()
+
+
+def parse_replica_urls(value: str) -> List[str]:
+    """Split the comma-separated DATABASE_REPLICA_URLS setting."""
+    return [url.strip() for url in value.split(",") if url.strip()]
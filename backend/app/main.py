@@ -1,20 +1,44 @@
-from fastapi import FastAPI
+import hmac
+from fastapi import FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from typing import Optional
 from contextlib import asynccontextmanager
+from sqlalchemy.engine import make_url
 from app.api import auth, packages
-from app.db.database import engine, Base
+from app.api.serializers import FastJSONResponse
+from app.db.database import dispose_engines
+from app.db.instrumentation import QueryCountMiddleware
 from app.core.config import settings
+from app.core import metrics
+from app.core.compression import CompressionMiddleware
+from app.core.http_metrics import MetricsMiddleware
+from app.core.invalidation import invalidation_listener
+from app.core.profiling import ProfilingMiddleware, profile_store, token_matches
+from app.core.tracing import TracingMiddleware
+from app.services.notifications import digest_builder
+from app.services.outbox import outbox_sender
+from app.services.tracking import tracking_refresher
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create database tables
-    try:
-        Base.metadata.create_all(bind=engine)
-    except Exception as e:
-        print(f"Warning: Could not create database tables: {e}")
+    # Startup: the schema is managed by Alembic (`alembic upgrade head`), so
+    # workers boot without running any DDL
+    if settings.EMAIL_OUTBOX_ENABLED:
+        # Background email: status digests are queued into the outbox
+        outbox_sender.start()
+        digest_builder.start()
+    if settings.CACHE_INVALIDATION_ENABLED and make_url(settings.DATABASE_URL).get_backend_name() == "postgresql":
+        # Evict cache entries other workers invalidate
+        invalidation_listener.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop background delivery and release pooled connections
+    await digest_builder.stop()
+    await outbox_sender.stop()
+    await tracking_refresher.drain()
+    await invalidation_listener.stop()
+    await dispose_engines()
 
 
 # Create FastAPI app
@@ -22,7 +46,9 @@ app = FastAPI(
     title=settings.APP_NAME,
     description="Universal Package Tracker API with JWT authentication and modular carrier tracking",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson instead of the stdlib encoder for every JSON response
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -34,6 +60,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated gzip/brotli for JSON, NDJSON and CSV responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Per-request statement count (X-DB-Query-Count) and query budget
+app.add_middleware(QueryCountMiddleware)
+
+# Profiles single requests on demand (X-Profile-Token or PROFILING_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+# Root span per sampled request; DB and KeyDelivery calls add child spans
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(packages.router, prefix="/api/packages", tags=["Packages"])
@@ -53,3 +94,43 @@ def root():
 def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+def _metrics_token_matches(authorization: Optional[str]) -> bool:
+    # Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; always False while it is unset
+    scheme, _, token = (authorization or "").partition(" ")
+    return bool(settings.METRICS_TOKEN and token) and scheme.lower() == "bearer" and hmac.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics."""
+    # 404 like the profile endpoints: invisible without the token
+    if not settings.METRICS_ENABLED or not _metrics_token_matches(authorization):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _require_profiling_token(token: Optional[str]) -> None:
+    # 404 rather than 401/403 so the endpoints are invisible without the token
+    if not token_matches(token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+@app.get("/debug/profiles", include_in_schema=False)
+def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Recently captured request profiles, newest first."""
+    _require_profiling_token(x_profile_token)
+    return profile_store.list()
+
+
+@app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    """Folded stacks of one profiled request, ready for flamegraph.pl or speedscope."""
+    _require_profiling_token(x_profile_token)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(profile["folded"])
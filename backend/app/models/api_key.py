@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+
+class ApiKey(Base):
+    """API key for machine clients; only a keyed hash of the key is stored."""
+
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(100), nullable=False)
+    prefix = Column(String(16), nullable=False)  # first characters, for display only
+    key_hash = Column(String(64), unique=True, index=True, nullable=False)
+    scopes = Column(String(100), nullable=False)  # comma-separated, e.g. "read,track"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationship to User model
+    user = relationship("User", backref="api_keys")
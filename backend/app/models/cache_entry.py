@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Float, LargeBinary, Index
+from app.db.database import Base
+
+
+class CacheEntry(Base):
+    """Entry of the shared ``database`` cache backend (an UNLOGGED table on PostgreSQL)."""
+
+    __tablename__ = "cache_entries"
+
+    # Namespaced cache key, e.g. "pt:apikey:<hash>"
+    key = Column(String(512), primary_key=True)
+    # orjson-encoded value
+    value = Column(LargeBinary, nullable=False)
+    # Unix timestamp after which the entry is a miss
+    expires_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('idx_cache_entries_expires', 'expires_at'),
+    )
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class EmailOutbox(Base):
+    """Queued email, delivered by the background outbox sender."""
+
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    text_body = Column(Text, nullable=False)
+    html_body = Column(Text, nullable=True)
+    # pending, sent or failed (gave up after EMAIL_MAX_ATTEMPTS)
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # Unix timestamp of the next delivery attempt
+    next_attempt_at = Column(Float, nullable=False)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('idx_email_outbox_status_next', 'status', 'next_attempt_at'),
+    )
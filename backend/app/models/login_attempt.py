@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, Index
+from app.db.database import Base
+
+
+class LoginAttempt(Base):
+    """Failed login attempt, used to share throttling state between workers."""
+
+    __tablename__ = "login_attempts"
+
+    id = Column(Integer, primary_key=True)
+    # Throttle key, e.g. "user:alice" or "ip:10.0.0.1"
+    key = Column(String(320), nullable=False)
+    # Unix timestamp of the attempt
+    attempted_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index('idx_login_attempt_key_time', 'key', 'attempted_at'),
+    )
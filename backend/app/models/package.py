@@ -20,13 +20,16 @@ class Package(Base):
     last_location = Column(String(255), nullable=True)
     # Use JSON.with_variant to support both PostgreSQL (JSONB) and SQLite (JSON)
     tracking_data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    tracking_updated_at = Column(DateTime(timezone=True), nullable=True)  # when tracking_data was fetched
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationship to User model
     user = relationship("User", backref="packages")
     
-    # Composite index for better query performance
+    # Composite indexes for per-user lookups, listing and status filters
     __table_args__ = (
         Index('idx_user_tracking', 'user_id', 'tracking_number'),
+        Index('idx_packages_user_created', 'user_id', 'created_at'),
+        Index('idx_packages_user_status', 'user_id', 'status'),
     )
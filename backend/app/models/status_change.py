@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from app.db.database import Base
+
+
+class StatusChange(Base):
+    """A package status transition waiting to go out in the user's next digest."""
+
+    __tablename__ = "status_changes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    package_id = Column(Integer, ForeignKey("packages.id", ondelete="CASCADE"), nullable=False)
+    old_status = Column(String(100), nullable=True)
+    new_status = Column(String(100), nullable=False)
+    # Unix timestamps; notified_at is set once the change was included in a digest
+    changed_at = Column(Float, nullable=False)
+    notified_at = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index('idx_status_changes_pending', 'notified_at', 'user_id'),
+    )
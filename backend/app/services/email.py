@@ -1,35 +1,53 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from html import escape
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from email.mime.multipart import MIMEMultipart
+
 
 class EmailService:
-    """Service for sending emails via SMTP."""
+    """Builds the emails sent by the application.
+    
+    Delivery happens in the background: callers enqueue messages with
+    ``app.services.outbox.enqueue_email`` and the outbox sender sends them
+    over a pooled SMTP connection.
+    """
+    
+    @staticmethod
+    def build_message(to_email: str, subject: str, text: str, html: Optional[str] = None) -> "MIMEMultipart":
+        """Assemble a MIME message with a plain-text and optional HTML part."""
+        # Only the outbox sender builds messages: keep email.mime out of worker boot
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = settings.SMTP_FROM
+        msg['To'] = to_email
+        
+        msg.attach(MIMEText(text, 'plain'))
+        if html is not None:
+            msg.attach(MIMEText(html, 'html'))
+        return msg
     
     @staticmethod
-    def send_password_reset_email(to_email: str, reset_token: str) -> bool:
-        """Send a password reset email to the user.
+    def password_reset_email(reset_token: str) -> Tuple[str, str, str]:
+        """Build the password reset email.
         
         Args:
-            to_email: Recipient email address
             reset_token: Password reset token
             
         Returns:
-            True if email sent successfully, False otherwise
+            Tuple of (subject, plain-text body, HTML body)
         """
-        try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"{settings.APP_NAME} - Password Reset"
-            msg['From'] = settings.SMTP_FROM
-            msg['To'] = to_email
-            
-            # Create reset link
-            reset_link = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
-            
-            # Email body
-            text = f"""
+        subject = f"{settings.APP_NAME} - Password Reset"
+        
+        # Create reset link
+        reset_link = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
+        
+        # Email body
+        text = f"""
 Hello,
 
 You requested a password reset for your {settings.APP_NAME} account.
@@ -43,9 +61,9 @@ If you didn't request this, please ignore this email.
 
 Best regards,
 {settings.APP_NAME} Team
-            """
-            
-            html = f"""
+        """
+        
+        html = f"""
 <html>
   <body>
     <h2>{settings.APP_NAME} - Password Reset</h2>
@@ -58,26 +76,61 @@ Best regards,
     <p>Best regards,<br>{settings.APP_NAME} Team</p>
   </body>
 </html>
-            """
-            
-            # Attach parts
-            part1 = MIMEText(text, 'plain')
-            part2 = MIMEText(html, 'html')
-            msg.attach(part1)
-            msg.attach(part2)
-            
-            # Send email
-            if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
-                print("SMTP credentials not configured, skipping email send")
-                return False
-            
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(msg)
-            
-            return True
+        """
+        
+        return subject, text, html
+    
+    @staticmethod
+    def status_digest_email(changes: List[Dict[str, Any]]) -> Tuple[str, str, str]:
+        """Build a digest of package status changes.
+        
+        Args:
+            changes: One dict per package with tracking_number, description,
+                old_status and new_status
             
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            return False
+        Returns:
+            Tuple of (subject, plain-text body, HTML body)
+        """
+        count = len(changes)
+        subject = f"{settings.APP_NAME} - {count} package update{'s' if count != 1 else ''}"
+        
+        def label(change):
+            if change["description"]:
+                return f"{change['tracking_number']} ({change['description']})"
+            return change["tracking_number"]
+        
+        lines = [
+            f"- {label(c)}: {c['old_status'] or 'New'} -> {c['new_status']}"
+            for c in changes
+        ]
+        text = "Hello,\n\nThe following packages changed status:\n\n" + "\n".join(lines) + f"""
+
+See all your packages at {settings.FRONTEND_URL}
+
+Best regards,
+{settings.APP_NAME} Team
+"""
+        
+        rows = "".join(
+            f"<tr><td>{escape(label(c))}</td><td>{escape(c['old_status'] or 'New')}</td>"
+            f"<td>{escape(c['new_status'])}</td></tr>"
+            for c in changes
+        )
+        html = f"""
+<html>
+  <body>
+    <h2>{settings.APP_NAME} - Package updates</h2>
+    <p>Hello,</p>
+    <p>The following packages changed status:</p>
+    <table>
+      <tr><th>Package</th><th>From</th><th>To</th></tr>
+      {rows}
+    </table>
+    <p><a href="{settings.FRONTEND_URL}">See all your packages</a></p>
+    <br>
+    <p>Best regards,<br>{settings.APP_NAME} Team</p>
+  </body>
+</html>
+        """
+        
+        return subject, text, html
@@ -0,0 +1,132 @@
+"""Status change notifications, merged into one digest email per user.
+
+Transitions are recorded as tracking detects them. A background worker waits
+until a user's oldest pending change is STATUS_DIGEST_WINDOW_SECONDS old, then
+merges all of that user's pending changes into a single email and queues it in
+the outbox, which delivers over the pooled SMTP connection.
+"""
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.core import metrics
+from app.core.background import BackgroundWorker
+from app.db.database import open_session
+from app.models.package import Package
+from app.models.status_change import StatusChange
+from app.models.user import User
+from app.services.email import EmailService
+from app.services.outbox import OutboxSender, enqueue_email, outbox_sender
+
+digests_total = metrics.counter(
+    "status_digests_total",
+    "Status digest emails queued",
+)
+changes_notified_total = metrics.counter(
+    "status_changes_notified_total",
+    "Status changes consumed by digests",
+)
+
+
+def record_status_change(db: AsyncSession, package: Package, old_status: Optional[str], new_status: Optional[str]) -> Optional[StatusChange]:
+    """Record a transition for the next digest; no-op if the status did not change."""
+    if not settings.STATUS_NOTIFICATIONS_ENABLED or new_status is None or new_status == old_status:
+        return None
+    change = StatusChange(
+        user_id=package.user_id,
+        package_id=package.id,
+        old_status=old_status,
+        new_status=new_status,
+        changed_at=time.time(),
+    )
+    db.add(change)
+    return change
+
+
+def merge_changes(changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse each package's transitions (in order) into first old -> last new status."""
+    merged: Dict[int, Dict[str, Any]] = {}
+    for change in changes:
+        entry = merged.get(change["package_id"])
+        if entry is None:
+            merged[change["package_id"]] = dict(change)
+        else:
+            entry["new_status"] = change["new_status"]
+    # A package that went back to where it started has nothing to report
+    return [entry for entry in merged.values() if entry["old_status"] != entry["new_status"]]
+
+
+class DigestBuilder(BackgroundWorker):
+    """Background task turning pending status changes into digest emails."""
+
+    name = "Status digest"
+
+    def __init__(self, sessionmaker: async_sessionmaker, outbox: OutboxSender):
+        super().__init__()
+        self._sessionmaker = sessionmaker
+        self._outbox = outbox
+
+    @property
+    def poll_interval(self) -> float:
+        return settings.STATUS_DIGEST_POLL_INTERVAL
+
+    @property
+    def batch_size(self) -> int:
+        return settings.STATUS_DIGEST_BATCH_USERS
+
+    async def run_once(self) -> int:
+        """Queue digests for users whose window has closed; return how many users were handled."""
+        now = time.time()
+        async with self._sessionmaker() as db:
+            due = await db.execute(
+                select(StatusChange.user_id)
+                .where(StatusChange.notified_at.is_(None))
+                .group_by(StatusChange.user_id)
+                .having(func.min(StatusChange.changed_at) <= now - settings.STATUS_DIGEST_WINDOW_SECONDS)
+                .limit(settings.STATUS_DIGEST_BATCH_USERS)
+            )
+            user_ids = due.scalars().all()
+            if not user_ids:
+                return 0
+
+            # Outer joins so changes of since-deleted packages are still consumed
+            result = await db.execute(
+                select(StatusChange, Package.tracking_number, Package.description, User.email, User.is_active)
+                .outerjoin(Package, Package.id == StatusChange.package_id)
+                .outerjoin(User, User.id == StatusChange.user_id)
+                .where(StatusChange.user_id.in_(user_ids), StatusChange.notified_at.is_(None))
+                .order_by(StatusChange.user_id, StatusChange.changed_at, StatusChange.id)
+                .with_for_update(of=StatusChange, skip_locked=True)
+            )
+
+            digests: Dict[int, Dict[str, Any]] = {}
+            for change, tracking_number, description, email, is_active in result.all():
+                change.notified_at = now
+                changes_notified_total.inc()
+                if tracking_number is None or not email or not is_active:
+                    continue
+                digest = digests.setdefault(change.user_id, {"email": email, "changes": []})
+                digest["changes"].append({
+                    "package_id": change.package_id,
+                    "tracking_number": tracking_number,
+                    "description": description,
+                    "old_status": change.old_status,
+                    "new_status": change.new_status,
+                })
+
+            queued = 0
+            for digest in digests.values():
+                changes = merge_changes(digest["changes"])
+                if changes:
+                    enqueue_email(db, digest["email"], *EmailService.status_digest_email(changes))
+                    queued += 1
+            await db.commit()
+
+        digests_total.inc(queued)
+        if queued:
+            self._outbox.notify()
+        return len(user_ids)
+
+
+digest_builder = DigestBuilder(open_session, outbox_sender)
@@ -0,0 +1,213 @@
+"""Transactional email outbox.
+
+Requests only insert a row into ``email_outbox`` and return. A background
+task in each worker delivers due messages in batches over one long-lived,
+authenticated SMTP connection and retries failures with exponential backoff.
+On PostgreSQL due rows are claimed with ``FOR UPDATE SKIP LOCKED``, so several
+workers can run senders without delivering a message twice.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.core import metrics
+from app.core.background import BackgroundWorker
+from app.db.database import open_session
+from app.models.email_outbox import EmailOutbox
+from app.services.email import EmailService
+
+if TYPE_CHECKING:
+    import smtplib
+    from email.message import Message
+
+logger = logging.getLogger(__name__)
+
+emails_sent_total = metrics.counter(
+    "email_outbox_sent_total",
+    "Emails delivered by the outbox sender",
+)
+email_failures_total = metrics.counter(
+    "email_outbox_failures_total",
+    "Failed email delivery attempts",
+    ("final",),
+)
+send_batch_seconds = metrics.histogram(
+    "email_outbox_send_batch_seconds",
+    "Time spent handing one batch of messages to SMTP",
+)
+messages_per_second = metrics.gauge(
+    "email_outbox_messages_per_second",
+    "Delivery throughput of the most recent outbox batch",
+)
+smtp_connections_opened_total = metrics.counter(
+    "smtp_connections_opened_total",
+    "SMTP connections opened (including STARTTLS and login)",
+)
+
+def enqueue_email(db: AsyncSession, to_email: str, subject: str, text: str, html: Optional[str] = None) -> EmailOutbox:
+    """Queue an email for background delivery; it is sent once the caller commits."""
+    message = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        text_body=text,
+        html_body=html,
+        status="pending",
+        attempts=0,
+        next_attempt_at=time.time(),
+    )
+    db.add(message)
+    return message
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before the next attempt after ``attempts`` failures."""
+    return min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+
+
+class SmtpConnection:
+    """A reusable SMTP connection, reopened when idle too long or dropped.
+
+    Methods block and are called from a worker thread.
+    """
+
+    def __init__(self):
+        self._smtp: Optional["smtplib.SMTP"] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        # smtplib is imported here, on the first delivery, rather than at worker boot
+        import smtplib
+
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if settings.SMTP_USE_TLS:
+                smtp.starttls()
+            if settings.SMTP_USER:
+                smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        smtp_connections_opened_total.inc()
+        self._smtp = smtp
+
+    def _close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def send_many(self, messages: List["Message"]) -> List[Optional[Exception]]:
+        """Send messages in order; return the error for each one (None if sent)."""
+        import smtplib
+
+        # Errors for a single message; anything else means the connection is unusable
+        message_errors = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+        results: List[Optional[Exception]] = []
+        with self._lock:
+            if self._smtp is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_SECONDS:
+                self._close()
+            for index, message in enumerate(messages):
+                try:
+                    if self._smtp is None:
+                        self._connect()
+                    try:
+                        self._smtp.send_message(message)
+                    except smtplib.SMTPServerDisconnected:
+                        # The server dropped the pooled connection; reconnect once
+                        self._smtp = None
+                        self._connect()
+                        self._smtp.send_message(message)
+                    self._last_used = time.monotonic()
+                    results.append(None)
+                except message_errors as e:
+                    results.append(e)
+                except Exception as e:
+                    # Connection-level failure: don't retry it for every message in the batch
+                    self._close()
+                    results.extend([e] * (len(messages) - index))
+                    break
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+class OutboxSender(BackgroundWorker):
+    """Background task delivering queued emails."""
+
+    name = "Email outbox"
+
+    def __init__(self, sessionmaker: async_sessionmaker):
+        super().__init__()
+        self._sessionmaker = sessionmaker
+        self.connection = SmtpConnection()
+
+    @property
+    def poll_interval(self) -> float:
+        return settings.EMAIL_OUTBOX_POLL_INTERVAL
+
+    @property
+    def batch_size(self) -> int:
+        return settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    async def run_once(self) -> int:
+        """Deliver one batch of due messages; return how many were attempted."""
+        now = time.time()
+        async with self._sessionmaker() as db:
+            result = await db.execute(
+                select(EmailOutbox)
+                .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+                .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            if not messages:
+                return 0
+
+            mime_messages = [
+                EmailService.build_message(m.to_email, m.subject, m.text_body, m.html_body)
+                for m in messages
+            ]
+            started = time.perf_counter()
+            errors = await asyncio.to_thread(self.connection.send_many, mime_messages)
+            elapsed = time.perf_counter() - started
+            send_batch_seconds.observe(elapsed)
+            sent = errors.count(None)
+            messages_per_second.set(sent / elapsed if elapsed > 0 else 0.0)
+
+            for message, error in zip(messages, errors):
+                message.attempts += 1
+                if error is None:
+                    message.status = "sent"
+                    message.sent_at = datetime.now(timezone.utc)
+                    message.last_error = None
+                    emails_sent_total.inc()
+                    continue
+                message.last_error = str(error)[:500]
+                final = message.attempts >= settings.EMAIL_MAX_ATTEMPTS
+                if final:
+                    message.status = "failed"
+                    logger.error("Giving up on email %s to %s: %s", message.id, message.to_email, error)
+                else:
+                    message.next_attempt_at = now + retry_delay(message.attempts)
+                email_failures_total.inc(final=str(final).lower())
+            await db.commit()
+        return len(messages)
+
+    async def stop(self) -> None:
+        await super().stop()
+        await asyncio.to_thread(self.connection.close)
+
+
+outbox_sender = OutboxSender(open_session)
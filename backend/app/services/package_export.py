@@ -0,0 +1,97 @@
+"""Streaming export of packages as NDJSON or CSV.
+
+Rows are read through a server-side cursor (``stream`` + ``yield_per``) and
+serialized one batch at a time, so memory use does not grow with the number
+of packages exported.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.package import Package
+
+EXPORT_COLUMNS = (
+    "id", "tracking_number", "carrier", "description", "status",
+    "last_location", "tracking_data", "created_at", "updated_at",
+)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _tracking_data(value: Any) -> Any:
+    # Tracking responses are stored as JSON-encoded strings; export them as objects
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _ndjson_batch(rows) -> str:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["tracking_data"] = _tracking_data(record["tracking_data"])
+        lines.append(json.dumps(record, default=lambda value: value.isoformat()))
+    return "\n".join(lines) + "\n"
+
+
+def _csv_batch(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        values = list(row)
+        tracking_data = _tracking_data(values[6])
+        values[6] = json.dumps(tracking_data) if tracking_data is not None else ""
+        values[7:] = [value.isoformat() if value is not None else "" for value in values[7:]]
+        writer.writerow(values)
+    return buffer.getvalue()
+
+
+async def export_packages(
+    session_factory: Callable[[], AsyncSession],
+    user_id: int,
+    export_format: str,
+    status: Optional[str] = None,
+    read_session: Optional[Callable[[], Awaitable[Optional[AsyncSession]]]] = None,
+) -> AsyncIterator[str]:
+    """Yield the user's packages as NDJSON or CSV text chunks.
+
+    The session is opened here rather than taken from a request dependency,
+    because dependencies are closed before a streaming response is sent, and
+    only once the stream starts, so the generator owns it: ``read_session``
+    (a replica, or None) is tried first, then ``session_factory``.
+    """
+    statement = (
+        select(*(getattr(Package, column) for column in EXPORT_COLUMNS))
+        .where(Package.user_id == user_id)
+        .order_by(Package.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    if status is not None:
+        statement = statement.where(Package.status == status)
+
+    db = await read_session() if read_session is not None else None
+    if db is None:
+        db = session_factory()
+    async with db:
+        result = await db.stream(statement)
+        if export_format == "csv":
+            header = True
+            async for rows in result.partitions():
+                yield _csv_batch(rows, header)
+                header = False
+            if header:
+                yield _csv_batch([], header)
+        else:
+            async for rows in result.partitions():
+                yield _ndjson_batch(rows)
@@ -0,0 +1,288 @@
+"""Bulk import of packages from CSV or NDJSON uploads.
+
+Uploads are parsed incrementally as chunks arrive, validated against the
+carrier catalog, de-duplicated against the file itself and the user's existing
+packages, and inserted with set-based statements (multi-row INSERT, or COPY on
+PostgreSQL) one batch at a time.
+"""
+import codecs
+import csv
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.package import Package
+from app.strategies import keydelivery
+
+IMPORT_COLUMNS = ("tracking_number", "carrier", "description")
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed at all (bad header, unknown format, too many rows)."""
+
+
+class MultipartFile:
+    """One file field of a ``multipart/form-data`` body, streamed as it arrives.
+
+    ``request.form()`` spools the whole upload before the handler sees it.
+    This feeds the body to python-multipart chunk by chunk instead, so a
+    multipart import is parsed as incrementally as a raw-body one.
+    """
+
+    def __init__(self, body: AsyncIterator[bytes], content_type: str, field_name: str = "file"):
+        self._body = body.__aiter__()
+        self._content_type = content_type
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._parser = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._found = False
+        self._in_field = False
+        self._field_done = False
+        self._pending: Deque[bytes] = deque()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        from multipart.multipart import parse_options_header
+
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Like request.form(), a part without a filename is a plain field, not a file
+        if self._found or options.get(b"name", b"").decode("latin-1") != self.field_name or b"filename" not in options:
+            return
+        self._found = self._in_field = True
+        self.filename = options[b"filename"].decode("utf-8", errors="replace")
+        content_type = self._headers.get(b"content-type")
+        self.content_type = content_type.decode("latin-1") if content_type is not None else None
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._pending.append(bytes(data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_done = True
+
+    async def open(self) -> bool:
+        """Read up to the start of the file's data; False if the body has no such file field."""
+        from multipart.multipart import MultipartParser, parse_options_header
+
+        _, options = parse_options_header(self._content_type)
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise ImportFormatError("Multipart upload without a boundary")
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        async for chunk in self._body:
+            self._write(chunk)
+            if self._found:
+                return True
+        return False
+
+    def _write(self, chunk: bytes) -> None:
+        try:
+            self._parser.write(chunk)
+        except ValueError as e:
+            raise ImportFormatError(f"Malformed multipart body: {e}")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The file's data; the rest of the body after it is not read."""
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if self._field_done:
+                return
+            try:
+                chunk = await self._body.__anext__()
+            except StopAsyncIteration:
+                return
+            self._write(chunk)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode UTF-8 byte chunks and yield complete lines without the newline."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (row number, record, error) for each CSV data row.
+
+    The first line is the header. Quoted fields may span lines.
+    """
+    header: Optional[List[str]] = None
+    pending = ""
+    row_number = 0
+    async for line in lines:
+        pending = f"{pending}\n{line}" if pending else line
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            if "tracking_number" not in header:
+                raise ImportFormatError("CSV header must include a tracking_number column")
+            continue
+        row_number += 1
+        yield row_number, dict(zip(header, values)), None
+    if pending:
+        row_number += 1
+        yield row_number, None, "Unterminated quoted field"
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yield (row number, record, error) for each non-empty NDJSON line."""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def validate_record(record: Dict[str, Any], supported_carriers: frozenset) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Normalize one record into Package column values, or return an error."""
+    tracking_number = str(record.get("tracking_number") or "").strip()
+    carrier = str(record.get("carrier") or "auto").strip().lower()
+    description = record.get("description")
+    if description is not None:
+        description = str(description).strip() or None
+
+    if not keydelivery.validate_tracking_number(tracking_number):
+        return None, "Invalid tracking number format"
+    if len(tracking_number) > 255:
+        return None, "Tracking number too long"
+    if carrier != "auto" and carrier not in supported_carriers:
+        return None, f"Unsupported carrier: {carrier}"
+    if description is not None and len(description) > 500:
+        return None, "Description too long"
+
+    return {"tracking_number": tracking_number, "carrier": carrier, "description": description}, None
+
+
+async def _existing_tracking_numbers(db: AsyncSession, user_id: int, tracking_numbers: List[str]) -> Set[str]:
+    result = await db.execute(
+        select(Package.tracking_number).where(
+            Package.user_id == user_id,
+            Package.tracking_number.in_(tracking_numbers)
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def _insert_batch(db: AsyncSession, user_id: int, rows: List[Dict[str, Any]]) -> None:
+    if db.get_bind().dialect.name == "postgresql" and len(rows) >= settings.IMPORT_COPY_MIN_ROWS:
+        # COPY is the fastest bulk path on PostgreSQL; it runs inside the session's transaction
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Package.__tablename__,
+            columns=["user_id", *IMPORT_COLUMNS],
+            records=[(user_id, row["tracking_number"], row["carrier"], row["description"]) for row in rows],
+        )
+    else:
+        await db.execute(insert(Package), [{"user_id": user_id, **row} for row in rows])
+
+
+async def import_packages(
+    db: AsyncSession,
+    user_id: int,
+    records: AsyncIterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+    supported_carriers: frozenset,
+) -> Dict[str, Any]:
+    """Validate, de-duplicate and insert records batch by batch; return the report."""
+    report_rows: List[Dict[str, Any]] = []
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    seen: Set[str] = set()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    def add_result(row_number, tracking_number, status, error=None):
+        counts[status] += 1
+        report_rows.append({
+            "row": row_number,
+            "tracking_number": tracking_number,
+            "status": status,
+            "error": error,
+        })
+
+    async def flush():
+        if not batch:
+            return
+        existing = await _existing_tracking_numbers(db, user_id, [row["tracking_number"] for _, row in batch])
+        to_insert = []
+        for row_number, row in batch:
+            if row["tracking_number"] in existing:
+                add_result(row_number, row["tracking_number"], "duplicate", "Package already exists")
+            else:
+                to_insert.append(row)
+                add_result(row_number, row["tracking_number"], "created")
+        if to_insert:
+            await _insert_batch(db, user_id, to_insert)
+        batch.clear()
+
+    async for row_number, record, error in records:
+        if row_number > settings.IMPORT_MAX_ROWS:
+            raise ImportFormatError(f"Too many rows (maximum {settings.IMPORT_MAX_ROWS})")
+        if record is not None:
+            row, error = validate_record(record, supported_carriers)
+        tracking_number = (record or {}).get("tracking_number")
+        if error:
+            add_result(row_number, str(tracking_number) if tracking_number is not None else None, "invalid", error)
+            continue
+        if row["tracking_number"] in seen:
+            add_result(row_number, row["tracking_number"], "duplicate", "Duplicate row in upload")
+            continue
+        seen.add(row["tracking_number"])
+        batch.append((row_number, row))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await flush()
+    await flush()
+    # One transaction for the whole upload: a fatal format error imports nothing
+    await db.commit()
+
+    report_rows.sort(key=lambda result: result["row"])
+    return {"total": len(report_rows), **counts, "rows": report_rows}
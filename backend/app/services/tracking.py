@@ -0,0 +1,120 @@
+"""Tracking served from stored snapshots, with stale-while-revalidate and stale-if-error.
+
+``Package.tracking_data`` holds the last successful KeyDelivery result and
+``tracking_updated_at`` when it was fetched. ``/track`` serves a snapshot
+younger than the requested max age as is. A snapshot up to
+TRACKING_STALE_WHILE_REVALIDATE_SECONDS past it is served flagged ``stale``
+while ``TrackingRefresher`` fetches a new one in the background. Otherwise
+the request goes upstream; if KeyDelivery fails, a snapshot no more than
+TRACKING_STALE_IF_ERROR_SECONDS past the max age is served flagged ``stale``
+instead of the error.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core import metrics
+from app.core.invalidation import invalidate
+from app.models.package import Package
+from app.services import notifications
+from app.strategies import keydelivery
+
+logger = logging.getLogger(__name__)
+
+snapshot_requests_total = metrics.counter(
+    "tracking_snapshot_requests_total",
+    "Track requests by how they were answered (fresh, stale, upstream, stale_if_error)",
+    ("result",),
+)
+refreshes_total = metrics.counter(
+    "tracking_background_refreshes_total",
+    "Background snapshot refreshes by outcome",
+    ("outcome",),
+)
+
+
+def load_snapshot(package: Package) -> Optional[Dict[str, Any]]:
+    """The stored tracking result, or None if the package was never tracked successfully."""
+    data = package.tracking_data
+    if data is None or package.tracking_updated_at is None:
+        return None
+    if isinstance(data, (str, bytes)):
+        # track_package stores the result serialized to a string
+        data = orjson.loads(data)
+    fetched_at = package.tracking_updated_at
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)  # SQLite drops the offset
+    return {**data, "fetched_at": fetched_at}
+
+
+def snapshot_age(snapshot: Dict[str, Any], now: datetime) -> float:
+    return (now - snapshot["fetched_at"]).total_seconds()
+
+
+async def fetch(package: Package) -> Dict[str, Any]:
+    """Track the package upstream (blocking HTTP call, run in the threadpool)."""
+    return await run_in_threadpool(keydelivery.track, package.tracking_number, package.carrier)
+
+
+def apply_result(db: AsyncSession, package: Package, tracking_info: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Store a successful result as the package's snapshot; the caller commits."""
+    new_status = tracking_info.get("status")
+    notifications.record_status_change(db, package, package.status, new_status)
+    package.status = new_status
+    package.last_location = tracking_info.get("location")
+    package.tracking_data = json.dumps(tracking_info)
+    package.tracking_updated_at = now
+    return {**tracking_info, "fetched_at": now}
+
+
+class TrackingRefresher:
+    """Refreshes stale snapshots in background tasks, at most one per package at a time."""
+
+    def __init__(self):
+        self._in_flight: Set[int] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def schedule(self, sessionmaker: async_sessionmaker, package_id: int) -> bool:
+        """Start a refresh unless one is already running for the package."""
+        if package_id in self._in_flight:
+            refreshes_total.inc(outcome="deduplicated")
+            return False
+        self._in_flight.add(package_id)
+        task = asyncio.get_running_loop().create_task(self._refresh(sessionmaker, package_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _refresh(self, sessionmaker: async_sessionmaker, package_id: int) -> None:
+        try:
+            # The request's session is gone by now: use a session of our own
+            async with sessionmaker() as db:
+                package = (await db.execute(select(Package).where(Package.id == package_id))).scalars().first()
+                if package is None:
+                    return
+                tracking_info = await fetch(package)
+                if tracking_info.get("error") is not None:
+                    refreshes_total.inc(outcome="error")
+                    return
+                apply_result(db, package, tracking_info, datetime.now(timezone.utc))
+                await db.commit()
+                await invalidate(db, f"package:{package_id}")
+                refreshes_total.inc(outcome="ok")
+        except Exception:
+            refreshes_total.inc(outcome="error")
+            logger.exception("Background tracking refresh of package %s failed", package_id)
+        finally:
+            self._in_flight.discard(package_id)
+
+    async def drain(self) -> None:
+        """Wait for running refreshes, e.g. on shutdown."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+tracking_refresher = TrackingRefresher()
@@ -3,15 +3,40 @@ KeyDelivery tracking service.
 
 This module provides tracking functionality using the KeyDelivery (kd100.com) API.
 """
-import requests
 import json
 import hashlib
+import logging
+import time
 from typing import Dict, Any, List, Optional
 from app.core.config import settings
+from app.core import metrics, tracing
 
+logger = logging.getLogger(__name__)
 
-DETECT_URL = "https://www.kd100.com/api/v1/carriers/detect"
-TRACK_URL = "https://www.kd100.com/api/v1/tracking/realtime"
+request_seconds = metrics.histogram(
+    "keydelivery_request_seconds",
+    "KeyDelivery API call latency",
+    ("endpoint",),
+)
+responses_total = metrics.counter(
+    "keydelivery_responses_total",
+    "KeyDelivery API calls by HTTP status code (or exception name) and carrier",
+    ("endpoint", "carrier", "status"),
+)
+errors_total = metrics.counter(
+    "keydelivery_errors_total",
+    "Failed KeyDelivery lookups by carrier and reason",
+    ("endpoint", "carrier", "reason"),
+)
+
+
+def __getattr__(name: str):
+    # requests (with urllib3 and certifi) is imported on the first API call,
+    # not at worker boot; ``keydelivery.requests`` still resolves to it
+    if name == "requests":
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _generate_signature(body: str) -> str:
@@ -23,8 +48,10 @@ def _generate_signature(body: str) -> str:
     return hashlib.md5(signature_string.encode()).hexdigest().upper()
 
 
-def _make_request(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+def _make_request(url: str, payload: Dict[str, Any], endpoint: str = "other") -> Dict[str, Any]:
     """Make authenticated request to KeyDelivery API."""
+    import requests
+
     api_key = settings.KD100_APIKEY
     secret = settings.KD100_SECRET
     
@@ -40,9 +67,23 @@ def _make_request(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         "signature": signature
     }
     
-    response = requests.post(url, data=body, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    carrier = payload.get("carrier_id", "")
+    with tracing.span(f"keydelivery.{endpoint}", **{"http.url": url, "carrier": carrier}) as span:
+        # Propagate the trace to the upstream call
+        tracing.inject_headers(headers)
+        started = time.perf_counter()
+        try:
+            response = requests.post(url, data=body, headers=headers)
+        except Exception as e:
+            responses_total.inc(endpoint=endpoint, carrier=carrier, status=type(e).__name__)
+            raise
+        finally:
+            request_seconds.observe(time.perf_counter() - started, endpoint=endpoint)
+        responses_total.inc(endpoint=endpoint, carrier=carrier, status=str(response.status_code))
+        if span is not None:
+            span.set_attribute("http.status_code", response.status_code)
+        response.raise_for_status()
+        return response.json()
 
 
 def detect_carrier(tracking_number: str) -> List[Dict[str, str]]:
@@ -57,14 +98,16 @@ def detect_carrier(tracking_number: str) -> List[Dict[str, str]]:
     """
     try:
         payload = {"tracking_number": tracking_number}
-        result = _make_request(DETECT_URL, payload)
+        result = _make_request(settings.KD100_DETECT_URL, payload, endpoint="detect")
         
         if result.get("code") == 200:
             return result.get("data", [])
         else:
+            errors_total.inc(endpoint="detect", carrier="", reason=f"api_{result.get('code')}")
             return []
     except Exception as e:
-        print(f"Carrier detection error: {e}")
+        errors_total.inc(endpoint="detect", carrier="", reason=type(e).__name__)
+        logger.warning("Carrier detection error: %s", e)
         return []
 
 
@@ -116,9 +159,10 @@ def track(tracking_number: str, carrier_code: str) -> Dict[str, Any]:
             "tracking_number": tracking_number
         }
         
-        result = _make_request(TRACK_URL, payload)
+        result = _make_request(settings.KD100_TRACK_URL, payload, endpoint="track")
         
         if result.get("code") != 200:
+            errors_total.inc(endpoint="track", carrier=carrier_code, reason=f"api_{result.get('code')}")
             return {
                 "status": "error",
                 "location": None,
@@ -168,6 +212,8 @@ def track(tracking_number: str, carrier_code: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
+        errors_total.inc(endpoint="track", carrier=carrier_code, reason=type(e).__name__)
+        logger.warning("Tracking error for carrier %s: %s", carrier_code, e)
         return {
             "status": "error",
             "location": None,
@@ -0,0 +1,113 @@
+"""Tests for API key authentication."""
+from fastapi import status
+from app.core.security import hash_api_key, verify_api_key_hash
+from app.models.api_key import ApiKey
+from app.api.deps import _authenticate_api_key
+
+
+def _create_key(authenticated_client, scopes=None):
+    body = {"name": "integration"}
+    if scopes is not None:
+        body["scopes"] = scopes
+    response = authenticated_client.post("/api/auth/api-keys", json=body)
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+def test_api_key_hash_roundtrip():
+    """Test keyed hashing and constant-time verification."""
+    key_hash = hash_api_key("pt_example")
+    assert len(key_hash) == 64
+    assert verify_api_key_hash("pt_example", key_hash) is True
+    assert verify_api_key_hash("pt_other", key_hash) is False
+
+
+def test_create_api_key_stores_only_hash(authenticated_client, db):
+    """Test that the plain key is returned once and only its hash is stored."""
+    data = _create_key(authenticated_client)
+    assert data["key"].startswith("pt_")
+    assert data["scopes"] == ["read", "track"]
+
+    stored = db.query(ApiKey).one()
+    assert stored.key_hash == hash_api_key(data["key"])
+    assert data["key"] not in (stored.key_hash, stored.prefix)
+
+    listed = authenticated_client.get("/api/auth/api-keys").json()
+    assert [key["id"] for key in listed] == [data["id"]]
+    assert "key" not in listed[0]
+
+
+def test_create_api_key_invalid_scope(authenticated_client):
+    """Test that unknown scopes are rejected."""
+    response = authenticated_client.post(
+        "/api/auth/api-keys", json={"name": "bad", "scopes": ["admin"]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_api_key_can_read_packages(authenticated_client, client):
+    """Test that an API key authenticates read endpoints."""
+    key = _create_key(authenticated_client)["key"]
+    authenticated_client.post(
+        "/api/packages/",
+        json={"tracking_number": "AB123456789ES", "carrier": "spain_correos_es"}
+    )
+
+    response = client.get("/api/packages/", headers={"X-API-Key": key, "Authorization": ""})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
+
+
+def test_api_key_cannot_write(authenticated_client, client):
+    """Test that API keys are limited to read/track operations."""
+    key = _create_key(authenticated_client)["key"]
+    response = client.post(
+        "/api/packages/",
+        json={"tracking_number": "AB123456789ES", "carrier": "spain_correos_es"},
+        headers={"X-API-Key": key, "Authorization": ""}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_api_key_scope_enforced(authenticated_client, client):
+    """Test that a read-only key cannot call the track endpoint."""
+    key = _create_key(authenticated_client, scopes=["read"])["key"]
+    package_id = authenticated_client.post(
+        "/api/packages/",
+        json={"tracking_number": "AB123456789ES", "carrier": "spain_correos_es"}
+    ).json()["id"]
+
+    headers = {"X-API-Key": key, "Authorization": ""}
+    assert client.get(f"/api/packages/{package_id}", headers=headers).status_code == status.HTTP_200_OK
+    response = client.get(f"/api/packages/{package_id}/track", headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_invalid_api_key_rejected(client):
+    """Test that an unknown API key is rejected."""
+    response = client.get("/api/packages/", headers={"X-API-Key": "pt_unknown"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_api_key_lookup_is_cached(authenticated_client, client):
+    """Test that repeated requests with the same key skip the key lookup query."""
+    key = _create_key(authenticated_client)["key"]
+    headers = {"X-API-Key": key, "Authorization": ""}
+    assert client.get("/api/packages/", headers=headers).status_code == status.HTTP_200_OK
+
+    # Served from the cache: no database session is needed
+    user, scopes = await _authenticate_api_key(None, key)
+    assert user.username == "testuser"
+    assert scopes == frozenset({"read", "track"})
+
+
+def test_revoked_api_key_rejected(authenticated_client, client):
+    """Test that revoking a key evicts it from the cache immediately."""
+    data = _create_key(authenticated_client)
+    headers = {"X-API-Key": data["key"], "Authorization": ""}
+    assert client.get("/api/packages/", headers=headers).status_code == status.HTTP_200_OK
+
+    response = authenticated_client.delete(f"/api/auth/api-keys/{data['id']}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    assert client.get("/api/packages/", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,40 @@
+"""Tests for the benchmark report helpers."""
+from benchmarks.report import compare, percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles."""
+    samples = [i / 1000 for i in range(1, 101)]
+    assert percentile(samples, 50) == 0.05
+    assert percentile(samples, 95) == 0.095
+    assert percentile(samples, 99) == 0.099
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize():
+    """Test that summaries are reported in milliseconds and requests per second."""
+    summary = summarize([0.01, 0.02, 0.03, 0.04], wall_seconds=0.5, concurrency=2, errors=1)
+    assert summary["requests"] == 4
+    assert summary["errors"] == 1
+    assert summary["p50_ms"] == 20.0
+    assert summary["p99_ms"] == 40.0
+    assert summary["mean_ms"] == 25.0
+    assert summary["throughput_rps"] == 8.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Test that slower p95, lower throughput and new errors are flagged."""
+    base = {"p95_ms": 10.0, "throughput_rps": 100.0, "errors": 0}
+    baseline = {"scenarios": {"fast": base, "slow": base, "broken": base, "gone": base}}
+    results = {"scenarios": {
+        "fast": {"p95_ms": 12.0, "throughput_rps": 90.0, "errors": 0},
+        "slow": {"p95_ms": 13.0, "throughput_rps": 70.0, "errors": 0},
+        "broken": {"p95_ms": 10.0, "throughput_rps": 100.0, "errors": 3},
+        "new": {"p95_ms": 99.0, "throughput_rps": 1.0, "errors": 0},
+    }}
+
+    regressions = compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("slow: p95 13.0 ms")
+    assert regressions[1].startswith("slow: throughput 70.0 req/s")
+    assert regressions[2] == "broken: 3 errors (baseline 0)"
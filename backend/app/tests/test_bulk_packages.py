@@ -0,0 +1,116 @@
+"""Tests for bulk package update and delete."""
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+from app.core.security import get_password_hash
+from app.models.package import Package
+from app.models.user import User
+
+
+def _seed(db, user, *rows):
+    packages = [Package(user_id=user.id, carrier="gls", **row) for row in rows]
+    db.add_all(packages)
+    db.commit()
+    return [package.id for package in packages]
+
+
+def _other_user(db):
+    user = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=get_password_hash("otherpassword123"),
+        is_active=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_bulk_delete_by_status_and_age(authenticated_client, db, test_user):
+    """Test deleting delivered packages older than a number of days."""
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    _seed(
+        db, test_user,
+        {"tracking_number": "AB000000001", "status": "Delivered", "created_at": old},
+        {"tracking_number": "AB000000002", "status": "Delivered"},
+        {"tracking_number": "AB000000003", "status": "In transit", "created_at": old},
+    )
+    other = _other_user(db)
+    _seed(db, other, {"tracking_number": "AB000000004", "status": "Delivered", "created_at": old})
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-delete",
+        json={"status": "Delivered", "older_than_days": 30}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"affected": 1}
+
+    remaining = {p.tracking_number for p in db.query(Package).all()}
+    assert remaining == {"AB000000002", "AB000000003", "AB000000004"}
+
+
+def test_bulk_delete_by_ids_is_scoped_to_user(authenticated_client, db, test_user):
+    """Test that ids belonging to other users are ignored."""
+    own_ids = _seed(db, test_user, {"tracking_number": "AB000000001"}, {"tracking_number": "AB000000002"})
+    other_ids = _seed(db, _other_user(db), {"tracking_number": "AB000000003"})
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-delete",
+        json={"ids": own_ids + other_ids}
+    )
+    assert response.json() == {"affected": 2}
+    assert [p.tracking_number for p in db.query(Package).all()] == ["AB000000003"]
+
+
+def test_bulk_update(authenticated_client, db, test_user):
+    """Test updating matching packages in one request."""
+    ids = _seed(
+        db, test_user,
+        {"tracking_number": "AB000000001", "status": "Delivered"},
+        {"tracking_number": "AB000000002", "status": "Delivered"},
+        {"tracking_number": "AB000000003", "status": "In transit"},
+    )
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-update",
+        json={"filter": {"status": "Delivered"}, "description": "Archived", "carrier": "DHLEN"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"affected": 2}
+
+    db.expire_all()
+    packages = {p.id: p for p in db.query(Package).all()}
+    assert [packages[i].description for i in ids] == ["Archived", "Archived", None]
+    assert packages[ids[0]].carrier == "dhlen"
+    assert packages[ids[0]].updated_at is not None
+
+
+def test_bulk_operations_require_filter(authenticated_client, db, test_user):
+    """Test that an empty filter is rejected instead of matching everything."""
+    _seed(db, test_user, {"tracking_number": "AB000000001"})
+
+    response = authenticated_client.post("/api/packages/bulk-delete", json={})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-update",
+        json={"filter": {}, "description": "Archived"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert db.query(Package).count() == 1
+
+
+def test_bulk_update_validation(authenticated_client, db, test_user):
+    """Test that bulk updates need a supported carrier and at least one value."""
+    _seed(db, test_user, {"tracking_number": "AB000000001"})
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-update",
+        json={"filter": {"carrier": "gls"}, "carrier": "not_a_carrier"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-update",
+        json={"filter": {"carrier": "gls"}}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
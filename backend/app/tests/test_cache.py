@@ -0,0 +1,182 @@
+"""Tests for the cache abstraction and its backends."""
+import asyncio
+import pytest
+from app.core import cache as cache_module
+from app.core.cache import (
+    Cache, DatabaseCacheBackend, MemoryCacheBackend, RedisCacheBackend, errors_total, hits_total, misses_total
+)
+from app.core.config import settings
+from conftest import TestingAsyncSessionLocal
+from tools.resp_server import RespStore, start_server
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+async def resp_server():
+    server = await start_server()
+    yield server
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.fixture
+async def redis_backend(resp_server):
+    host, port = resp_server.sockets[0].getsockname()[:2]
+    backend = RedisCacheBackend(f"redis://{host}:{port}/0")
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def database_backend(db):
+    return DatabaseCacheBackend(TestingAsyncSessionLocal)
+
+
+@pytest.fixture(params=["memory", "database", "redis"])
+async def any_backend(request, db):
+    """(tier name, backend) for each backend; None lets the cache use its own memory backend."""
+    if request.param == "memory":
+        yield "memory", None
+    elif request.param == "database":
+        yield "database", DatabaseCacheBackend(TestingAsyncSessionLocal)
+    else:
+        server = await start_server()
+        host, port = server.sockets[0].getsockname()[:2]
+        backend = RedisCacheBackend(f"redis://{host}:{port}/0")
+        yield "redis", backend
+        backend.close()
+        server.close()
+        await server.wait_closed()
+
+
+async def _check_backend(backend, clock):
+    await backend.set("pt:ns:a", b"1", 10)
+    await backend.set("pt:ns:b", b"2", 10)
+    await backend.set("pt:other:a", b"3", 10)
+    assert await backend.get("pt:ns:a") == b"1"
+    await backend.set("pt:ns:a", b"4", 10)
+    assert await backend.get("pt:ns:a") == b"4"
+    await backend.delete("pt:ns:b")
+    assert await backend.get("pt:ns:b") is None
+    await backend.clear("pt:ns:")
+    assert await backend.get("pt:ns:a") is None
+    assert await backend.get("pt:other:a") == b"3"
+
+
+async def test_memory_backend():
+    """Test get/set/delete/clear and TTL expiry of the in-process backend."""
+    clock = FakeClock()
+    backend = MemoryCacheBackend(100, clock)
+    await _check_backend(backend, clock)
+    await backend.set("k", b"v", 5)
+    clock.now += 5
+    assert await backend.get("k") is None
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    """Test that the LRU keeps at most max_entries, dropping the least recently read."""
+    backend = MemoryCacheBackend(2)
+    await backend.set("a", b"1", 60)
+    await backend.set("b", b"2", 60)
+    await backend.get("a")
+    await backend.set("c", b"3", 60)
+    assert await backend.get("b") is None
+    assert await backend.get("a") == b"1"
+    assert len(backend) == 2
+
+
+async def test_database_backend(database_backend):
+    """Test the shared table backend, including upserts and expiry."""
+    clock = FakeClock()
+    database_backend.clock = clock
+    await _check_backend(database_backend, clock)
+    await database_backend.set("k", b"v", 5)
+    clock.now += 5
+    assert await database_backend.get("k") is None
+
+
+async def test_redis_backend(redis_backend, resp_server):
+    """Test the Redis-protocol backend against the local stand-in."""
+    await _check_backend(redis_backend, None)
+    await redis_backend.set("k", b"v", 0.05)
+    assert await redis_backend.get("k") == b"v"
+    await asyncio.sleep(0.06)
+    assert await redis_backend.get("k") is None
+    # Connections are reused
+    assert len(redis_backend._idle) == 1
+
+
+async def test_same_semantics_on_every_backend(any_backend):
+    """Test that values round-trip identically whatever the backend."""
+    kind, backend = any_backend
+    cache = Cache("test", backend=backend)
+    value = {"user_id": 1, "scopes": ("read", "track"), "name": "ñ", "ratio": 0.5, "none": None}
+    assert await cache.get("key") is None
+    await cache.set("key", value, 60)
+    assert await cache.get("key") == {**value, "scopes": ["read", "track"]}
+    await cache.delete("key")
+    assert await cache.get("key") is None
+    assert misses_total.value(cache="test") == 2
+    assert hits_total.value(cache="test", tier=kind) == 1
+
+
+async def test_backend_selected_from_settings(monkeypatch, database_backend):
+    """Test that CACHE_BACKEND picks the backend at call time."""
+    monkeypatch.setattr(cache_module, "_shared_backends", {("database", ""): database_backend})
+    cache = Cache("switch")
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "database")
+    await cache.set("key", [1, 2], 60)
+    assert await database_backend.get(cache.key("key")) == b"[1,2]"
+    monkeypatch.setattr(settings, "CACHE_BACKEND", "memory")
+    assert await cache.get("key") is None
+
+
+async def test_near_cache(redis_backend, resp_server):
+    """Test that the near tier serves repeated reads and bounds staleness by its TTL."""
+    first = Cache("near", backend=redis_backend, near_ttl=0.05)
+    second = Cache("near", backend=redis_backend, near_ttl=0.05)
+    await first.set("key", "v1", 60)
+    assert await second.get("key") == "v1"
+    commands = resp_server.store.commands
+    assert await second.get("key") == "v1"
+    assert resp_server.store.commands == commands
+    assert hits_total.value(cache="near", tier="near") == 1
+
+    await first.set("key", "v2", 60)
+    assert await second.get("key") == "v1"  # stale until the near TTL passes
+    await asyncio.sleep(0.06)
+    assert await second.get("key") == "v2"
+
+    await second.delete("key")
+    assert await second.get("key") is None
+
+
+async def test_backend_errors_are_misses():
+    """Test that an unreachable backend degrades to misses instead of raising."""
+    cache = Cache("down", backend=RedisCacheBackend("redis://127.0.0.1:1/0"))
+    await cache.set("key", "value", 60)
+    assert await cache.get("key") is None
+    await cache.delete("key")
+    assert errors_total.value(cache="down", operation="set") == 1
+    assert errors_total.value(cache="down", operation="get") == 1
+    assert misses_total.value(cache="down") == 1
+
+
+def test_resp_store_commands():
+    """Test the stand-in's command handling."""
+    clock = FakeClock()
+    store = RespStore(clock)
+    assert store.execute([b"SET", b"a", b"1", b"EX", b"10"]) == "OK"
+    assert store.execute([b"SET", b"b", b"2"]) == "OK"
+    assert store.execute([b"SCAN", b"0", b"MATCH", b"a*"]) == [b"0", [b"a"]]
+    clock.now += 10
+    assert store.execute([b"GET", b"a"]) is None
+    assert store.execute([b"DEL", b"a", b"b"]) == 1
+    assert isinstance(store.execute([b"NOPE"]), Exception)
@@ -0,0 +1,267 @@
+"""Tests for cross-worker cache invalidation."""
+import asyncio
+from datetime import timedelta
+from sqlalchemy import update
+from app.api.deps import user_cache
+from app.api.packages import package_cache
+from app.core import invalidation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import (
+    InvalidationListener, encode_payloads, handle_payload, invalidate, lag_seconds, listener_reconnects_total,
+    published_total, received_total
+)
+from app.core.security import create_access_token
+from app.models.package import Package
+from conftest import TestingAsyncSessionLocal
+
+
+class FakeBind:
+    class dialect:
+        name = "postgresql"
+
+
+class FakeSession:
+    """Records the statements ``invalidate`` sends on PostgreSQL."""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    def get_bind(self):
+        return FakeBind
+
+    async def execute(self, statement):
+        self.statements.append(statement.compile().params)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakeConnection:
+    def __init__(self):
+        self.listeners = {}
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def execute(self, query):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+def test_encode_payloads_splits_large_batches():
+    """Test that keys are packed into payloads below the NOTIFY size limit."""
+    keys = [f"package:{i}" for i in range(2000)]
+    payloads = encode_payloads(keys, 1.5)
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= invalidation.MAX_PAYLOAD_BYTES for payload in payloads)
+    assert [key for payload in payloads for key in payload.split("|", 1)[1].split("\n")] == keys
+    assert payloads[0].startswith("1.500000|")
+
+
+async def test_handle_payload_evicts_local_entries():
+    """Test that a notification evicts matching keys, or whole namespaces, in this worker."""
+    cache = Cache("inv")
+    await cache.set("a", 1, 60)
+    await cache.set("b", 2, 60)
+    other = Cache("inv-other")
+    await other.set("a", 3, 60)
+
+    assert handle_payload(encode_payloads(["inv:a", "unknown:x"], 0)[0]) == 2
+    assert await cache.get("a") is None
+    assert await cache.get("b") == 2
+    assert await other.get("a") == 3
+    handle_payload(encode_payloads(["inv:*"], 0)[0])
+    assert await cache.get("b") is None
+    assert received_total.value() == 3
+    assert lag_seconds.count() == 2
+
+
+async def test_invalidate_publishes_only_cached_namespaces(monkeypatch):
+    """Test that invalidate evicts here and sends one pg_notify per payload on PostgreSQL."""
+    cache = Cache("pub")
+    await cache.set("1", "old", 60)
+    db = FakeSession()
+    await invalidate(db, "pub:1", "nothing-caches-this:1")
+    assert await cache.get("1") is None
+    assert published_total.value() == 1
+    assert db.commits == 1
+    [params] = db.statements
+    channel, payload = params.values()
+    assert channel == settings.CACHE_INVALIDATION_CHANNEL
+    assert payload.endswith("|pub:1")
+
+    db = FakeSession()
+    await invalidate(db, "nothing-caches-this:2")
+    monkeypatch.setattr(settings, "CACHE_INVALIDATION_ENABLED", False)
+    await invalidate(db, "pub:1")
+    assert db.statements == []
+
+
+async def test_invalidate_on_sqlite_is_local(async_db):
+    """Test that invalidation without PostgreSQL just evicts locally."""
+    cache = Cache("local")
+    await cache.set("1", "old", 60)
+    await invalidate(async_db, "local:1")
+    assert await cache.get("1") is None
+
+
+async def test_listener_evicts_and_resets_on_connect():
+    """Test that the listener drops local entries on connect and evicts notified keys."""
+    connection = FakeConnection()
+
+    async def connect():
+        return connection
+
+    cache = Cache("listen")
+    await cache.set("stale", 1, 60)
+    listener = InvalidationListener(connect)
+    listener.start()
+    try:
+        await asyncio.wait_for(listener.connected.wait(), 1)
+        assert await cache.get("stale") is None
+
+        await cache.set("a", 1, 60)
+        callback = connection.listeners[settings.CACHE_INVALIDATION_CHANNEL]
+        callback(connection, 1234, settings.CACHE_INVALIDATION_CHANNEL, encode_payloads(["listen:a"], 0)[0])
+        assert await cache.get("a") is None
+    finally:
+        await listener.stop()
+    assert connection.closed
+
+
+async def test_listener_reconnects():
+    """Test that connection failures are retried with backoff."""
+    attempts = []
+
+    async def connect():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise OSError("connection refused")
+        return FakeConnection()
+
+    listener = InvalidationListener(connect)
+    listener.min_backoff = 0.001
+    listener.start()
+    try:
+        await asyncio.wait_for(listener.connected.wait(), 1)
+    finally:
+        await listener.stop()
+    assert len(attempts) == 3
+    assert listener_reconnects_total.value() == 2
+
+
+def test_jwt_user_is_cached(client, test_user, auth_token):
+    """Test that the JWT user lookup is served from the cache after the first request."""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    first = client.get("/api/packages/", headers=headers)
+    second = client.get("/api/packages/", headers=headers)
+    assert second.status_code == 200
+    assert int(second.headers["x-db-query-count"]) == int(first.headers["x-db-query-count"]) - 1
+
+
+def test_password_reset_invalidates_cached_user(client, test_user, auth_token):
+    """Test that resetting a password evicts the user from the cache."""
+    client.get("/api/packages/", headers={"Authorization": f"Bearer {auth_token}"})
+    assert len(user_cache.memory) == 1
+
+    token = create_access_token({"sub": "testuser", "type": "password_reset"}, timedelta(minutes=5))
+    response = client.post("/api/auth/password-reset", json={"token": token, "new_password": "newpassword123"})
+    assert response.status_code == 200
+    assert len(user_cache.memory) == 0
+
+
+def _create_package(client):
+    response = client.post("/api/packages/", json={"tracking_number": "AB123456789ES", "carrier": "gls"})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_package_write_evicts_other_workers(authenticated_client):
+    """Test that a package update evicts the cached detail here and, via its notification, in other workers."""
+    package_id = _create_package(authenticated_client)
+    first = authenticated_client.get(f"/api/packages/{package_id}")
+    second = authenticated_client.get(f"/api/packages/{package_id}")
+    assert second.json() == first.json()
+    assert int(second.headers["x-db-query-count"]) == int(first.headers["x-db-query-count"]) - 1
+    assert len(package_cache.memory) == 1
+
+    response = authenticated_client.put(f"/api/packages/{package_id}", json={"description": "Updated"})
+    assert response.status_code == 200
+    assert published_total.value() == 1
+    assert authenticated_client.get(f"/api/packages/{package_id}").json()["description"] == "Updated"
+
+    # What the update sends to the other workers on PostgreSQL
+    db = FakeSession()
+    asyncio.run(invalidate(db, f"package:{package_id}"))
+    [params] = db.statements
+    _, payload = params.values()
+
+    other_worker = Cache("package")
+    asyncio.run(other_worker.set(str(package_id), {"user_id": 1, "body": "{}"}, 60))
+    handle_payload(payload)
+    assert asyncio.run(other_worker.get(str(package_id))) is None
+
+
+def test_bulk_update_clears_package_cache(authenticated_client):
+    """Test that bulk writes invalidate the whole package namespace."""
+    package_id = _create_package(authenticated_client)
+    authenticated_client.get(f"/api/packages/{package_id}")
+    assert len(package_cache.memory) == 1
+
+    response = authenticated_client.post(
+        "/api/packages/bulk-update", json={"filter": {"carrier": "gls"}, "description": "Bulk"}
+    )
+    assert response.json() == {"affected": 1}
+    assert len(package_cache.memory) == 0
+    assert authenticated_client.get(f"/api/packages/{package_id}").json()["description"] == "Bulk"
+
+
+def test_cached_package_is_not_served_to_other_users(authenticated_client):
+    """Test that a cached package still 404s for a user who does not own it."""
+    package_id = _create_package(authenticated_client)
+    authenticated_client.get(f"/api/packages/{package_id}")
+    asyncio.run(package_cache.set(str(package_id), {"user_id": 999, "body": "{}"}, 60))
+    assert authenticated_client.get(f"/api/packages/{package_id}").status_code == 404
+
+
+def test_write_during_package_miss_is_not_cached(authenticated_client, monkeypatch):
+    """Test that a package updated between a miss's read and its set is not cached with the old row."""
+    package_id = _create_package(authenticated_client)
+    cache_set = package_cache.set
+
+    async def update_then_set(key, value, ttl, generation=None):
+        # The miss has read the row; an update commits and invalidates before the set runs
+        async with TestingAsyncSessionLocal() as session:
+            await session.execute(update(Package).where(Package.id == package_id).values(description="Updated"))
+            await session.commit()
+            await invalidate(session, f"package:{package_id}")
+        await cache_set(key, value, ttl, generation=generation)
+
+    monkeypatch.setattr(package_cache, "set", update_then_set)
+    assert authenticated_client.get(f"/api/packages/{package_id}").json()["description"] is None
+    assert len(package_cache.memory) == 0
+    monkeypatch.undo()
+    assert authenticated_client.get(f"/api/packages/{package_id}").json()["description"] == "Updated"
+    assert len(package_cache.memory) == 1
+
+
+async def test_set_skips_stale_generation():
+    """Test that a set carrying a generation from before a delete or clear is dropped."""
+    cache = Cache("generation")
+    generation = cache.generation("a")
+    await cache.delete("a")
+    await cache.set("a", 1, 60, generation=generation)
+    assert await cache.get("a") is None
+
+    generation = cache.generation("a")
+    cache.evict_local("*")
+    await cache.set("a", 1, 60, generation=generation)
+    assert await cache.get("a") is None
+
+    await cache.set("a", 1, 60, generation=cache.generation("a"))
+    assert await cache.get("a") == 1
@@ -0,0 +1,104 @@
+"""Tests for response compression."""
+import gzip
+import json
+from unittest.mock import patch
+import pytest
+from fastapi import status
+from app.core import compression
+from app.core.compression import StaticPayload, negotiate_encoding
+from app.core.config import settings
+from app.models.package import Package
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def _track(client, package_id, events):
+    history = [
+        {"status": "In transit", "location": "Madrid", "timestamp": f"2026-01-01 {i % 24:02d}:00:00",
+         "context": "Arrived at sorting facility"}
+        for i in range(events)
+    ]
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        mock_track.return_value = {"status": "In Transit", "location": "Madrid", "history": history, "error": None}
+        return client.get(f"/api/packages/{package_id}/track", headers=GZIP)
+
+
+@pytest.fixture
+def package(db, test_user):
+    package = Package(user_id=test_user.id, tracking_number="AB123456789ES", carrier="gls")
+    db.add(package)
+    db.commit()
+    return package
+
+
+def test_negotiate_encoding():
+    """Test q-values, wildcards and preference order."""
+    assert negotiate_encoding("gzip, deflate", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ("gzip",)) is None
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding("identity", ("gzip",)) is None
+    assert negotiate_encoding("", ("gzip",)) is None
+
+
+def test_large_tracking_response_is_compressed(authenticated_client, package):
+    """Test that large JSON is gzipped and that bytes saved and CPU time are recorded."""
+    response = _track(authenticated_client, package.id, 200)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert len(response.json()["history"]) == 200
+    raw_size = len(response.content)
+    assert int(response.headers["content-length"]) < raw_size / 5
+    assert compression.compression_bytes_in_total.value(encoding="gzip") == raw_size
+    assert compression.compression_bytes_saved_total.value(encoding="gzip") > raw_size * 0.8
+    assert compression.compression_cpu_seconds_total.value(encoding="gzip") >= 0
+
+
+def test_small_response_is_not_compressed(authenticated_client, package):
+    """Test that responses under the threshold are sent as is."""
+    response = _track(authenticated_client, package.id, 1)
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_compression_can_be_disabled(authenticated_client, package, monkeypatch):
+    """Test that COMPRESSION_ENABLED turns compression off."""
+    monkeypatch.setattr(settings, "COMPRESSION_ENABLED", False)
+    assert "content-encoding" not in _track(authenticated_client, package.id, 200).headers
+
+
+def test_streaming_export_is_compressed(authenticated_client, db, test_user):
+    """Test that streamed NDJSON exports are compressed and decode intact."""
+    for i in range(50):
+        db.add(Package(user_id=test_user.id, tracking_number=f"AB{i:09d}ES", carrier="gls"))
+    db.commit()
+
+    response = authenticated_client.get("/api/packages/export?format=ndjson", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 50
+
+
+def test_carriers_payload_is_precompressed(client):
+    """Test that the carriers list is served from the pre-compressed payload."""
+    with patch.object(compression._Compressor, "compress") as compress:
+        response = client.get("/api/packages/carriers", headers=GZIP)
+    compress.assert_not_called()
+    assert response.headers["content-encoding"] == "gzip"
+    assert "gls" in response.json()["carriers"]
+
+    plain = client.get("/api/packages/carriers", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+
+
+def test_static_payload():
+    """Test that variants are compressed once and cached."""
+    payload = StaticPayload(b'{"carriers": ["gls"]}' * 100)
+    response = payload.response("gzip")
+    assert gzip.decompress(response.body) == payload.body
+    assert payload.encoded("gzip") is payload.encoded("gzip")
+    assert payload.response(None).body == payload.body
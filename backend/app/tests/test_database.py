@@ -0,0 +1,37 @@
+"""Tests for database engine and session setup."""
+import asyncio
+import inspect
+from app.db.database import get_async_url
+from app.api import auth, packages
+
+
+def test_get_async_url_postgres():
+    """Test that PostgreSQL URLs are switched to asyncpg."""
+    assert get_async_url("postgresql://u:p@db:5432/app") == "postgresql+asyncpg://u:p@db:5432/app"
+    assert get_async_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert get_async_url("postgresql+asyncpg://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+
+
+def test_get_async_url_sqlite():
+    """Test that SQLite URLs are switched to aiosqlite."""
+    assert get_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+
+def test_routes_are_async():
+    """Test that API routes run on the event loop instead of the threadpool."""
+    for router in (auth.router, packages.router):
+        for route in router.routes:
+            assert inspect.iscoroutinefunction(route.endpoint), route.path
+
+
+async def test_concurrent_sessions(async_db):
+    """Test that many sessions can query concurrently on one event loop."""
+    from conftest import TestingAsyncSessionLocal
+    from sqlalchemy import text
+
+    async def query():
+        async with TestingAsyncSessionLocal() as session:
+            return (await session.execute(text("SELECT 1"))).scalar()
+
+    results = await asyncio.gather(*(query() for _ in range(20)))
+    assert results == [1] * 20
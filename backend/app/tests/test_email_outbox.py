@@ -0,0 +1,214 @@
+"""Tests for the email outbox and its background sender."""
+import asyncio
+import socketserver
+import threading
+import time
+import pytest
+from fastapi import status
+from sqlalchemy import select
+from app.core.config import settings
+from app.models.email_outbox import EmailOutbox
+from app.services.outbox import OutboxSender, enqueue_email, messages_per_second, retry_delay
+from conftest import TestingAsyncSessionLocal
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib to deliver messages."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self._reply("220 localhost test SMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250 localhost")
+            elif verb == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip("<> ")
+                if address in server.rejected:
+                    self._reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b""):
+                    data.append(data_line)
+                server.messages.append((recipients, b"".join(data).decode()))
+                self._reply("250 OK")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.connections = 0
+        self.messages = []
+        self.rejected = set()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """Run a local SMTP stand-in and point the settings at it."""
+    server = _SMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", server.server_address[1])
+    monkeypatch.setattr(settings, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    monkeypatch.setattr(settings, "SMTP_FROM", "noreply@example.com")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+async def sender():
+    sender = OutboxSender(TestingAsyncSessionLocal)
+    yield sender
+    await sender.stop()
+
+
+async def _enqueue(*addresses):
+    async with TestingAsyncSessionLocal() as session:
+        for address in addresses:
+            enqueue_email(session, address, "Hello", "Plain body", "<p>HTML body</p>")
+        await session.commit()
+
+
+async def _outbox():
+    async with TestingAsyncSessionLocal() as session:
+        result = await session.execute(select(EmailOutbox).order_by(EmailOutbox.id))
+        return result.scalars().all()
+
+
+def test_password_reset_request_only_enqueues(client, test_user, db):
+    """Test that requesting a reset queues the email instead of sending it."""
+    response = client.post(
+        "/api/auth/password-reset-request",
+        json={"email": "test@example.com"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    message = db.query(EmailOutbox).one()
+    assert message.to_email == "test@example.com"
+    assert message.status == "pending"
+    assert "/reset-password?token=" in message.text_body
+
+
+async def test_sender_reuses_connection(db, smtp_server, sender):
+    """Test that batches are delivered over one pooled SMTP connection."""
+    await _enqueue("a@example.com", "b@example.com", "c@example.com")
+    assert await sender.run_once() == 3
+
+    await _enqueue("d@example.com")
+    assert await sender.run_once() == 1
+    assert await sender.run_once() == 0
+
+    assert smtp_server.connections == 1
+    assert messages_per_second.value() > 0
+    assert [recipients for recipients, _ in smtp_server.messages] == [
+        ["a@example.com"], ["b@example.com"], ["c@example.com"], ["d@example.com"]
+    ]
+    assert "Plain body" in smtp_server.messages[0][1]
+    messages = await _outbox()
+    assert {m.status for m in messages} == {"sent"}
+    assert all(m.sent_at is not None and m.attempts == 1 for m in messages)
+
+
+async def test_sender_reconnects_after_idle(db, smtp_server, sender, monkeypatch):
+    """Test that a connection idle for longer than SMTP_IDLE_SECONDS is reopened."""
+    monkeypatch.setattr(settings, "SMTP_IDLE_SECONDS", 0.0)
+    await _enqueue("a@example.com")
+    await sender.run_once()
+    time.sleep(0.01)
+    await _enqueue("b@example.com")
+    await sender.run_once()
+
+    assert smtp_server.connections == 2
+    assert len(smtp_server.messages) == 2
+
+
+async def test_sender_retries_with_backoff(db, smtp_server, sender, monkeypatch):
+    """Test that a rejected message is retried later and finally marked failed."""
+    monkeypatch.setattr(settings, "EMAIL_MAX_ATTEMPTS", 2)
+    smtp_server.rejected.add("bad@example.com")
+    await _enqueue("bad@example.com", "good@example.com")
+
+    before = time.time()
+    assert await sender.run_once() == 2
+    bad, good = await _outbox()
+    assert good.status == "sent"
+    assert bad.status == "pending"
+    assert bad.attempts == 1
+    assert bad.next_attempt_at >= before + retry_delay(1)
+    assert "No such user" in bad.last_error
+
+    # Not due yet
+    assert await sender.run_once() == 0
+
+    async with TestingAsyncSessionLocal() as session:
+        message = await session.get(EmailOutbox, bad.id)
+        message.next_attempt_at = 0
+        await session.commit()
+    assert await sender.run_once() == 1
+    bad, _ = await _outbox()
+    assert bad.status == "failed"
+    assert bad.attempts == 2
+
+
+async def test_sender_handles_unreachable_server(db, sender, monkeypatch):
+    """Test that a connection failure reschedules the whole batch."""
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", 1)
+    await _enqueue("a@example.com", "b@example.com")
+
+    assert await sender.run_once() == 2
+    messages = await _outbox()
+    assert [m.status for m in messages] == ["pending", "pending"]
+    assert all(m.attempts == 1 and m.last_error for m in messages)
+
+
+def test_retry_delay_is_capped(monkeypatch):
+    """Test exponential backoff and its upper bound."""
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BASE_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_MAX_SECONDS", 100.0)
+    assert [retry_delay(n) for n in range(1, 6)] == [10.0, 20.0, 40.0, 80.0, 100.0]
+
+
+async def test_background_sender_delivers_on_notify(db, smtp_server, sender, monkeypatch):
+    """Test that the background task wakes up when notified of new mail."""
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_POLL_INTERVAL", 60.0)
+    sender.start()
+    await asyncio.sleep(0.05)
+
+    await _enqueue("a@example.com")
+    sender.notify()
+    for _ in range(100):
+        if smtp_server.messages:
+            break
+        await asyncio.sleep(0.02)
+
+    assert len(smtp_server.messages) == 1
@@ -0,0 +1,78 @@
+"""Tests for the synthetic dataset generator."""
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, select
+from app.data.carriers import CARRIERS
+from app.db.database import Base
+from app.models.package import Package
+from app.models.user import User
+from tools.generate_dataset import STATUSES, _copy_value, generate
+
+
+def _dataset(tmp_path, name, **options):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(engine)
+    counts = generate(engine, **{"users": 50, "packages_per_user": 8, "seed": 7, "batch_size": 64, **options})
+    with engine.connect() as conn:
+        users = conn.execute(select(User.__table__).order_by(User.id)).mappings().all()
+        packages = conn.execute(select(Package.__table__).order_by(Package.id)).mappings().all()
+    engine.dispose()
+    return counts, users, packages
+
+
+def _without(rows, *columns):
+    return [{k: v for k, v in row.items() if k not in columns} for row in rows]
+
+
+def test_generates_users_and_packages(tmp_path):
+    """Test counts, carriers, statuses and stored tracking histories."""
+    counts, users, packages = _dataset(tmp_path, "a.db")
+
+    assert counts == {"users": 50, "packages": len(packages)}
+    assert len(users) == 50
+    assert 200 < len(packages) < 600
+    assert {p["user_id"] for p in packages} <= {u["id"] for u in users}
+    assert {p["carrier"] for p in packages} <= {carrier_id for carrier_id, _ in CARRIERS}
+    assert {p["status"] for p in packages} <= {status for status, _, _ in STATUSES}
+    assert Counter(p["status"] for p in packages).most_common(1)[0][0] == "Delivered"
+    assert len({p["tracking_number"] for p in packages}) == len(packages)
+
+    tracked = next(p for p in packages if p["status"] == "Delivered")
+    history = json.loads(tracked["tracking_data"])
+    assert history["status"] == "Delivered"
+    assert history["history"][0]["status"] == "Delivered"
+    assert history["location"] == tracked["last_location"]
+
+
+def test_same_seed_same_data(tmp_path):
+    """Test that generation is reproducible from the seed."""
+    _, users_a, packages_a = _dataset(tmp_path, "a.db")
+    _, users_b, packages_b = _dataset(tmp_path, "b.db")
+    _, _, packages_c = _dataset(tmp_path, "c.db", seed=8)
+
+    # bcrypt salts differ per run; everything else matches
+    assert _without(users_a, "hashed_password") == _without(users_b, "hashed_password")
+    assert packages_a == packages_b
+    assert packages_a != packages_c
+
+
+def test_appends_after_existing_users(tmp_path):
+    """Test that a second run with another prefix continues the user ids."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'a.db'}")
+    Base.metadata.create_all(engine)
+    generate(engine, users=5, packages_per_user=2, seed=1)
+    generate(engine, users=5, packages_per_user=2, seed=1, prefix="more")
+    with engine.connect() as conn:
+        usernames = conn.execute(select(User.username).order_by(User.id)).scalars().all()
+    engine.dispose()
+    assert usernames[4:6] == ["gen00000004", "more00000000"]
+    assert len(usernames) == 10
+
+
+def test_copy_values():
+    """Test how values are written for PostgreSQL COPY (CSV format)."""
+    assert _copy_value("status", None) == ""
+    assert _copy_value("tracking_data", '{"status": "Delivered"}') == '"{\\"status\\": \\"Delivered\\"}"'
+    assert _copy_value("created_at", datetime(2026, 1, 1, tzinfo=timezone.utc)) == "2026-01-01T00:00:00+00:00"
+    assert _copy_value("carrier", "gls") == "gls"
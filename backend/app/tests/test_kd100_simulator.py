@@ -0,0 +1,114 @@
+"""Tests for the local KeyDelivery simulator."""
+import json
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.strategies import keydelivery
+from tools.kd100_simulator import SimulatorConfig, create_app, parse_latency, signature
+
+SIMULATOR = "http://simulator"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def simulate(monkeypatch, clock):
+    """Route keydelivery's HTTP calls to an in-process simulator built from the given config."""
+    monkeypatch.setattr(settings, "KD100_APIKEY", "simulator")
+    monkeypatch.setattr(settings, "KD100_SECRET", "simulator")
+    monkeypatch.setattr(settings, "KD100_DETECT_URL", f"{SIMULATOR}/api/v1/carriers/detect")
+    monkeypatch.setattr(settings, "KD100_TRACK_URL", f"{SIMULATOR}/api/v1/tracking/realtime")
+
+    def start(**config):
+        client = TestClient(create_app(SimulatorConfig(seed=1, **config), clock=clock))
+        monkeypatch.setattr(
+            keydelivery.requests, "post",
+            lambda url, data=None, headers=None: client.post(url, content=data, headers=headers),
+        )
+        return client
+    return start
+
+
+def _post(client, path, payload, secret="simulator"):
+    body = json.dumps(payload).encode()
+    headers = {"API-Key": "simulator", "signature": signature(body, "simulator", secret)}
+    return client.post(path, content=body, headers=headers)
+
+
+def test_track_through_keydelivery(simulate, clock):
+    """Test that the real client parses simulated histories that advance over time."""
+    simulator = simulate(step_seconds=60)
+
+    first = keydelivery.track("AB123456789ES", "gls")
+    assert first["error"] is None
+    assert first["carrier"] == "gls"
+    assert first["location"] == first["history"][0]["location"]
+
+    clock.now += 3600
+    later = keydelivery.track("AB123456789ES", "gls")
+    assert later["status"] == "Delivered"
+    assert len(later["history"]) == 7
+    assert len(later["history"]) > len(first["history"])
+    assert simulator.get("/__simulator/stats").json()["track_requests"] == 2
+
+
+def test_detect_through_keydelivery(simulate):
+    """Test that carrier detection returns stable candidates."""
+    simulate()
+    carriers = keydelivery.detect_carrier("AB123456789ES")
+    assert carriers[0] == {"carrier_id": "spain_correos_es", "carrier_name": carriers[0]["carrier_name"]}
+    assert keydelivery.detect_carrier("AB123456789ES") == carriers
+
+
+def test_signature_is_checked(simulate):
+    """Test that a wrong secret is rejected like the real API does."""
+    client = simulate()
+    response = _post(client, "/api/v1/tracking/realtime", {"carrier_id": "gls", "tracking_number": "X1234"}, "bad")
+    assert response.json()["code"] == 401
+
+
+def test_quota_returns_429(simulate, clock):
+    """Test that requests beyond the quota get 429 until the window passes."""
+    simulate(quota=2, quota_window=1.0)
+    assert keydelivery.track("X1234", "gls")["error"] is None
+    assert keydelivery.track("X1234", "gls")["error"] is None
+    assert "429" in keydelivery.track("X1234", "gls")["error"]
+    assert keydelivery.responses_total.value(endpoint="track", carrier="gls", status="429") == 1
+
+    clock.now += 1.5
+    assert keydelivery.track("X1234", "gls")["error"] is None
+
+
+def test_error_injection(simulate):
+    """Test that server and API errors are injected at the configured rates."""
+    simulate(error_rate=1.0)
+    assert keydelivery.responses_total.value(endpoint="track", carrier="gls", status="500") == 0
+    keydelivery.track("X1234", "gls")
+    assert keydelivery.responses_total.value(endpoint="track", carrier="gls", status="500") == 1
+
+    simulate(api_error_rate=1.0)
+    result = keydelivery.track("X1234", "gls")
+    assert result["error"] == "Carrier temporarily unavailable"
+
+
+def test_parse_latency():
+    """Test the supported latency distributions."""
+    rng = random.Random(1)
+    assert parse_latency("fixed:50", rng)() == 0.05
+    assert 0.01 <= parse_latency("uniform:10,20", rng)() <= 0.02
+    assert parse_latency("normal:10,1000", rng)() >= 0
+    assert parse_latency("lognormal:80,0.5", rng)() > 0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1", rng)
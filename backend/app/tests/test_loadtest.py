@@ -0,0 +1,59 @@
+"""Tests for the load-test harness."""
+from unittest.mock import patch
+import httpx
+import pytest
+from app.main import app
+from tools.loadtest import build_parser, find_saturation, parse_mix, run_load_test
+
+
+def _stage(rate, achieved, dropped=0, **endpoints):
+    return {
+        "offered_rate": rate,
+        "achieved_rate": achieved,
+        "actions_dropped": dropped,
+        "endpoints": {
+            name: {"p95_ms": p95, "error_rate": error_rate} for name, (p95, error_rate) in endpoints.items()
+        },
+    }
+
+
+def test_parse_mix():
+    """Test that weights are normalized and unknown actions rejected."""
+    assert parse_mix("dashboard=3,detail=1") == {"dashboard": 0.75, "detail": 0.25}
+    with pytest.raises(ValueError):
+        parse_mix("dashboard=1,checkout=1")
+    with pytest.raises(ValueError):
+        parse_mix("dashboard=0")
+
+
+def test_find_saturation():
+    """Test per-endpoint and node saturation points."""
+    stages = [
+        _stage(10, 10, list=(50, 0), track=(120, 0)),
+        _stage(20, 20, list=(80, 0), track=(600, 0)),
+        _stage(40, 30, list=(90, 0.05), track=(900, 0)),
+    ]
+    saturation = find_saturation(stages, slo_ms=500, max_error_rate=0.01)
+    assert saturation["endpoints"] == {"list": 40, "track": 20}
+    assert saturation["node"] == 40
+    assert saturation["max_sustained_rate"] == 10
+
+
+async def test_load_test_in_process(client):
+    """Test a short run end to end against the app through the ASGI transport."""
+    args = build_parser().parse_args([
+        "--base-url", "http://loadtest", "--users", "2", "--packages-per-user", "3",
+        "--rates", "20", "--stage-seconds", "0.5", "--seed", "1",
+        "--mix", "dashboard=1,detail=1,create=1,delete=1",
+    ])
+    with patch("app.strategies.keydelivery.track") as mock_track:
+        mock_track.return_value = {"status": "In Transit", "location": "Madrid", "history": [], "error": None}
+        results = await run_load_test(args, transport=httpx.ASGITransport(app=app))
+
+    [stage] = results["stages"]
+    assert stage["actions_started"] == 10
+    assert stage["actions_dropped"] == 0
+    endpoints = stage["endpoints"]
+    assert "GET /api/packages/" in endpoints
+    assert all(result["errors"] == 0 for result in endpoints.values())
+    assert sum(result["requests"] for result in endpoints.values()) >= 10
@@ -0,0 +1,144 @@
+"""Tests for failed-login throttling."""
+from unittest.mock import patch
+from fastapi import status
+from app.core.config import settings
+from app.core.throttle import (
+    LoginThrottle,
+    MemoryWindowStore,
+    DatabaseWindowStore,
+    account_key,
+    verifications_shed_total,
+    throttled_total,
+)
+from app.models.login_attempt import LoginAttempt
+
+
+def _login(client, username="testuser", password="wrongpassword"):
+    return client.post("/api/auth/login", data={"username": username, "password": password})
+
+
+def test_login_throttled_after_username_limit(client, test_user):
+    """Test that repeated failures for one username are throttled."""
+    limit = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME
+    for _ in range(limit):
+        assert _login(client).status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = _login(client)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) > 0
+    assert throttled_total.value(scope="username") == 1
+
+
+def test_email_and_username_share_the_account_limit(client, test_user):
+    """Test that alternating the username and the email of one account hits the same limit."""
+    limit = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME
+    for i in range(limit):
+        username = "testuser" if i % 2 else "test@example.com"
+        assert _login(client, username=username).status_code == status.HTTP_401_UNAUTHORIZED
+
+    assert _login(client, username="testuser").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert _login(client, username="test@example.com").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def test_unknown_login_names_are_normalized(client):
+    """Test that case and whitespace variants of an unknown name share one window."""
+    limit = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME
+    for i in range(limit):
+        assert _login(client, username=" Ghost " if i % 2 else "ghost").status_code == status.HTTP_401_UNAUTHORIZED
+
+    assert _login(client, username="GHOST").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def test_throttled_login_skips_password_verification(client, test_user):
+    """Test that throttled attempts never reach bcrypt."""
+    for _ in range(settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME):
+        _login(client)
+
+    with patch("app.api.auth.verify_password") as mock_verify:
+        # Even the correct password is rejected while throttled
+        response = _login(client, password="testpassword123")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        mock_verify.assert_not_called()
+
+    assert verifications_shed_total.value() == 1
+
+
+def test_login_throttled_per_ip(client, test_user):
+    """Test that failures spread over many usernames are throttled per IP."""
+    with patch.object(settings, "LOGIN_THROTTLE_MAX_FAILURES_PER_IP", 3):
+        for i in range(3):
+            assert _login(client, username=f"user{i}").status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = _login(client, username="someone-else")
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert throttled_total.value(scope="ip") == 1
+
+
+def test_successful_login_resets_username_window(client, test_user):
+    """Test that a successful login clears earlier failures for the username."""
+    limit = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME
+    for _ in range(limit - 1):
+        _login(client)
+    assert _login(client, password="testpassword123").status_code == status.HTTP_200_OK
+
+    for _ in range(limit - 1):
+        assert _login(client).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_throttle_disabled(client, test_user):
+    """Test that the throttle can be switched off."""
+    with patch.object(settings, "LOGIN_THROTTLE_ENABLED", False):
+        for _ in range(settings.LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME + 2):
+            assert _login(client).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_memory_window_expires_old_attempts():
+    """Test that attempts older than the window are not counted."""
+    store = MemoryWindowStore()
+    await store.add(None, "user:a", 100.0)
+    await store.add(None, "user:a", 150.0)
+
+    assert await store.window(None, "user:a", 155.0, 60) == (2, 100.0)
+    assert await store.window(None, "user:a", 201.0, 60) == (1, 150.0)
+    assert await store.window(None, "user:a", 300.0, 60) == (0, None)
+
+
+async def test_memory_store_sweeps_expired_keys():
+    """Test that keys which never come back are dropped once their window has passed."""
+    store = MemoryWindowStore()
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    for i in range(1000):
+        await store.add(None, f"ip:10.0.{i // 256}.{i % 256}", 100.0)
+    assert len(store) == 1000
+
+    await store.add(None, "ip:10.1.0.1", 100.0 + window + store.sweep_interval)
+    assert len(store) == 1
+
+
+async def test_database_store_sweeps_expired_rows(async_db, db):
+    """Test that expired attempts of every key are deleted, not just the key written."""
+    store = DatabaseWindowStore()
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+    for i in range(50):
+        await store.add(async_db, f"user:stuffed{i}", 100.0)
+    assert db.query(LoginAttempt).count() == 50
+
+    await store.add(async_db, "user:alice", 100.0 + window + store.sweep_interval)
+    db.expire_all()
+    assert [attempt.key for attempt in db.query(LoginAttempt).all()] == ["user:alice"]
+
+
+async def test_database_store_is_shared(async_db, db):
+    """Test that the database backend sees attempts recorded by another throttle."""
+    first = LoginThrottle(store=DatabaseWindowStore())
+    second = LoginThrottle(store=DatabaseWindowStore())
+
+    with patch.object(settings, "LOGIN_THROTTLE_MAX_FAILURES_PER_USERNAME", 2):
+        await first.record_failure(async_db, account_key("Alice"), "10.0.0.1")
+        await first.record_failure(async_db, account_key("alice"), "10.0.0.2")
+
+        assert await second.retry_after(async_db, account_key("alice"), "10.0.0.3") is not None
+        assert db.query(LoginAttempt).count() == 4
+
+        await second.record_success(async_db, account_key("alice"))
+        assert await second.retry_after(async_db, account_key("alice"), "10.0.0.3") is None
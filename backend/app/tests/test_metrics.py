@@ -0,0 +1,143 @@
+"""Tests for the metrics registry, middleware and /metrics endpoint."""
+import threading
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.core import metrics
+from app.core.config import settings
+from app.core.http_metrics import request_duration_seconds, requests_in_progress, requests_total
+from app.core.security import password_hash_seconds
+from app.db.instrumentation import (
+    instrument_queries, query_duration_seconds, query_errors_total, statement_operation
+)
+from app.strategies import keydelivery
+
+
+def test_counter_merges_thread_shards():
+    """Test that increments from several threads are all counted."""
+    counter = metrics.Counter("test_thread_total", "Test counter", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(kind="a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value(kind="a") == 4000
+
+
+def test_render_prometheus():
+    """Test the text exposition format for each metric type."""
+    counter = metrics.counter("test_render_total", "A \"quoted\" counter", ("path",))
+    histogram = metrics.histogram("test_render_seconds", "A histogram", buckets=(0.1, 1.0))
+    counter.inc(2, path='/a"b')
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    text = metrics.render_prometheus()
+    assert '# HELP test_render_total A \\"quoted\\" counter' in text
+    assert "# TYPE test_render_total counter" in text
+    assert 'test_render_total{path="/a\\"b"} 2' in text
+    assert '# TYPE test_render_seconds histogram' in text
+    assert 'test_render_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_render_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_render_seconds_bucket{le="+Inf"} 2' in text
+    assert "test_render_seconds_count 2" in text
+
+
+def test_http_metrics_use_route_templates(authenticated_client):
+    """Test that requests are labelled by route template and status."""
+    authenticated_client.get("/api/packages/12345")
+    authenticated_client.get("/api/packages/67890")
+    authenticated_client.get("/does-not-exist")
+
+    route = "/api/packages/{package_id}"
+    assert requests_total.value(method="GET", route=route, status="404") == 2
+    assert request_duration_seconds.count(method="GET", route=route) == 2
+    assert requests_total.value(method="GET", route="unmatched", status="404") == 1
+    assert requests_in_progress.value() == 0
+
+
+METRICS_TOKEN = "scrape-secret"
+
+
+def test_metrics_endpoint(authenticated_client, monkeypatch):
+    """Test that /metrics exposes HTTP and bcrypt metrics."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", METRICS_TOKEN)
+    authenticated_client.get("/api/packages/")
+    response = authenticated_client.get("/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/packages/",status="200"} 1' in body
+    assert 'password_hash_seconds_count{operation="verify"} 1' in body
+    assert password_hash_seconds.count(operation="hash") == 1
+
+
+def test_query_metrics():
+    """Test that statements are timed and failures counted per engine."""
+    engine = create_engine("sqlite://")
+    instrument_queries(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+    engine.dispose()
+
+    assert query_duration_seconds.count(engine="test", operation="SELECT") == 2
+    assert query_errors_total.value(engine="test", operation="SELECT") == 1
+
+
+def test_metrics_endpoint_can_be_disabled(client, monkeypatch):
+    """Test that /metrics returns 404 when disabled."""
+    monkeypatch.setattr(settings, "METRICS_TOKEN", METRICS_TOKEN)
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    response = client.get("/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_metrics_endpoint_requires_token(authenticated_client, monkeypatch):
+    """Test that /metrics is hidden without the scrape token, even from logged-in users."""
+    assert authenticated_client.get("/metrics").status_code == status.HTTP_404_NOT_FOUND
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", METRICS_TOKEN)
+    assert authenticated_client.get("/metrics").status_code == status.HTTP_404_NOT_FOUND
+    for authorization in ("Bearer wrong", METRICS_TOKEN, f"Basic {METRICS_TOKEN}"):
+        response = authenticated_client.get("/metrics", headers={"Authorization": authorization})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_statement_operation():
+    """Test SQL statements are labelled by their leading keyword."""
+    assert statement_operation("  select 1") == "SELECT"
+    assert statement_operation("INSERT INTO packages ...") == "INSERT"
+    assert statement_operation("CREATE TABLE x (id int)") == "OTHER"
+    assert statement_operation("") == "OTHER"
+
+
+@patch("app.strategies.keydelivery.settings")
+@patch("app.strategies.keydelivery.requests.post")
+def test_keydelivery_metrics(mock_post, mock_settings):
+    """Test KeyDelivery latency, status codes and per-carrier errors."""
+    mock_settings.KD100_APIKEY = "test_key"
+    mock_settings.KD100_SECRET = "test_secret"
+    mock_response = MagicMock(status_code=200)
+    mock_response.json.return_value = {"code": 400, "message": "Bad carrier"}
+    mock_post.return_value = mock_response
+
+    keydelivery.track("123456789", "gls")
+    mock_post.side_effect = ConnectionError("down")
+    keydelivery.track("123456789", "gls")
+
+    assert keydelivery.request_seconds.count(endpoint="track") == 2
+    assert keydelivery.responses_total.value(endpoint="track", carrier="gls", status="200") == 1
+    assert keydelivery.responses_total.value(endpoint="track", carrier="gls", status="ConnectionError") == 1
+    assert keydelivery.errors_total.value(endpoint="track", carrier="gls", reason="api_400") == 1
+    assert keydelivery.errors_total.value(endpoint="track", carrier="gls", reason="ConnectionError") == 1
@@ -0,0 +1,121 @@
+"""Tests for Alembic migrations."""
+from pathlib import Path
+from unittest.mock import patch
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from fastapi.testclient import TestClient
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, create_engine, func,
+    inspect, text
+)
+from app.db.database import Base
+from app.db.migration_utils import batched_backfill
+from app.main import app
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def _alembic_config(url: str) -> Config:
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_migrations_match_models(tmp_path):
+    """Test that upgrading to head produces exactly the schema the models describe."""
+    url = f"sqlite:///{tmp_path}/migrated.db"
+    command.upgrade(_alembic_config(url), "head")
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+    engine.dispose()
+    assert diff == []
+
+
+def _baseline_metadata() -> MetaData:
+    """The tables the application's startup ``create_all`` built before migrations existed."""
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String(255), unique=True, index=True, nullable=False),
+        Column("username", String(100), unique=True, index=True, nullable=False),
+        Column("hashed_password", String, nullable=False),
+        Column("is_active", Boolean, default=True),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+    )
+    Table(
+        "packages", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("tracking_number", String(255), nullable=False),
+        Column("carrier", String(50), nullable=False),
+        Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        Column("description", String(500), nullable=True),
+        Column("status", String(100), nullable=True),
+        Column("last_location", String(255), nullable=True),
+        Column("tracking_data", JSON, nullable=True),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+        Column("updated_at", DateTime(timezone=True)),
+        Index("idx_user_tracking", "user_id", "tracking_number"),
+    )
+    return metadata
+
+
+def test_stamped_baseline_upgrades_to_models(tmp_path):
+    """Test that a database from the old create_all, stamped 0001, upgrades to the full schema."""
+    url = f"sqlite:///{tmp_path}/baseline.db"
+    engine = create_engine(url)
+    _baseline_metadata().create_all(engine)
+
+    config = _alembic_config(url)
+    command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+    engine.dispose()
+    assert diff == []
+
+
+def test_migrations_downgrade_to_base(tmp_path):
+    """Test that every migration can be rolled back."""
+    url = f"sqlite:///{tmp_path}/migrated.db"
+    config = _alembic_config(url)
+    command.upgrade(config, "head")
+    command.downgrade(config, "base")
+
+    engine = create_engine(url)
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    engine.dispose()
+
+
+def test_batched_backfill(tmp_path):
+    """Test that a backfill updates matching rows across several batches."""
+    engine = create_engine(f"sqlite:///{tmp_path}/backfill.db")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, status TEXT)"))
+        conn.execute(
+            text("INSERT INTO items (id, status) VALUES (:id, :status)"),
+            [{"id": i, "status": "old" if i % 2 else "keep"} for i in range(1, 26)],
+        )
+        with Operations.context(MigrationContext.configure(conn)):
+            updated = batched_backfill("items", "status = 'new'", "status = 'old'", batch_size=4)
+
+        assert updated == 13
+        counts = dict(conn.execute(text("SELECT status, COUNT(*) FROM items GROUP BY status")).all())
+    engine.dispose()
+    assert counts == {"new": 13, "keep": 12}
+
+
+def test_startup_runs_no_ddl():
+    """Test that booting the app does not create tables."""
+    with patch.object(Base.metadata, "create_all") as mock_create_all:
+        with TestClient(app) as test_client:
+            assert test_client.get("/health").status_code == 200
+    mock_create_all.assert_not_called()
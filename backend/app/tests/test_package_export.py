@@ -0,0 +1,100 @@
+"""Tests for streaming package export."""
+import csv
+import io
+import json
+from unittest.mock import patch
+from fastapi import status
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models.package import Package
+from app.models.user import User
+from app.services import package_export
+from conftest import TestingAsyncSessionLocal
+
+
+def _seed(db, user, count, **fields):
+    db.add_all([
+        Package(user_id=user.id, tracking_number=f"TRACK{i:06d}", carrier="gls", **fields)
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_export_ndjson(authenticated_client, db, test_user):
+    """Test that an NDJSON export returns every package in id order."""
+    _seed(db, test_user, 250)
+
+    response = authenticated_client.get("/api/packages/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 250
+    assert records[0]["tracking_number"] == "TRACK000000"
+    assert [r["id"] for r in records] == sorted(r["id"] for r in records)
+
+
+async def test_export_yields_one_chunk_per_batch(db, test_user):
+    """Test that the export is produced batch by batch from the cursor."""
+    _seed(db, test_user, 250)
+
+    with patch.object(settings, "EXPORT_BATCH_SIZE", 40):
+        chunks = [
+            chunk async for chunk in
+            package_export.export_packages(TestingAsyncSessionLocal, test_user.id, "ndjson")
+        ]
+
+    assert [chunk.count("\n") for chunk in chunks] == [40] * 6 + [10]
+
+
+def test_export_includes_tracking_data(authenticated_client, db, test_user):
+    """Test that stored tracking data is exported as JSON, in both formats."""
+    tracking = {"status": "Delivered", "history": [{"location": "Madrid"}]}
+    _seed(db, test_user, 1, status="Delivered", tracking_data=json.dumps(tracking))
+
+    ndjson = authenticated_client.get("/api/packages/export").text
+    assert json.loads(ndjson)["tracking_data"] == tracking
+
+    response = authenticated_client.get("/api/packages/export", params={"format": "csv"})
+    assert response.headers["content-disposition"] == 'attachment; filename="packages.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert json.loads(rows[0]["tracking_data"]) == tracking
+    assert rows[0]["updated_at"] == ""
+
+
+def test_export_is_scoped_and_filtered(authenticated_client, db, test_user):
+    """Test that exports only contain the user's packages matching the status filter."""
+    _seed(db, test_user, 3, status="Delivered")
+    db.add(Package(user_id=test_user.id, tracking_number="OTHER000001", carrier="gls", status="In transit"))
+    other = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=get_password_hash("otherpassword123"),
+        is_active=True
+    )
+    db.add(other)
+    db.commit()
+    _seed(db, other, 2, status="Delivered")
+
+    response = authenticated_client.get("/api/packages/export", params={"status": "Delivered"})
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 3
+    assert all(r["status"] == "Delivered" for r in records)
+
+
+def test_export_empty_csv_has_header(authenticated_client):
+    """Test that an empty CSV export still has a header row."""
+    response = authenticated_client.get("/api/packages/export", params={"format": "csv"})
+    assert response.text.strip().startswith("id,tracking_number,carrier")
+
+
+def test_export_rejects_unknown_format(authenticated_client):
+    """Test that unsupported export formats are rejected."""
+    response = authenticated_client.get("/api/packages/export", params={"format": "xml"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_export_requires_auth(client):
+    """Test that exporting requires authentication."""
+    assert client.get("/api/packages/export").status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,169 @@
+"""Tests for bulk package import."""
+import json
+from unittest.mock import patch
+from fastapi import status
+from app.core.config import settings
+from app.models.package import Package
+from app.services.package_import import MultipartFile
+
+
+def _import(client, body, content_type="text/csv", **params):
+    return client.post(
+        "/api/packages/import",
+        content=body,
+        headers={"Content-Type": content_type},
+        params=params,
+    )
+
+
+def test_import_csv(authenticated_client, db):
+    """Test importing a CSV file with valid, invalid and duplicate rows."""
+    body = (
+        "tracking_number,carrier,description\n"
+        "AB123456789ES,spain_correos_es,First\n"
+        "CD123456789ES,GLS,\n"
+        "123,gls,Too short\n"
+        "EF123456789ES,not_a_carrier,Bad carrier\n"
+        "AB123456789ES,spain_correos_es,Repeated\n"
+    )
+    response = _import(authenticated_client, body)
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert (report["total"], report["created"], report["duplicate"], report["invalid"]) == (5, 2, 1, 2)
+    assert [row["status"] for row in report["rows"]] == ["created", "created", "invalid", "invalid", "duplicate"]
+    assert "Unsupported carrier" in report["rows"][3]["error"]
+
+    packages = {p.tracking_number: p for p in db.query(Package).all()}
+    assert set(packages) == {"AB123456789ES", "CD123456789ES"}
+    assert packages["CD123456789ES"].carrier == "gls"
+    assert packages["CD123456789ES"].description is None
+
+
+def test_import_skips_existing_packages(authenticated_client, db):
+    """Test that rows already tracked by the user are reported as duplicates."""
+    authenticated_client.post(
+        "/api/packages/",
+        json={"tracking_number": "AB123456789ES", "carrier": "gls"}
+    )
+    body = "tracking_number,carrier\nAB123456789ES,gls\nCD123456789ES,gls\n"
+    report = _import(authenticated_client, body).json()
+
+    assert report["rows"][0]["status"] == "duplicate"
+    assert report["rows"][0]["error"] == "Package already exists"
+    assert report["created"] == 1
+    assert db.query(Package).count() == 2
+
+
+def test_import_ndjson(authenticated_client, db):
+    """Test importing NDJSON, including malformed lines."""
+    lines = [
+        json.dumps({"tracking_number": "AB123456789ES", "carrier": "gls", "description": "Shoes"}),
+        "{not json",
+        json.dumps(["not", "an", "object"]),
+        "",
+        json.dumps({"tracking_number": "CD123456789ES"}),
+    ]
+    response = _import(authenticated_client, "\n".join(lines), content_type="application/x-ndjson")
+    report = response.json()
+
+    assert report["created"] == 2
+    assert report["invalid"] == 2
+    assert report["rows"][1]["error"].startswith("Invalid JSON")
+    carriers = {p.tracking_number: p.carrier for p in db.query(Package).all()}
+    assert carriers == {"AB123456789ES": "gls", "CD123456789ES": "auto"}
+
+
+def test_import_multipart_upload(authenticated_client, db):
+    """Test importing a file sent as a multipart form upload."""
+    response = authenticated_client.post(
+        "/api/packages/import",
+        files={"file": ("packages.csv", b"tracking_number,carrier\nAB123456789ES,gls\n", "application/octet-stream")},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["created"] == 1
+
+
+def test_import_multipart_requires_file_field(authenticated_client):
+    """Test that a multipart body without a 'file' upload is rejected."""
+    response = authenticated_client.post(
+        "/api/packages/import",
+        data={"file": "not an upload"},
+        files={"other": ("packages.csv", b"tracking_number,carrier\n", "text/csv")},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Multipart upload must include a 'file' field"
+
+
+async def test_multipart_file_is_streamed():
+    """Test that the file field is yielded as the body arrives, not after all of it was read."""
+    body = (
+        b"--XyZ\r\n"
+        b'Content-Disposition: form-data; name="note"\r\n\r\n'
+        b"ignored\r\n"
+        b"--XyZ\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="packages.ndjson"\r\n'
+        b"Content-Type: application/x-ndjson\r\n\r\n"
+        + b"".join(b'{"tracking_number": "T%05d"}\n' % i for i in range(200))
+        + b"\r\n--XyZ--\r\n"
+    )
+    read = []
+
+    async def chunks():
+        for start in range(0, len(body), 64):
+            read.append(start)
+            yield body[start:start + 64]
+
+    upload = MultipartFile(chunks(), "multipart/form-data; boundary=XyZ")
+    assert await upload.open()
+    assert (upload.filename, upload.content_type) == ("packages.ndjson", "application/x-ndjson")
+
+    data = b""
+    async for chunk in upload.chunks():
+        if not data:
+            assert len(read) < len(body) // 64 / 2  # first data long before the end of the body
+        data += chunk
+    assert data == b"".join(b'{"tracking_number": "T%05d"}\n' % i for i in range(200))
+
+
+def test_import_csv_quoted_newline(authenticated_client, db):
+    """Test that quoted CSV fields may contain commas and newlines."""
+    body = 'tracking_number,carrier,description\nAB123456789ES,gls,"Line one,\nline two"\n'
+    assert _import(authenticated_client, body).json()["created"] == 1
+    assert db.query(Package).one().description == "Line one,\nline two"
+
+
+def test_import_in_batches(authenticated_client, db):
+    """Test that imports spanning several insert batches create every row."""
+    rows = "".join(f"TRACK{i:06d},gls\n" for i in range(25))
+    with patch.object(settings, "IMPORT_BATCH_SIZE", 4):
+        report = _import(authenticated_client, "tracking_number,carrier\n" + rows).json()
+    assert report["created"] == 25
+    assert [row["row"] for row in report["rows"]] == list(range(1, 26))
+    assert db.query(Package).count() == 25
+
+
+def test_import_rejects_missing_header(authenticated_client, db):
+    """Test that a CSV without a tracking_number column is rejected."""
+    response = _import(authenticated_client, "number,carrier\nAB123456789ES,gls\n")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert db.query(Package).count() == 0
+
+
+def test_import_row_limit_imports_nothing(authenticated_client, db):
+    """Test that exceeding the row limit rolls back the whole upload."""
+    rows = "".join(f"TRACK{i:06d},gls\n" for i in range(5))
+    with patch.object(settings, "IMPORT_MAX_ROWS", 3), patch.object(settings, "IMPORT_BATCH_SIZE", 2):
+        response = _import(authenticated_client, "tracking_number,carrier\n" + rows)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert db.query(Package).count() == 0
+
+
+def test_import_unknown_format(authenticated_client):
+    """Test that unsupported content types are rejected."""
+    response = _import(authenticated_client, "<xml/>", content_type="application/xml")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_import_requires_auth(client):
+    """Test that importing requires authentication."""
+    assert _import(client, "tracking_number\nAB123456789ES\n").status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,72 @@
+"""Tests for connection pool configuration and metrics."""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import NullPool
+from app.core.config import settings
+from app.db.pool import (
+    engine_options,
+    instrument_engine,
+    TimedQueuePool,
+    TimedAsyncAdaptedQueuePool,
+    checkout_seconds,
+    checkout_timeouts_total,
+    checkouts_total,
+    in_use,
+    overflow,
+)
+
+PG_URL = "postgresql://user:pass@db:5432/app"
+
+
+def test_engine_options_queue_pool():
+    """Test that pool settings are passed through for PostgreSQL."""
+    with patch.object(settings, "DB_POOL_SIZE", 20), patch.object(settings, "DB_MAX_OVERFLOW", 5):
+        options = engine_options(PG_URL)
+    assert options["poolclass"] is TimedQueuePool
+    assert options["pool_size"] == 20
+    assert options["max_overflow"] == 5
+    assert options["pool_timeout"] == settings.DB_POOL_TIMEOUT
+    assert options["pool_recycle"] == settings.DB_POOL_RECYCLE
+    assert options["pool_pre_ping"] is True
+    assert engine_options(PG_URL, is_async=True)["poolclass"] is TimedAsyncAdaptedQueuePool
+
+
+def test_engine_options_pgbouncer():
+    """Test PgBouncer-compatible mode: no local pool and no prepared statement cache."""
+    with patch.object(settings, "DB_POOL_MODE", "null"), patch.object(settings, "DB_PGBOUNCER", True):
+        options = engine_options(PG_URL, is_async=True)
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
+    assert options["connect_args"]["statement_cache_size"] == 0
+
+
+def test_engine_options_sqlite():
+    """Test that SQLite keeps the dialect's default pool."""
+    assert "poolclass" not in engine_options("sqlite:///./test.db")
+
+
+def test_pool_metrics_and_timeout(tmp_path):
+    """Test checkout latency, in-use/overflow gauges and timeout counting."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    instrument_engine(engine, "test")
+
+    conn = engine.connect()
+    assert in_use.value(pool="test") == 1
+    assert overflow.value(pool="test") == 0
+    assert checkouts_total.value(pool="test") == 1
+    assert checkout_seconds.count(pool="test") == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert checkout_timeouts_total.value(pool="test") == 1
+
+    conn.close()
+    assert in_use.value(pool="test") == 0
+    engine.dispose()
@@ -0,0 +1,121 @@
+"""Tests for on-demand request profiling."""
+import asyncio
+import sys
+import threading
+import time
+from fastapi import status
+from app.core.config import settings
+from app.core.profiling import StackSampler, profile_store
+
+TOKEN = "profile-secret"
+
+
+def test_no_profile_without_token(authenticated_client, monkeypatch):
+    """Test that requests are not profiled unless asked with the right token."""
+    response = authenticated_client.get("/api/packages/", headers={"X-Profile-Token": TOKEN})
+    assert "x-profile-id" not in response.headers
+
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+    response = authenticated_client.get("/api/packages/", headers={"X-Profile-Token": "wrong"})
+    assert "x-profile-id" not in response.headers
+    assert profile_store.list() == []
+
+
+def test_profile_by_header(authenticated_client, monkeypatch):
+    """Test that a request with the token is profiled under a generated id, keeping its request id."""
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILING_INTERVAL_SECONDS", 0.001)
+
+    response = authenticated_client.get(
+        "/api/packages/", headers={"X-Profile-Token": TOKEN, "X-Request-Id": "req-42"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    profile_id = response.headers["x-profile-id"]
+    assert len(profile_id) == 32
+
+    [profile] = profile_store.list()
+    assert profile["id"] == profile_id
+    assert profile["request_id"] == "req-42"
+    assert profile["path"] == "/api/packages/"
+    assert profile["status"] == 200
+    assert "folded" not in profile
+
+    listing = authenticated_client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN})
+    assert [p["id"] for p in listing.json()] == [profile_id]
+    folded = authenticated_client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN})
+    assert folded.status_code == status.HTTP_200_OK
+    assert folded.text == profile_store.get(profile_id)["folded"]
+
+
+def test_request_id_cannot_overwrite_profiles(client, monkeypatch, tmp_path):
+    """Test that requests reusing an X-Request-Id get profiles (and files) of their own."""
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    headers = {"X-Profile-Token": TOKEN, "X-Request-Id": "req-42"}
+
+    first = client.get("/health", headers=headers).headers["x-profile-id"]
+    second = client.get("/health", headers=headers).headers["x-profile-id"]
+    assert first != second
+    assert [p["id"] for p in profile_store.list()] == [second, first]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([f"{first}.folded", f"{second}.folded"])
+
+
+def test_profile_endpoints_require_token(client, monkeypatch):
+    """Test that the profile endpoints are hidden without the token."""
+    assert client.get("/debug/profiles").status_code == status.HTTP_404_NOT_FOUND
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", TOKEN)
+    assert client.get("/debug/profiles", headers={"X-Profile-Token": "nope"}).status_code == 404
+    assert client.get("/debug/profiles/missing", headers={"X-Profile-Token": TOKEN}).status_code == 404
+
+
+def test_sample_rate_and_profile_dir(client, monkeypatch, tmp_path):
+    """Test sampled profiling written to disk, ignoring a malformed request id."""
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+
+    response = client.get("/health", headers={"X-Request-Id": "bad id/../x"})
+    profile_id = response.headers["x-profile-id"]
+    assert (tmp_path / f"{profile_id}.folded").exists()
+    assert profile_store.get(profile_id)["request_id"] is None
+
+
+def test_sampler_folds_stacks():
+    """Test that busy app code shows up as folded stacks with counts."""
+    sampler = StackSampler(0.001, threading.get_ident())
+    sampler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    folded = sampler.stop()
+
+    assert sampler.samples > 0
+    line = folded.splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.startswith("MainThread;")
+    assert "test_sampler_folds_stacks (app/tests/test_profiling.py:" in stack
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def test_sampler_keeps_only_the_profiled_task():
+    """Test that other tasks on the event loop are counted, without their stacks."""
+    async def other_request():
+        _spin(0.05)
+
+    sampler = StackSampler(0.001, threading.get_ident(), sys._getframe())
+    sampler.start()
+    _spin(0.05)
+    await asyncio.create_task(other_request())
+    await asyncio.sleep(0.05)
+    folded = sampler.stop()
+
+    stacks = dict(line.rsplit(" ", 1) for line in folded.splitlines())
+    assert any("test_sampler_keeps_only_the_profiled_task (app/tests/test_profiling.py:" in s for s in stacks)
+    assert "MainThread;(other tasks)" in stacks
+    assert "MainThread;(io wait)" in stacks
+    assert not any("other_request" in s for s in stacks)
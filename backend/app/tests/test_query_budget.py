@@ -0,0 +1,87 @@
+"""Tests for per-request query counts, query budgets and the slow-query log."""
+import logging
+from unittest.mock import patch
+from sqlalchemy import create_engine, text
+from app.core.config import settings
+from app.db.instrumentation import (
+    instrument_queries, parameter_shape, query_budget_exceeded_total, slow_queries_total
+)
+from app.models.package import Package
+
+
+def _packages(db, user, count):
+    for i in range(count):
+        db.add(Package(user_id=user.id, tracking_number=f"AB{i:09d}ES", carrier="gls"))
+    db.commit()
+
+
+def test_query_count_header(authenticated_client, client):
+    """Test that every response reports the statements it issued."""
+    assert client.get("/api/packages/carriers").headers["X-DB-Query-Count"] == "0"
+    assert int(authenticated_client.get("/api/packages/").headers["X-DB-Query-Count"]) > 0
+
+
+def test_endpoint_query_budgets(authenticated_client, db, test_user, assert_max_queries):
+    """Test that the hot endpoints stay within a fixed number of statements."""
+    _packages(db, test_user, 30)
+    package_id = db.query(Package).first().id
+
+    assert_max_queries(authenticated_client.get("/api/packages/carriers"), 0)
+    # The package count must not change the number of statements (no N+1)
+    assert_max_queries(authenticated_client.get("/api/packages/"), 2)
+    assert_max_queries(authenticated_client.get(f"/api/packages/{package_id}"), 2)
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        mock_track.return_value = {"status": "Delivered", "location": "Madrid", "history": [], "error": None}
+        assert_max_queries(authenticated_client.get(f"/api/packages/{package_id}/track"), 5)
+
+
+def test_list_packages_is_ordered(authenticated_client, db, test_user):
+    """Test that pages come newest first with no overlap."""
+    _packages(db, test_user, 5)
+    first = authenticated_client.get("/api/packages/?limit=3").json()
+    second = authenticated_client.get("/api/packages/?skip=3&limit=3").json()
+    ids = [p["id"] for p in first + second]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 5
+
+
+def test_query_budget_exceeded(authenticated_client, monkeypatch, caplog):
+    """Test that requests over DB_QUERY_BUDGET are logged and counted."""
+    monkeypatch.setattr(settings, "DB_QUERY_BUDGET", 1)
+    with caplog.at_level(logging.WARNING, logger="app.db.instrumentation"):
+        authenticated_client.get("/api/packages/")
+    assert query_budget_exceeded_total.value(route="/api/packages/") == 1
+    assert "GET /api/packages/ issued" in caplog.text
+
+
+def test_slow_query_log(authenticated_client, monkeypatch, caplog):
+    """Test that slow statements are logged with route and parameter types only."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 1e-6)
+    with caplog.at_level(logging.WARNING, logger="app.db.instrumentation"):
+        authenticated_client.get("/api/packages/")
+
+    messages = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Slow query")]
+    assert any("from GET /api/packages/:" in m and "FROM packages" in m for m in messages)
+    assert not any("testuser" in m for m in messages)
+    assert slow_queries_total.value(engine="test", operation="SELECT") >= 1
+
+
+def test_slow_query_outside_requests(monkeypatch, caplog):
+    """Test that statements outside a request are attributed to background work."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 1e-6)
+    engine = create_engine("sqlite://")
+    instrument_queries(engine, "bg")
+    with caplog.at_level(logging.WARNING, logger="app.db.instrumentation"):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT :value"), {"value": "secret"})
+    engine.dispose()
+    assert "from background" in caplog.text
+    assert "params=['str']" in caplog.text
+    assert "secret" not in caplog.text
+
+
+def test_parameter_shape():
+    """Test that parameter shapes keep types and drop values."""
+    assert parameter_shape({"id": 1, "name": "x"}) == {"id": "int", "name": "str"}
+    assert parameter_shape((1, None)) == ["int", "NoneType"]
+    assert parameter_shape([{"id": 1}, {"id": 2}], executemany=True) == {"rows": 2, "row": {"id": "int"}}
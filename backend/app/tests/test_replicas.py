@@ -0,0 +1,152 @@
+"""Tests for read-replica routing, using separate SQLite files as replicas."""
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from fastapi import status
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.database import Base
+from app.db.routing import ReplicaRouter, parse_replica_urls, read_sessions_total
+from app.models.user import User
+from app.models.package import Package
+from app.services import package_export
+
+
+def _seed_replica(path, tracking_number):
+    """Create a replica database holding the test user and one package."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="test@example.com", username="testuser", hashed_password="x", is_active=True))
+    session.add(Package(tracking_number=tracking_number, carrier="dhl", user_id=1))
+    session.commit()
+    session.close()
+    engine.dispose()
+    return f"sqlite+aiosqlite:///{path}"
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    """Route reads to two replica databases for the duration of a test."""
+    urls = [
+        _seed_replica(tmp_path / "replica0.db", "REPLICA0"),
+        _seed_replica(tmp_path / "replica1.db", "REPLICA1"),
+    ]
+    router = ReplicaRouter(urls)
+    with patch("app.db.database.replica_router", router):
+        yield router
+
+
+def _tracking_numbers(client):
+    response = client.get("/api/packages/")
+    assert response.status_code == status.HTTP_200_OK
+    return [package["tracking_number"] for package in response.json()]
+
+
+def test_parse_replica_urls():
+    """Test parsing of the comma-separated setting."""
+    assert parse_replica_urls("") == []
+    assert parse_replica_urls(" sqlite:///a.db, sqlite:///b.db ,") == ["sqlite:///a.db", "sqlite:///b.db"]
+
+
+def test_reads_round_robin_across_replicas(authenticated_client, replicas):
+    """Test that read-only endpoints alternate between replicas."""
+    seen = [_tracking_numbers(authenticated_client) for _ in range(4)]
+    assert seen == [["REPLICA0"], ["REPLICA1"], ["REPLICA0"], ["REPLICA1"]]
+
+
+def test_read_your_writes_sticks_to_primary(authenticated_client, replicas):
+    """Test that a client reads from the primary right after writing."""
+    response = authenticated_client.post(
+        "/api/packages/",
+        json={"tracking_number": "PRIMARY1", "carrier": "gls"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert _tracking_numbers(authenticated_client) == ["PRIMARY1"]
+    assert read_sessions_total.value(target="primary", reason="sticky") > 0
+
+    # Once the window has passed, reads go back to the replicas
+    replicas.clear()
+    assert _tracking_numbers(authenticated_client) in (["REPLICA0"], ["REPLICA1"])
+
+
+def test_unhealthy_replica_is_skipped(authenticated_client, tmp_path):
+    """Test that a replica that cannot be reached is marked unhealthy and skipped."""
+    healthy = _seed_replica(tmp_path / "replica.db", "REPLICA0")
+    router = ReplicaRouter(["sqlite+aiosqlite:////nonexistent-dir/replica.db", healthy])
+    with patch("app.db.database.replica_router", router):
+        for _ in range(3):
+            assert _tracking_numbers(authenticated_client) == ["REPLICA0"]
+
+    assert router.replicas[0].healthy is False
+    assert router.replicas[1].healthy is True
+
+
+def test_all_replicas_down_falls_back_to_primary(authenticated_client, db, test_user):
+    """Test that reads use the primary when no replica is healthy."""
+    db.add(Package(tracking_number="PRIMARY1", carrier="dhl", user_id=test_user.id))
+    db.commit()
+
+    router = ReplicaRouter(["sqlite+aiosqlite:////nonexistent-dir/replica.db"])
+    with patch("app.db.database.replica_router", router), \
+            patch.object(settings, "DB_REPLICA_HEALTH_CHECK_INTERVAL", 60):
+        assert _tracking_numbers(authenticated_client) == ["PRIMARY1"]
+        assert _tracking_numbers(authenticated_client) == ["PRIMARY1"]
+    assert read_sessions_total.value(target="primary", reason="no_healthy_replica") == 2
+
+
+@pytest.mark.parametrize("error", [
+    exc.TimeoutError("QueuePool limit of size 5 overflow 10 reached, connection timed out"),
+    asyncio.TimeoutError(),
+])
+def test_replica_timeout_falls_back_to_primary(authenticated_client, db, test_user, tmp_path, error):
+    """Test that a saturated replica (pool or connect timeout) is skipped instead of failing the request."""
+    db.add(Package(tracking_number="PRIMARY1", carrier="dhl", user_id=test_user.id))
+    db.commit()
+
+    class TimingOutSession(AsyncSession):
+        async def connection(self, **kw):
+            raise error
+
+    router = ReplicaRouter([_seed_replica(tmp_path / "replica.db", "REPLICA0")])
+    replica = router.replicas[0]
+    replica._sessionmaker = async_sessionmaker(replica.engine, class_=TimingOutSession)
+    with patch("app.db.database.replica_router", router):
+        assert _tracking_numbers(authenticated_client) == ["PRIMARY1"]
+
+    assert replica.healthy is False
+    assert read_sessions_total.value(target="primary", reason="no_healthy_replica") == 1
+
+
+def test_export_streams_from_a_replica_and_closes_it(authenticated_client, replicas):
+    """Test that exports open their replica session inside the stream and close it at the end."""
+    sessions = []
+
+    class TrackedSession(AsyncSession):
+        def __init__(self, *args, **kw):
+            super().__init__(*args, **kw)
+            self.closed = False
+            sessions.append(self)
+
+        async def close(self):
+            self.closed = True
+            await super().close()
+
+    for replica in replicas.replicas:
+        replica._sessionmaker = async_sessionmaker(replica.engine, class_=TrackedSession)
+
+    with patch("app.api.packages.replica_router", replicas):
+        response = authenticated_client.get("/api/packages/export")
+        assert response.status_code == status.HTTP_200_OK
+        assert [json.loads(line)["tracking_number"] for line in response.text.splitlines()] in (["REPLICA0"], ["REPLICA1"])
+        assert sessions and all(session.closed for session in sessions)
+
+        # A stream that is never iterated (client gone before the first chunk) opens nothing
+        opened = len(sessions)
+        stream = package_export.export_packages(None, 1, "ndjson", read_session=replicas.read_session)
+        asyncio.run(stream.aclose())
+        assert len(sessions) == opened
@@ -0,0 +1,67 @@
+"""Tests for the fast JSON response path."""
+from datetime import datetime, timedelta, timezone
+from typing import List
+from unittest.mock import patch
+from pydantic import TypeAdapter
+from app.api.schemas import PackageResponse, TrackingInfo
+from app.api.serializers import PACKAGE_FIELDS, package_rows_json, tracking_info_json
+from app.models.package import Package
+
+ROWS = [
+    (1, "AB123456789ES", "gls", 7, "Shoes", "Délivré", None,
+     datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc), None),
+    (2, "CD123456789ES", "dhlen", 7, None, None, "Madrid",
+     datetime(2026, 1, 2, 3, 4, 5, 120, tzinfo=timezone(timedelta(hours=2))),
+     datetime(2026, 1, 3, 0, 0, 0)),
+]
+
+
+def test_package_rows_match_pydantic():
+    """Test that the fast encoder produces exactly the schema's JSON."""
+    expected = TypeAdapter(List[PackageResponse]).dump_json(
+        [PackageResponse(**dict(zip(PACKAGE_FIELDS, row))) for row in ROWS]
+    )
+    assert package_rows_json(ROWS) == expected
+    assert package_rows_json([]) == b"[]"
+
+
+def test_tracking_info_matches_pydantic():
+    """Test that tracking results are encoded like TrackingInfo, extra keys dropped."""
+    info = {
+        "status": "In Transit", "location": "Madrid", "error": None, "carrier": "gls",
+        "history": [{"status": "In transit", "location": "Madrid", "timestamp": "2026-01-01 08:00:00"}],
+        "raw": {"ignored": True},
+    }
+    assert tracking_info_json(info) == TrackingInfo(**info).model_dump_json().encode()
+
+
+def test_list_packages_response(authenticated_client, db, test_user):
+    """Test that the list endpoint returns what PackageResponse would."""
+    for number in ("AB123456789ES", "CD123456789ES"):
+        db.add(Package(user_id=test_user.id, tracking_number=number, carrier="gls", description="Box"))
+    db.commit()
+
+    response = authenticated_client.get("/api/packages/")
+    assert response.headers["content-type"] == "application/json"
+    packages = db.query(Package).order_by(Package.id.desc()).all()
+    expected = TypeAdapter(List[PackageResponse]).dump_json(
+        [PackageResponse.model_validate(p) for p in packages]
+    )
+    assert response.content == expected
+
+
+def test_track_response(authenticated_client, db, test_user):
+    """Test that the track endpoint returns only TrackingInfo fields."""
+    package = Package(user_id=test_user.id, tracking_number="AB123456789ES", carrier="gls")
+    db.add(package)
+    db.commit()
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        mock_track.return_value = {
+            "status": "Delivered", "location": "Madrid", "history": [], "error": None, "carrier": "gls", "extra": 1
+        }
+        response = authenticated_client.get(f"/api/packages/{package.id}/track")
+    data = response.json()
+    assert data.pop("fetched_at").endswith("Z")
+    assert data == {
+        "status": "Delivered", "location": "Madrid", "history": [], "error": None, "carrier": "gls", "stale": False
+    }
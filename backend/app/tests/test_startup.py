@@ -0,0 +1,29 @@
+"""Tests for worker cold start: lazy imports and time to first request."""
+from app.db import database
+from app.strategies import keydelivery
+from benchmarks.startup import DEFAULT_BUDGET_MS, measure_once, parse_importtime
+
+
+def test_first_request_within_budget():
+    """Test that a fresh worker answers its first request in budget without loading deferred modules."""
+    result = measure_once()
+    assert result["deferred_loaded"] == []
+    assert result["time_to_first_request_ms"] < DEFAULT_BUDGET_MS
+
+
+def test_parse_importtime():
+    """Test parsing of ``python -X importtime`` output."""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   orjson\n"
+        "import time:      1500 |       2000 | app.main\n"
+    )
+    assert parse_importtime(stderr) == [("orjson", 0.12, 0.12), ("app.main", 1.5, 2.0)]
+
+
+def test_lazy_module_attributes():
+    """Test that names loaded on first use still resolve as module attributes."""
+    import requests
+
+    assert keydelivery.requests is requests
+    assert database.SessionLocal is database.get_session_factory()
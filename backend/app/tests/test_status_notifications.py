@@ -0,0 +1,134 @@
+"""Tests for status change digests."""
+import time
+from unittest.mock import patch
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.models.email_outbox import EmailOutbox
+from app.models.package import Package
+from app.models.status_change import StatusChange
+from app.models.user import User
+from app.services.notifications import DigestBuilder, digests_total, merge_changes
+from app.services.outbox import OutboxSender
+from conftest import TestingAsyncSessionLocal
+
+
+def _track(client, package_id, new_status):
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        mock_track.return_value = {
+            "status": new_status,
+            "location": "Madrid",
+            "history": [],
+            "error": None,
+        }
+        return client.get(f"/api/packages/{package_id}/track?max_age=0")
+
+
+def _builder():
+    return DigestBuilder(TestingAsyncSessionLocal, OutboxSender(TestingAsyncSessionLocal))
+
+
+def _package(db, user, tracking_number, **fields):
+    package = Package(user_id=user.id, tracking_number=tracking_number, carrier="gls", **fields)
+    db.add(package)
+    db.commit()
+    return package
+
+
+def _change(db, user, package, old_status, new_status, changed_at=0.0):
+    db.add(StatusChange(
+        user_id=user.id, package_id=package.id,
+        old_status=old_status, new_status=new_status, changed_at=changed_at
+    ))
+    db.commit()
+
+
+def test_tracking_records_status_changes(authenticated_client, db, test_user):
+    """Test that tracking records a change only when the status differs."""
+    package = _package(db, test_user, "AB123456789ES")
+
+    _track(authenticated_client, package.id, "In transit")
+    _track(authenticated_client, package.id, "In transit")
+    _track(authenticated_client, package.id, "Delivered")
+
+    changes = db.query(StatusChange).order_by(StatusChange.id).all()
+    assert [(c.old_status, c.new_status) for c in changes] == [
+        (None, "In transit"), ("In transit", "Delivered")
+    ]
+    assert all(c.notified_at is None for c in changes)
+
+
+def test_tracking_ignores_changes_when_disabled(authenticated_client, db, test_user, monkeypatch):
+    """Test that no changes are recorded with notifications disabled."""
+    monkeypatch.setattr(settings, "STATUS_NOTIFICATIONS_ENABLED", False)
+    package = _package(db, test_user, "AB123456789ES")
+    _track(authenticated_client, package.id, "Delivered")
+    assert db.query(StatusChange).count() == 0
+
+
+def test_merge_changes():
+    """Test that repeated transitions of a package collapse into one."""
+    changes = [
+        {"package_id": 1, "old_status": None, "new_status": "In transit"},
+        {"package_id": 2, "old_status": "In transit", "new_status": "Out for delivery"},
+        {"package_id": 1, "old_status": "In transit", "new_status": "Delivered"},
+        {"package_id": 2, "old_status": "Out for delivery", "new_status": "In transit"},
+    ]
+    assert merge_changes(changes) == [
+        {"package_id": 1, "old_status": None, "new_status": "Delivered"},
+    ]
+
+
+async def test_digest_waits_for_window(db, test_user):
+    """Test that changes younger than the window are held back."""
+    package = _package(db, test_user, "AB123456789ES")
+    _change(db, test_user, package, None, "In transit", changed_at=time.time())
+
+    assert await _builder().run_once() == 0
+    assert db.query(EmailOutbox).count() == 0
+
+
+async def test_one_digest_per_user(db, test_user):
+    """Test that all pending changes of a user are merged into one email."""
+    first = _package(db, test_user, "AB123456789ES", description="Shoes")
+    second = _package(db, test_user, "CD123456789ES")
+    _change(db, test_user, first, None, "In transit")
+    _change(db, test_user, first, "In transit", "Delivered")
+    _change(db, test_user, second, "In transit", "<Held>")
+
+    other = User(
+        email="other@example.com",
+        username="otheruser",
+        hashed_password=get_password_hash("otherpassword123"),
+        is_active=True
+    )
+    db.add(other)
+    db.commit()
+    _change(db, other, _package(db, other, "EF123456789ES"), None, "In transit")
+
+    assert await _builder().run_once() == 2
+
+    emails = {m.to_email: m for m in db.query(EmailOutbox).all()}
+    assert set(emails) == {"test@example.com", "other@example.com"}
+    digest = emails["test@example.com"]
+    assert digest.subject.endswith("2 package updates")
+    assert "AB123456789ES (Shoes): New -> Delivered" in digest.text_body
+    assert "&lt;Held&gt;" in digest.html_body
+    assert digests_total.value() == 2
+
+    db.expire_all()
+    assert all(c.notified_at is not None for c in db.query(StatusChange).all())
+    # Nothing left to send
+    assert await _builder().run_once() == 0
+
+
+async def test_digest_skips_inactive_users(db, test_user):
+    """Test that inactive users' changes are consumed without an email."""
+    package = _package(db, test_user, "AB123456789ES")
+    _change(db, test_user, package, None, "Delivered")
+    test_user.is_active = False
+    db.commit()
+
+    assert await _builder().run_once() == 1
+    assert db.query(EmailOutbox).count() == 0
+    db.expire_all()
+    assert db.query(StatusChange).one().notified_at is not None
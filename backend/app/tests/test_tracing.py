@@ -0,0 +1,128 @@
+"""Tests for request tracing."""
+import json
+from unittest.mock import MagicMock, patch
+import pytest
+from app.core import cache, tracing
+from app.core.config import settings
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    """Trace every request into the in-memory exporter."""
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "memory")
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+    return tracing.memory_exporter
+
+
+def _by_name(spans, name):
+    return [span for span in spans if span["name"] == name]
+
+
+def test_track_request_spans(authenticated_client, traced, monkeypatch):
+    """Test that a /track request has auth, DB, commit and KeyDelivery child spans."""
+    package_id = authenticated_client.post(
+        "/api/packages/",
+        json={"tracking_number": "AB123456789ES", "carrier": "gls"}
+    ).json()["id"]
+    traced.clear()
+    cache.reset_all()  # a cold user cache, so the auth span includes the user lookup
+
+    monkeypatch.setattr(settings, "KD100_APIKEY", "key")
+    monkeypatch.setattr(settings, "KD100_SECRET", "secret")
+    mock_response = MagicMock(status_code=200)
+    mock_response.json.return_value = {"code": 200, "data": {"order_status_code": 2, "items": []}}
+    with patch("app.strategies.keydelivery.requests.post", return_value=mock_response) as mock_post:
+        response = authenticated_client.get(f"/api/packages/{package_id}/track")
+
+    spans = list(traced.spans)
+    root = _by_name(spans, "GET /api/packages/{package_id}/track")[0]
+    assert root["parent_id"] is None
+    assert root["attributes"]["http.status_code"] == 200
+    assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+    assert response.headers["traceparent"].startswith(f"00-{root['trace_id']}-")
+
+    auth = _by_name(spans, "auth.get_current_user")[0]
+    assert auth["parent_id"] == root["span_id"]
+    assert auth["attributes"]["auth.method"] == "jwt"
+    # The user lookup runs inside the auth span
+    assert any(s["parent_id"] == auth["span_id"] for s in _by_name(spans, "db.query"))
+    assert _by_name(spans, "db.commit")
+
+    upstream = _by_name(spans, "keydelivery.track")[0]
+    assert upstream["attributes"]["http.status_code"] == 200
+    sent_traceparent = mock_post.call_args.kwargs["headers"]["traceparent"]
+    assert sent_traceparent == f"00-{root['trace_id']}-{upstream['span_id']}-01"
+
+
+def test_incoming_traceparent_is_continued(client, traced):
+    """Test that an incoming sampled traceparent continues the caller's trace."""
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    client.get("/health", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    root = traced.spans[-1]
+    assert root["trace_id"] == trace_id
+    assert root["parent_id"] == parent_id
+
+
+def test_sampling(client, traced, monkeypatch):
+    """Test head-based sampling, including the caller's not-sampled flag."""
+    client.get("/health", headers={"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"})
+    assert len(traced.spans) == 0
+
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 0.0)
+    response = client.get("/health")
+    assert len(traced.spans) == 0
+    assert "traceparent" not in response.headers
+
+
+def test_span_limit_per_trace(traced, monkeypatch):
+    """Test that traces stop growing past TRACING_MAX_SPANS_PER_TRACE."""
+    monkeypatch.setattr(settings, "TRACING_MAX_SPANS_PER_TRACE", 3)
+    root = tracing.start_trace("root")
+    token = tracing.activate(root)
+    try:
+        for _ in range(5):
+            with tracing.span("child"):
+                pass
+    finally:
+        tracing.deactivate(token)
+    tracing.finish_trace(root, traced)
+
+    assert len(traced.spans) == 3
+    assert traced.spans[0]["attributes"]["trace.dropped_spans"] == 3
+
+
+def test_span_records_errors(traced):
+    """Test that exceptions mark the span as failed."""
+    root = tracing.start_trace("root")
+    token = tracing.activate(root)
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+    tracing.deactivate(token)
+    tracing.finish_trace(root, traced)
+
+    failing = _by_name(traced.spans, "failing")[0]
+    assert failing["status"] == "error"
+    assert failing["attributes"]["error.type"] == "ValueError"
+
+
+def test_file_exporter(client, tmp_path, monkeypatch):
+    """Test that the file exporter writes one JSON span per line."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "TRACING_EXPORTER", "file")
+    monkeypatch.setattr(settings, "TRACING_FILE", str(path))
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+    client.get("/health")
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert spans[0]["name"] == "GET /health"
+    assert spans[0]["duration_ms"] >= 0
+
+
+def test_no_spans_without_tracing(client):
+    """Test that nothing is recorded when tracing is off (the default)."""
+    response = client.get("/health")
+    assert "traceparent" not in response.headers
+    assert tracing.current_span() is None
+    assert len(tracing.memory_exporter.spans) == 0
@@ -0,0 +1,144 @@
+"""Tests for tracking snapshots with stale-while-revalidate and stale-if-error."""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from app.core.config import settings
+from app.models.package import Package
+from app.services import tracking
+from app.services.tracking import TrackingRefresher, refreshes_total, snapshot_requests_total, tracking_refresher
+from conftest import TestingAsyncSessionLocal
+
+UPSTREAM = {"status": "Delivered", "location": "Barcelona", "history": [], "error": None, "carrier": "gls"}
+FAILURE = {"status": None, "location": None, "history": [], "error": "KeyDelivery API error: timeout"}
+
+
+def _package(db, user, age, **fields):
+    package = Package(
+        user_id=user.id, tracking_number="AB123456789ES", carrier="gls", status="In transit",
+        tracking_data=json.dumps({
+            "status": "In transit", "location": "Madrid", "history": [{"status": "In transit"}], "error": None
+        }),
+        tracking_updated_at=datetime.now(timezone.utc) - timedelta(seconds=age),
+        **fields,
+    )
+    db.add(package)
+    db.commit()
+    return package
+
+
+def test_fresh_snapshot_skips_upstream(authenticated_client, db, test_user):
+    """Test that a snapshot younger than max_age is served without calling KeyDelivery."""
+    package = _package(db, test_user, age=60)
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        response = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=120")
+    assert response.status_code == 200
+    mock_track.assert_not_called()
+    data = response.json()
+    assert data["status"] == "In transit"
+    assert data["history"] == [{"status": "In transit"}]
+    assert data["stale"] is False
+    assert data["fetched_at"].endswith("Z")
+    assert 59 <= int(response.headers["age"]) <= 61
+    assert snapshot_requests_total.value(result="fresh") == 1
+
+
+def test_default_max_age(authenticated_client, db, test_user, monkeypatch):
+    """Test that TRACKING_MAX_AGE_SECONDS applies when no max_age is sent."""
+    monkeypatch.setattr(settings, "TRACKING_MAX_AGE_SECONDS", 600)
+    package = _package(db, test_user, age=300)
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        response = authenticated_client.get(f"/api/packages/{package.id}/track")
+    mock_track.assert_not_called()
+    assert response.json()["stale"] is False
+
+
+def test_stale_snapshot_served_and_refreshed(authenticated_client, db, test_user):
+    """Test that a stale snapshot is returned at once and refreshed in the background."""
+    package = _package(db, test_user, age=600)
+    with patch('app.strategies.keydelivery.track', return_value=dict(UPSTREAM)) as mock_track:
+        response = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=60")
+        data = response.json()
+        assert data["status"] == "In transit"
+        assert data["stale"] is True
+        authenticated_client.portal.call(tracking_refresher.drain)
+    mock_track.assert_called_once_with("AB123456789ES", "gls")
+    assert refreshes_total.value(outcome="ok") == 1
+
+    db.expire_all()
+    refreshed = db.get(Package, package.id)
+    assert refreshed.status == "Delivered"
+    assert refreshed.last_location == "Barcelona"
+    with patch('app.strategies.keydelivery.track') as mock_track:
+        data = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=60").json()
+    mock_track.assert_not_called()
+    assert data["status"] == "Delivered"
+    assert data["stale"] is False
+
+
+def test_very_old_snapshot_refreshed_inline(authenticated_client, db, test_user):
+    """Test that snapshots past the stale-while-revalidate window go upstream synchronously."""
+    package = _package(db, test_user, age=60 + settings.TRACKING_STALE_WHILE_REVALIDATE_SECONDS + 60)
+    with patch('app.strategies.keydelivery.track', return_value=dict(UPSTREAM)):
+        data = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=60").json()
+    assert data["status"] == "Delivered"
+    assert data["stale"] is False
+    assert snapshot_requests_total.value(result="upstream") == 1
+
+
+def test_max_age_zero_forces_upstream(authenticated_client, db, test_user):
+    """Test that max_age=0 always asks KeyDelivery."""
+    package = _package(db, test_user, age=1)
+    with patch('app.strategies.keydelivery.track', return_value=dict(UPSTREAM)) as mock_track:
+        data = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=0").json()
+    mock_track.assert_called_once()
+    assert data["status"] == "Delivered"
+
+
+def test_stale_if_error(authenticated_client, db, test_user):
+    """Test that the snapshot, flagged stale, replaces an upstream error."""
+    package = _package(db, test_user, age=3600)
+    with patch('app.strategies.keydelivery.track', return_value=dict(FAILURE)):
+        response = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=0")
+    data = response.json()
+    assert data["status"] == "In transit"
+    assert data["error"] is None
+    assert data["stale"] is True
+    assert snapshot_requests_total.value(result="stale_if_error") == 1
+
+    db.expire_all()
+    assert db.get(Package, package.id).status == "In transit"
+
+
+def test_error_without_usable_snapshot(authenticated_client, db, test_user):
+    """Test that the upstream error is returned when there is no snapshot, or it is too old."""
+    never_tracked = Package(user_id=test_user.id, tracking_number="CD123456789ES", carrier="gls")
+    db.add(never_tracked)
+    db.commit()
+    too_old = _package(db, test_user, age=settings.TRACKING_STALE_IF_ERROR_SECONDS + 60)
+    with patch('app.strategies.keydelivery.track', return_value=dict(FAILURE)):
+        for package in (never_tracked, too_old):
+            data = authenticated_client.get(f"/api/packages/{package.id}/track?max_age=0").json()
+            assert data["error"] == FAILURE["error"]
+            assert data["stale"] is False
+
+
+async def test_refreshes_are_deduplicated(db, test_user):
+    """Test that only one background refresh runs per package."""
+    package = _package(db, test_user, age=600)
+    refresher = TrackingRefresher()
+    release = asyncio.Event()
+
+    async def slow_fetch(package):
+        await release.wait()
+        return dict(UPSTREAM)
+
+    with patch.object(tracking, "fetch", slow_fetch):
+        assert refresher.schedule(TestingAsyncSessionLocal, package.id) is True
+        assert refresher.schedule(TestingAsyncSessionLocal, package.id) is False
+        release.set()
+        await refresher.drain()
+        assert refresher.schedule(TestingAsyncSessionLocal, package.id) is True
+        await refresher.drain()
+    assert refreshes_total.value(outcome="deduplicated") == 1
+    assert refreshes_total.value(outcome="ok") == 2
@@ -0,0 +1 @@
+"""In-process endpoint benchmarks (see ``python -m benchmarks.run --help``)."""
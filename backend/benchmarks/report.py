@@ -0,0 +1,63 @@
+"""Latency summaries and baseline comparison for the benchmark suite."""
+import json
+import math
+from typing import Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 < pct <= 100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: Sequence[float], wall_seconds: float, concurrency: int, errors: int = 0) -> Dict:
+    """Summarize request latencies (seconds) of one scenario in milliseconds."""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return one message per regression beyond ``threshold`` (a fraction, e.g. 0.25).
+
+    A scenario regresses when its p95 latency grows, or its throughput drops,
+    by more than the threshold relative to the baseline. Scenarios missing
+    from either side are ignored.
+    """
+    regressions = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base.get('errors', 0)})")
+        if base["p95_ms"] > 0 and current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {current['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms"
+            )
+        if base["throughput_rps"] > 0 and current["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']:.1f} req/s vs baseline {base['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write(path: str, results: Dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
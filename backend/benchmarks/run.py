@@ -0,0 +1,268 @@
+"""Benchmark the API in-process against a seeded SQLite database.
+
+    cd backend
+    python -m benchmarks.run                    # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --update-baseline  # record a new baseline
+
+Requests go through ``app.main:app`` via httpx's ASGI transport, so the whole
+middleware and dependency stack is measured without a network hop.
+KeyDelivery is replaced by a local stub answering after --upstream-latency
+seconds. Per scenario the p50/p95/p99 latency and throughput are written to
+--output as JSON; the exit status is 1 when a scenario regressed by more than
+--threshold against the baseline.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List
+from unittest.mock import patch
+from benchmarks import report
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+USERNAME = "benchuser"
+PASSWORD = "benchpassword123"
+LIST_SIZES = (10, 100, 1000)
+# bcrypt makes logins far slower than anything else; run fewer of them
+LOGIN_SHARE = 0.1
+
+
+def configure_environment(db_path: str) -> None:
+    """Point the app at a scratch database; must run before ``app`` is imported."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "EMAIL_OUTBOX_ENABLED": "false",
+        "TRACING_EXPORTER": "none",
+        "KD100_APIKEY": "benchmark",
+        "KD100_SECRET": "benchmark",
+    })
+
+
+def seed(package_count: int) -> None:
+    """Create the schema, a benchmark user and ``package_count`` packages."""
+    from app.core.security import get_password_hash
+    from app.db.database import Base, get_engine
+    from app.models import api_key, cache_entry, email_outbox, login_attempt, package, status_change, user  # noqa: F401
+
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        result = conn.execute(user.User.__table__.insert().values(
+            email="bench@example.com",
+            username=USERNAME,
+            hashed_password=get_password_hash(PASSWORD),
+            is_active=True,
+        ))
+        user_id = result.inserted_primary_key[0]
+        # Every package has a fresh snapshot, as right after a tracking lookup
+        snapshot = json.dumps({
+            "status": "In Transit",
+            "location": "Madrid",
+            "history": [{"status": "In Transit", "location": "Madrid", "timestamp": "2026-10-19 08:00:00"}],
+            "error": None,
+            "carrier": "gls",
+        })
+        tracked_at = datetime.now(timezone.utc)
+        conn.execute(package.Package.__table__.insert(), [
+            {
+                "user_id": user_id,
+                "tracking_number": f"BM{i:09d}ES",
+                "carrier": "gls",
+                "description": f"Benchmark package {i}",
+                "status": "In Transit",
+                "tracking_data": snapshot,
+                "tracking_updated_at": tracked_at,
+            }
+            for i in range(package_count)
+        ])
+    engine.dispose()
+
+
+class _StubResponse:
+    status_code = 200
+
+    def __init__(self, payload: Dict):
+        self._payload = payload
+
+    def json(self) -> Dict:
+        return self._payload
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+def keydelivery_stub(latency: float) -> Callable:
+    """A stand-in for ``requests.post`` answering like KeyDelivery after ``latency`` seconds."""
+    def post(url, data=None, headers=None, **kwargs):
+        time.sleep(latency)
+        payload = json.loads(data or "{}")
+        return _StubResponse({
+            "code": 200,
+            "message": "success",
+            "data": {
+                "carrier_id": payload.get("carrier_id"),
+                "order_status_code": 2,
+                "items": [{
+                    "order_status_description": "In Transit",
+                    "location": "Madrid",
+                    "time": "2026-10-19 08:00:00",
+                    "context": "Arrived at sorting hub",
+                }],
+            },
+        })
+    return post
+
+
+async def run_scenario(
+    client, request: Callable[[object, int], Awaitable], total: int, concurrency: int, warmup: int
+) -> Dict:
+    """Issue ``total`` requests from ``concurrency`` workers and summarize their latency."""
+    for i in range(warmup):
+        await request(client, i)
+
+    latencies: List[float] = []
+    errors = 0
+    indexes = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        # Workers share one iterator, so each index is requested once
+        for i in indexes:
+            started = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report.summarize(latencies, time.perf_counter() - started, concurrency, errors)
+
+
+def scenarios(package_ids: List[int]) -> Dict[str, Callable]:
+    def login(client, i):
+        return client.post("/api/auth/login", data={"username": USERNAME, "password": PASSWORD})
+
+    def list_packages(limit):
+        return lambda client, i: client.get("/api/packages/", params={"limit": limit})
+
+    def get_package(client, i):
+        return client.get(f"/api/packages/{package_ids[i % len(package_ids)]}")
+
+    def track_package(client, i):
+        # Served from the stored snapshot
+        return client.get(f"/api/packages/{package_ids[i % len(package_ids)]}/track")
+
+    def track_package_upstream(client, i):
+        return client.get(f"/api/packages/{package_ids[i % len(package_ids)]}/track?max_age=0")
+
+    def carriers(client, i):
+        return client.get("/api/packages/carriers")
+
+    return {
+        "login": login,
+        **{f"list_packages_{size}": list_packages(size) for size in LIST_SIZES},
+        "get_package": get_package,
+        "track_package": track_package,
+        "track_package_upstream": track_package_upstream,
+        "carriers": carriers,
+    }
+
+
+async def run_benchmarks(args) -> Dict:
+    import httpx
+    from app.main import app
+    from app.db.database import dispose_engines
+    from app.strategies import keydelivery
+
+    # The slow-query log would flood the output for the large listings
+    logging.getLogger("app").setLevel(logging.ERROR)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        response = await client.post("/api/auth/login", data={"username": USERNAME, "password": PASSWORD})
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        listing = await client.get("/api/packages/", params={"limit": 100})
+        package_ids = [p["id"] for p in listing.json()]
+
+        selected = scenarios(package_ids)
+        if args.scenarios:
+            selected = {name: selected[name] for name in args.scenarios.split(",")}
+        with patch.object(keydelivery.requests, "post", keydelivery_stub(args.upstream_latency)):
+            for name, request in selected.items():
+                total = max(10, int(args.requests * LOGIN_SHARE)) if name == "login" else args.requests
+                results[name] = await run_scenario(client, request, total, args.concurrency, args.warmup)
+                print(
+                    f"{name:<22} p50 {results[name]['p50_ms']:>9.2f} ms  p95 {results[name]['p95_ms']:>9.2f} ms  "
+                    f"p99 {results[name]['p99_ms']:>9.2f} ms  {results[name]['throughput_rps']:>8.1f} req/s"
+                )
+    await dispose_engines()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario (logins: 10%%)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="stubbed KeyDelivery latency (s)")
+    parser.add_argument("--packages", type=int, default=max(LIST_SIZES), help="packages seeded for the user")
+    parser.add_argument("--scenarios", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(os.path.join(tmp, "benchmark.db"))
+        seed(args.packages)
+        scenario_results = asyncio.run(run_benchmarks(args))
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "upstream_latency": args.upstream_latency,
+            "packages": args.packages,
+        },
+        "scenarios": scenario_results,
+    }
+    report.write(args.output, results)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        report.write(args.baseline, results)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with; run with --update-baseline to record one")
+        return 0
+
+    baseline = report.load(args.baseline)
+    for key in ("requests", "concurrency", "upstream_latency", "packages"):
+        if baseline["meta"].get(key) != results["meta"][key]:
+            print(f"Warning: {key} differs from the baseline ({baseline['meta'].get(key)})")
+    regressions = report.compare(results, baseline, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
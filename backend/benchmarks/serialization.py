@@ -0,0 +1,83 @@
+"""Serialization cost per row of the package list response.
+
+    cd backend
+    python -m benchmarks.serialization
+
+Compares the previous path (ORM objects validated through
+``PackageResponse`` with ``from_attributes``, then FastAPI's encoder and the
+stdlib JSON response) with the fast path (row tuples encoded by orjson),
+for the page sizes clients use. No database is involved: the ORM objects
+and tuples are built in memory, so only serialization is measured.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.api.schemas import PackageResponse
+from app.api.serializers import PACKAGE_FIELDS, package_rows_json
+from app.models.package import Package
+import app.models.user  # noqa: F401  (registers the model behind Package.user)
+from benchmarks import report
+
+SIZES = (10, 100, 1000)
+
+
+def make_rows(count: int) -> List[tuple]:
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        (i, f"AB{i:09d}ES", "gls", 1, f"Package {i}", "In Transit", "Madrid",
+         created + timedelta(minutes=i), created + timedelta(minutes=i, seconds=30))
+        for i in range(count)
+    ]
+
+
+def pydantic_path(packages: List[Package]) -> bytes:
+    # What FastAPI does for response_model=List[PackageResponse] with ORM objects
+    validated = [PackageResponse.model_validate(p) for p in packages]
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(rows: List[tuple]) -> bytes:
+    return package_rows_json(rows)
+
+
+def time_per_row(func: Callable, payload, rows: int, min_seconds: float) -> float:
+    """Best-of-batches seconds per row."""
+    best = float("inf")
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        func(payload)
+        best = min(best, time.perf_counter() - started)
+    return best / rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per measurement")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict] = {}
+    for size in SIZES:
+        rows = make_rows(size)
+        packages = [Package(**dict(zip(PACKAGE_FIELDS, row))) for row in rows]
+        before = time_per_row(pydantic_path, packages, size, args.seconds)
+        after = time_per_row(fast_path, rows, size, args.seconds)
+        results[f"list_{size}"] = {
+            "pydantic_us_per_row": round(before * 1e6, 3),
+            "fast_us_per_row": round(after * 1e6, 3),
+            "speedup": round(before / after, 1),
+        }
+        print(f"{size:>5} rows  pydantic {before * 1e6:8.2f} us/row  fast {after * 1e6:8.2f} us/row  "
+              f"x{before / after:.1f}")
+    if args.output:
+        report.write(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Worker cold start: import-time profile and time to first request.
+
+    cd backend
+    python -m benchmarks.startup                   # median of --runs cold starts against --budget-ms
+    python -m benchmarks.startup --importtime 25   # also list the 25 slowest imports of app.main
+
+Each run starts a fresh interpreter that imports ``app.main``, runs the
+lifespan startup and answers ``GET /health`` through httpx's ASGI transport,
+as a worker does before it can take traffic. Interpreter startup itself is
+not included. The exit status is 1 when the median time to first request
+exceeds --budget-ms, or when a module that should load on first use
+(``DEFERRED_MODULES``) was imported during boot.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time to first request allowed for one worker, in milliseconds
+DEFAULT_BUDGET_MS = 2500.0
+
+# Only needed by some requests or background work: never imported at boot
+DEFERRED_MODULES = (
+    "requests",            # KeyDelivery calls
+    "jose",                # first JWT
+    "passlib",             # password hashing
+    "smtplib",             # outbox delivery
+    "email.mime",          # building emails
+    "app.data.carriers",   # carrier catalog
+    "asyncpg",             # first database connection
+    "psycopg2",
+)
+
+
+def child_environment(db_path: str) -> Dict[str, str]:
+    """Environment of a measured worker: scratch SQLite database, no background delivery."""
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db_path}",
+        "EMAIL_OUTBOX_ENABLED": "false",
+        "TRACING_EXPORTER": "none",
+    }
+
+
+async def _first_request() -> Dict:
+    import httpx
+
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+    deferred_loaded = [
+        module for module in DEFERRED_MODULES
+        if any(name == module or name.startswith(module + ".") for name in sys.modules)
+    ]
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            response = await client.get("/health")
+        answered = time.perf_counter()
+    response.raise_for_status()
+    return {
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (answered - ready) * 1000,
+        "time_to_first_request_ms": (answered - started) * 1000,
+        "deferred_loaded": deferred_loaded,
+    }
+
+
+def measure_once() -> Dict:
+    """Cold-start one worker in a subprocess and return its timings."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child"],
+            cwd=BACKEND_DIR, env=child_environment(os.path.join(tmp, "startup.db")),
+            capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float]]:
+    """(module, self ms, cumulative ms) from ``python -X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return modules
+
+
+def import_profile() -> List[Tuple[str, float, float]]:
+    """Import ``app.main`` under ``-X importtime`` in a fresh interpreter."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=BACKEND_DIR, env=child_environment(os.path.join(tmp, "startup.db")),
+            capture_output=True, text=True, check=True,
+        )
+    return parse_importtime(result.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="allowed median time to first request")
+    parser.add_argument("--importtime", type=int, metavar="N", default=0, help="list the N slowest imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        import asyncio
+
+        print(json.dumps(asyncio.run(_first_request())))
+        return 0
+
+    if args.importtime:
+        modules = import_profile()
+        print(f"{'self ms':>9} {'cumul. ms':>9}  module")
+        for name, self_ms, cumulative_ms in sorted(modules, key=lambda m: m[1], reverse=True)[:args.importtime]:
+            print(f"{self_ms:>9.1f} {cumulative_ms:>9.1f}  {name}")
+        print()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    for key in ("import_ms", "startup_ms", "first_request_ms", "time_to_first_request_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:<26} median {statistics.median(values):>8.1f}  min {min(values):>8.1f}  max {max(values):>8.1f}")
+
+    failed = False
+    deferred_loaded = sorted({name for run in runs for name in run["deferred_loaded"]})
+    if deferred_loaded:
+        print(f"FAIL imported at boot: {', '.join(deferred_loaded)}")
+        failed = True
+    median = statistics.median(run["time_to_first_request_ms"] for run in runs)
+    if median > args.budget_ms:
+        print(f"FAIL time to first request {median:.1f} ms over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print(f"Time to first request {median:.1f} ms, within the {args.budget_ms:.0f} ms budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.db.database import Base, get_db
+from app.db.instrumentation import instrument_queries
+from app.db.database import Base, TracedAsyncSession, get_sessionmaker, replica_router
 from app.models.user import User
 from app.core.security import get_password_hash
+from app.core.throttle import login_throttle
+from app.core import cache, metrics, tracing
+from app.core.profiling import profile_store
+from app.core.config import settings
 
 # Use in-memory SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -15,6 +22,31 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The API uses the async driver against the same database file
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+instrument_queries(async_engine, "test")
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=TracedAsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_process_state():
+    """Reset in-process throttling state, caches and metrics between tests."""
+    login_throttle.clear()
+    cache.reset_all()
+    replica_router.clear()
+    metrics.reset_all()
+    tracing.memory_exporter.clear()
+    profile_store.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def disable_outbox_sender(monkeypatch):
+    """Don't start the background email sender; tests drive it explicitly."""
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_ENABLED", False)
+
 
 @pytest.fixture(scope="function")
 def db():
@@ -28,16 +60,17 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+async def async_db(db):
+    """Create an async session on the test database."""
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """Create a test client."""
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
-    
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_sessionmaker] = lambda: TestingAsyncSessionLocal
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -77,3 +110,15 @@ def authenticated_client(client, auth_token):
         yield client
     finally:
         client.headers = original_headers
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Check that a response was served within a budget of SQL statements."""
+    def check(response, budget):
+        count = int(response.headers["X-DB-Query-Count"])
+        assert count <= budget, (
+            f"{response.request.method} {response.request.url.path} issued {count} queries (budget {budget})"
+        )
+        return count
+    return check
@@ -0,0 +1,24 @@
+"""Index packages for per-user listing and status filters, built concurrently
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00
+"""
+from app.db.migration_utils import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_concurrently("idx_packages_user_created", "packages", ["user_id", "created_at"])
+    create_index_concurrently("idx_packages_user_status", "packages", ["user_id", "status"])
+
+
+def downgrade() -> None:
+    drop_index_concurrently("idx_packages_user_status", "packages")
+    drop_index_concurrently("idx_packages_user_created", "packages")
@@ -0,0 +1,36 @@
+"""Add the status_changes table for notification digests
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 11:30:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "status_changes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("package_id", sa.Integer(), nullable=False),
+        sa.Column("old_status", sa.String(length=100), nullable=True),
+        sa.Column("new_status", sa.String(length=100), nullable=False),
+        sa.Column("changed_at", sa.Float(), nullable=False),
+        sa.Column("notified_at", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["package_id"], ["packages.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_status_changes_pending", "status_changes", ["notified_at", "user_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("status_changes")
@@ -0,0 +1,30 @@
+"""Record when each package's tracking snapshot was fetched
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 15:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.db.migration_utils import batched_backfill
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("packages", sa.Column("tracking_updated_at", sa.DateTime(timezone=True), nullable=True))
+    # Existing snapshots were written by the last tracking request, which also set updated_at
+    batched_backfill(
+        "packages",
+        "tracking_updated_at = COALESCE(updated_at, created_at)",
+        "tracking_data IS NOT NULL AND tracking_updated_at IS NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("packages", "tracking_updated_at")
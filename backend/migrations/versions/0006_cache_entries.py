@@ -0,0 +1,34 @@
+"""Add the cache_entries table for the shared database cache backend
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # UNLOGGED skips the WAL: writes are cheap and the table is emptied after a
+    # crash, which is fine for a cache. It is also not replicated to standbys.
+    prefixes = ["UNLOGGED"] if op.get_bind().dialect.name == "postgresql" else []
+    op.create_table(
+        "cache_entries",
+        sa.Column("key", sa.String(length=512), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+        prefixes=prefixes,
+    )
+    op.create_index("idx_cache_entries_expires", "cache_entries", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("cache_entries")
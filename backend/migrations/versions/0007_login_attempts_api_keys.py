@@ -0,0 +1,55 @@
+"""Add the login_attempts and api_keys tables
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 09:00:00
+
+These tables used to be created by 0001, which databases from the old startup
+``create_all`` are stamped with, so such databases never got them. Tables
+that already exist (created by the earlier 0001) are left alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "login_attempts" not in existing:
+        op.create_table(
+            "login_attempts",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("key", sa.String(length=320), nullable=False),
+            sa.Column("attempted_at", sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("idx_login_attempt_key_time", "login_attempts", ["key", "attempted_at"])
+
+    if "api_keys" not in existing:
+        op.create_table(
+            "api_keys",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("prefix", sa.String(length=16), nullable=False),
+            sa.Column("key_hash", sa.String(length=64), nullable=False),
+            sa.Column("scopes", sa.String(length=100), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_api_keys_id", "api_keys", ["id"])
+        op.create_index("ix_api_keys_user_id", "api_keys", ["user_id"])
+        op.create_index("ix_api_keys_key_hash", "api_keys", ["key_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_table("api_keys")
+    op.drop_table("login_attempts")
@@ -0,0 +1 @@
+"""Development tools: upstream simulators and load generators."""
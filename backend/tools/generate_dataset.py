@@ -0,0 +1,260 @@
+"""Generate a large synthetic dataset for scaling tests.
+
+    cd backend
+    python -m tools.generate_dataset --users 500000 --packages-per-user 20 --seed 42
+
+Creates users and packages (with tracking histories in ``tracking_data``)
+through the ``User``/``Package`` tables. Carriers follow a skewed
+distribution over ``CARRIERS`` (a few national carriers dominate, with a
+long tail) and statuses follow a realistic mix, mostly delivered. The same
+seed and options always generate the same users and packages.
+
+Rows are streamed in batches: COPY on PostgreSQL (10M packages load in a few
+minutes), multi-row INSERTs elsewhere. Every user gets the password
+--password, hashed once, so load tests can log in as any of them
+(``<prefix>00000042``). Run ``alembic upgrade head`` on the target first;
+rerun with a different --prefix to add more users to a populated database.
+"""
+import argparse
+import bisect
+import csv
+import io
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from sqlalchemy import Table, create_engine, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.data.carriers import CARRIERS
+
+# Share of packages for the carriers most users ship with; the rest spread over all of CARRIERS
+POPULAR_CARRIERS = {
+    "spain_correos_es": 22, "gls": 14, "seur": 12, "dhlen": 10, "ups": 8, "mrw": 6, "fedex": 5,
+    "china_post": 4, "yunexpress": 4, "usps": 3, "4px": 2, "colissimo": 2, "deutsche_post": 2, "dhl_de": 2,
+}
+LONG_TAIL_SHARE = 4
+
+# (status, weight, number of history events); None means never tracked
+STATUSES = [
+    ("Delivered", 55, 7),
+    ("In Transit", 20, 4),
+    (None, 6, 0),
+    ("Pending", 6, 1),
+    ("Accepted", 5, 2),
+    ("Out for Delivery", 5, 6),
+    ("Exception", 2, 5),
+    ("Expired", 1, 3),
+]
+EVENTS = [
+    "Shipment information received",
+    "Accepted by carrier",
+    "Departed sorting facility",
+    "Arrived at sorting facility",
+    "In transit to destination",
+    "Out for delivery",
+    "Delivered",
+]
+LOCATIONS = ["Madrid", "Barcelona", "Valencia", "Sevilla", "Zaragoza", "Bilbao", "Leipzig", "Shenzhen", "Paris", "Lisboa"]
+DESCRIPTIONS = ["Shoes", "Books", "Phone case", "Headphones", "Groceries", "Clothes", "Toys", "Laptop", None, None]
+
+
+class DatasetGenerator:
+    """Deterministic row generator for users and their packages."""
+
+    def __init__(self, seed: int, packages_per_user: float, days: int, prefix: str, hashed_password: str,
+                 now: Optional[datetime] = None):
+        self.rng = random.Random(seed)
+        self.packages_per_user = packages_per_user
+        self.days = days
+        self.prefix = prefix
+        self.hashed_password = hashed_password
+        self.now = now or datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        carrier_ids = [carrier_id for carrier_id, _ in CARRIERS]
+        tail_weight = LONG_TAIL_SHARE / len(carrier_ids)
+        weights = {carrier_id: tail_weight for carrier_id in carrier_ids}
+        for carrier_id, weight in POPULAR_CARRIERS.items():
+            weights[carrier_id] = weights.get(carrier_id, 0) + weight
+        self.carriers = list(weights)
+        # Cumulative weights, searched with bisect: random.choices would rebuild them on every call
+        self.carrier_cum_weights = list(accumulate(weights.values()))
+        self.status_cum_weights = list(accumulate(weight for _, weight, _ in STATUSES))
+
+    def _pick(self, population: Sequence, cum_weights: List[float]):
+        return population[bisect.bisect(cum_weights, self.rng.random() * cum_weights[-1])]
+
+    def package_count(self) -> int:
+        # Geometric-ish spread: most users track a few packages, some track many
+        return int(self.rng.expovariate(1 / self.packages_per_user)) if self.packages_per_user else 0
+
+    def user(self, user_id: int, index: int) -> Dict[str, Any]:
+        username = f"{self.prefix}{index:08d}"
+        return {
+            "id": user_id,
+            "email": f"{username}@example.com",
+            "username": username,
+            "hashed_password": self.hashed_password,
+            "is_active": self.rng.random() > 0.02,
+            "created_at": self.now - timedelta(seconds=self.rng.randrange(self.days * 86400)),
+        }
+
+    def package(self, user_id: int, user_created_at: datetime, number: int) -> Dict[str, Any]:
+        carrier = self._pick(self.carriers, self.carrier_cum_weights)
+        status, _, events = self._pick(STATUSES, self.status_cum_weights)
+        age = (self.now - user_created_at).total_seconds()
+        created_at = user_created_at + timedelta(seconds=self.rng.random() * age)
+        tracking_number = f"{self.prefix.upper()}{user_id:09d}{number:04d}ES"
+
+        tracking_data = None
+        tracking_updated_at = None
+        last_location = None
+        if status is not None:
+            history = []
+            event_time = created_at
+            for description in EVENTS[:events]:
+                event_time += timedelta(hours=self.rng.uniform(2, 36))
+                location = self.rng.choice(LOCATIONS)
+                history.append({
+                    "status": description,
+                    "location": location,
+                    "timestamp": event_time.isoformat(" ", "seconds")[:19],
+                    "context": f"{description} [{location}]",
+                })
+            history.reverse()  # newest first, as stored by track_package
+            last_location = history[0]["location"] if history else None
+            # Stored the way track_package stores it: a JSON document serialized to a string
+            tracking_data = json.dumps({
+                "status": status, "location": last_location, "history": history, "error": None, "carrier": carrier,
+            })
+            tracking_updated_at = min(event_time, self.now)
+        return {
+            "user_id": user_id,
+            "tracking_number": tracking_number,
+            "carrier": carrier,
+            "description": self.rng.choice(DESCRIPTIONS),
+            "status": status,
+            "last_location": last_location,
+            "tracking_data": tracking_data,
+            "tracking_updated_at": tracking_updated_at,
+            "created_at": created_at,
+        }
+
+    def rows(self, first_user_id: int, users: int) -> Iterator[tuple]:
+        """Yield ``("user", row)`` and ``("package", row)`` in generation order."""
+        for index in range(users):
+            user = self.user(first_user_id + index, index)
+            yield "user", user
+            for number in range(self.package_count()):
+                yield "package", self.package(user["id"], user["created_at"], number)
+
+
+def _copy_value(column: str, value: Any) -> Any:
+    if value is None:
+        return ""  # an empty unquoted field is NULL in CSV COPY
+    if column == "tracking_data":
+        return json.dumps(value)  # the JSON document text, as SQLAlchemy's JSON type would bind it
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _copy(conn: Connection, table: Table, columns: Sequence[str], rows: List[Dict[str, Any]]) -> None:
+    """COPY ``rows`` into ``table`` through the raw psycopg2 connection."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(column, row[column]) for column in columns])
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def write_batch(conn: Connection, table: Table, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        _copy(conn, table, list(rows[0]), rows)
+    else:
+        conn.execute(table.insert(), rows)
+
+
+def generate(engine: Engine, users: int, packages_per_user: float, seed: int, batch_size: int = 10000,
+             days: int = 365, prefix: str = "gen", password: str = "dataset-password",
+             progress=None) -> Dict[str, int]:
+    """Insert ``users`` generated users and their packages; returns the row counts."""
+    from app.core.security import get_password_hash
+    from app.models.package import Package
+    from app.models.user import User
+
+    generator = DatasetGenerator(seed, packages_per_user, days, prefix, get_password_hash(password))
+    users_table, packages_table = User.__table__, Package.__table__
+    with engine.connect() as conn:
+        first_user_id = (conn.execute(select(func.max(users_table.c.id))).scalar() or 0) + 1
+
+    counts = {"users": 0, "packages": 0}
+    batches: Dict[str, List[Dict[str, Any]]] = {"user": [], "package": []}
+
+    def flush():
+        # Users first so every package's user exists; one transaction per batch
+        with engine.begin() as conn:
+            write_batch(conn, users_table, batches["user"])
+            write_batch(conn, packages_table, batches["package"])
+        counts["users"] += len(batches["user"])
+        counts["packages"] += len(batches["package"])
+        batches["user"], batches["package"] = [], []
+        if progress:
+            progress(counts)
+
+    for kind, row in generator.rows(first_user_id, users):
+        batches[kind].append(row)
+        if len(batches["user"]) + len(batches["package"]) >= batch_size:
+            flush()
+    flush()
+
+    if engine.dialect.name == "postgresql":
+        # User ids were assigned here, so move the sequence past them
+        with engine.begin() as conn:
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))"))
+    return counts
+
+
+def main(argv=None) -> int:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, required=True)
+    parser.add_argument("--packages-per-user", type=float, default=20.0, help="mean packages per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365, help="spread creation dates over this many days")
+    parser.add_argument("--prefix", default="gen", help="username prefix")
+    parser.add_argument("--password", default="dataset-password", help="password of every generated user")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per COPY / INSERT batch")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+
+    def progress(counts):
+        elapsed = time.perf_counter() - started
+        rows = counts["users"] + counts["packages"]
+        print(f"\r{counts['users']} users, {counts['packages']} packages ({rows / elapsed:,.0f} rows/s)", end="")
+
+    counts = generate(
+        engine, args.users, args.packages_per_user, args.seed, args.batch_size, args.days, args.prefix,
+        args.password, progress,
+    )
+    engine.dispose()
+    print(f"\nGenerated {counts['users']} users and {counts['packages']} packages "
+          f"in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+"""Local KeyDelivery (kd100) simulator for load tests, benchmarks and CI.
+
+Implements ``/api/v1/carriers/detect`` and ``/api/v1/tracking/realtime`` with
+the real signature check (``MD5(body + API-Key + secret)``), plus fault
+injection: a latency distribution, HTTP 500s, API-level error codes and a
+quota answering ``429`` once exceeded. Tracking histories are synthetic and
+deterministic per tracking number, and advance one event every
+``--step-seconds`` from the first time a number is tracked.
+
+    cd backend
+    python -m tools.kd100_simulator --port 8100 --latency lognormal:80,0.5 --error-rate 0.01
+
+and point the API at it::
+
+    KD100_DETECT_URL=http://localhost:8100/api/v1/carriers/detect
+    KD100_TRACK_URL=http://localhost:8100/api/v1/tracking/realtime
+    KD100_APIKEY=simulator KD100_SECRET=simulator
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.data.carriers import CARRIERS
+
+CARRIER_NAMES = dict(CARRIERS)
+LOCATIONS = ["Shenzhen", "Leipzig", "Madrid", "Barcelona", "Valencia", "Zaragoza", "Sevilla", "Bilbao"]
+
+# (order_status_code, description) of the events every synthetic parcel goes through
+TIMELINE = [
+    (1, "Shipment information received"),
+    (1, "Accepted by carrier"),
+    (2, "Departed sorting facility"),
+    (2, "Arrived at sorting facility"),
+    (2, "In transit to destination"),
+    (3, "Out for delivery"),
+    (4, "Delivered"),
+]
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """Build a sampler (seconds) from ``fixed:MS``, ``uniform:MIN,MAX``, ``normal:MEAN,SD`` or ``lognormal:MEDIAN,SIGMA``."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(*values) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, rng.gauss(*values)) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Invalid latency distribution: {spec!r}")
+
+
+def signature(body: bytes, api_key: str, secret: str) -> str:
+    return hashlib.md5(body + api_key.encode() + secret.encode()).hexdigest().upper()
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+class SimulatorConfig:
+    """Credentials and fault injection settings."""
+
+    def __init__(
+        self,
+        api_key: str = "simulator",
+        secret: str = "simulator",
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        api_error_rate: float = 0.0,
+        quota: int = 0,
+        quota_window: float = 1.0,
+        step_seconds: float = 3600.0,
+        seed: Optional[int] = None,
+    ):
+        self.api_key = api_key
+        self.secret = secret
+        self.rng = random.Random(seed)
+        self.latency = parse_latency(latency, self.rng)
+        self.error_rate = error_rate  # fraction answered with HTTP 500
+        self.api_error_rate = api_error_rate  # fraction answered with an API-level error code
+        self.quota = quota  # requests per quota_window before 429s (0 = unlimited)
+        self.quota_window = quota_window
+        self.step_seconds = step_seconds  # time between synthetic tracking events
+
+
+class Simulator:
+    """Request accounting, quota and synthetic histories shared by both endpoints."""
+
+    def __init__(self, config: SimulatorConfig, clock: Callable[[], float] = time.time):
+        self.config = config
+        self.clock = clock
+        self.stats: Counter = Counter()
+        self._first_seen: Dict[Tuple[str, str], float] = {}
+        self._recent: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def over_quota(self) -> bool:
+        if not self.config.quota:
+            return False
+        now = self.clock()
+        with self._lock:
+            while self._recent and self._recent[0] <= now - self.config.quota_window:
+                self._recent.popleft()
+            if len(self._recent) >= self.config.quota:
+                return True
+            self._recent.append(now)
+            return False
+
+    def detect(self, tracking_number: str) -> List[Dict[str, str]]:
+        """One or two plausible carriers, stable per tracking number."""
+        if tracking_number.upper().endswith("ES"):
+            candidates = ["spain_correos_es", "gls"]
+        else:
+            candidates = [CARRIERS[_digest(tracking_number) % len(CARRIERS)][0], "dhlen"]
+        count = 1 + _digest(tracking_number + "#") % 2
+        return [
+            {"carrier_id": carrier_id, "carrier_name": CARRIER_NAMES.get(carrier_id, carrier_id)}
+            for carrier_id in candidates[:count]
+        ]
+
+    def track(self, carrier_id: str, tracking_number: str) -> Dict:
+        """Synthetic history: parcels start at a stable offset and advance one event per step."""
+        now = self.clock()
+        with self._lock:
+            first_seen = self._first_seen.setdefault((carrier_id, tracking_number), now)
+        offset = _digest(tracking_number) % 3
+        progress = min(len(TIMELINE), offset + 1 + int((now - first_seen) // self.config.step_seconds))
+        items = []
+        for index in range(progress):
+            status_code, description = TIMELINE[index]
+            location = LOCATIONS[(_digest(tracking_number) + index) % len(LOCATIONS)]
+            event_time = first_seen - (offset - index) * self.config.step_seconds
+            items.append({
+                "time": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(event_time)),
+                "context": f"{description} [{location}]",
+                "location": location,
+                "order_status_description": description,
+                "order_status_code": status_code,
+            })
+        items.reverse()  # newest first, as kd100 returns them
+        return {
+            "carrier_id": carrier_id,
+            "tracking_number": tracking_number,
+            "order_status_code": items[0]["order_status_code"],
+            "items": items,
+        }
+
+
+def create_app(config: Optional[SimulatorConfig] = None, clock: Callable[[], float] = time.time) -> FastAPI:
+    simulator = Simulator(config or SimulatorConfig(), clock)
+    app = FastAPI(title="KeyDelivery simulator")
+    app.state.simulator = simulator
+
+    async def handle(request: Request, endpoint: str, respond: Callable[[Dict], Dict]) -> JSONResponse:
+        cfg = simulator.config
+        simulator.stats[f"{endpoint}_requests"] += 1
+        await asyncio.sleep(cfg.latency())
+
+        body = await request.body()
+        if request.headers.get("API-Key") != cfg.api_key or request.headers.get("signature") != signature(
+            body, cfg.api_key, cfg.secret
+        ):
+            simulator.stats["signature_errors"] += 1
+            return JSONResponse({"code": 401, "message": "Signature verification failed", "data": None})
+        if simulator.over_quota():
+            simulator.stats["quota_exceeded"] += 1
+            return JSONResponse({"code": 429, "message": "Too many requests"}, status_code=429)
+        if cfg.rng.random() < cfg.error_rate:
+            simulator.stats["server_errors"] += 1
+            return JSONResponse({"code": 500, "message": "Internal server error"}, status_code=500)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return JSONResponse({"code": 400, "message": "Invalid request body", "data": None})
+        if not payload.get("tracking_number"):
+            return JSONResponse({"code": 400, "message": "tracking_number is required", "data": None})
+        if cfg.rng.random() < cfg.api_error_rate:
+            simulator.stats["api_errors"] += 1
+            return JSONResponse({"code": 503, "message": "Carrier temporarily unavailable", "data": None})
+        return JSONResponse({"code": 200, "message": "success", "data": respond(payload)})
+
+    @app.post("/api/v1/carriers/detect")
+    async def detect(request: Request):
+        return await handle(request, "detect", lambda p: simulator.detect(p["tracking_number"]))
+
+    @app.post("/api/v1/tracking/realtime")
+    async def realtime(request: Request):
+        return await handle(
+            request, "track", lambda p: simulator.track(p.get("carrier_id") or "", p["tracking_number"])
+        )
+
+    @app.get("/__simulator/stats")
+    def stats():
+        return dict(simulator.stats)
+
+    return app
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--api-key", default="simulator")
+    parser.add_argument("--secret", default="simulator")
+    parser.add_argument("--latency", default="lognormal:80,0.5",
+                        help="fixed:MS, uniform:MIN,MAX, normal:MEAN,SD or lognormal:MEDIAN,SIGMA (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument("--api-error-rate", type=float, default=0.0, help="fraction of API-level errors")
+    parser.add_argument("--quota", type=int, default=0, help="requests per --quota-window before 429 (0 = off)")
+    parser.add_argument("--quota-window", type=float, default=1.0)
+    parser.add_argument("--step-seconds", type=float, default=3600.0, help="time between tracking events")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = SimulatorConfig(
+        api_key=args.api_key,
+        secret=args.secret,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        api_error_rate=args.api_error_rate,
+        quota=args.quota,
+        quota_window=args.quota_window,
+        step_seconds=args.step_seconds,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
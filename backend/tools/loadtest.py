@@ -0,0 +1,307 @@
+"""Multi-user load test against a running backend.
+
+    python -m tools.kd100_simulator --port 8100          # upstream (see README)
+    uvicorn app.main:app --workers 1 --port 8000         # the node under test
+    python -m tools.loadtest --base-url http://localhost:8000 --users 50 --rates 10,25,50,100,200
+
+Registers and logs in --users synthetic users and seeds --packages-per-user
+packages for each through the bulk import endpoint. Then, for each rate in
+--rates (user actions per second), actions are started at a fixed interval
+for --stage-seconds whether or not earlier ones finished (open loop), so a
+saturated node shows up as growing latency instead of a slower load
+generator. The action mix defaults to dashboard loads, detail views that also
+hit ``/track``, creates and deletes (--mix).
+
+Per stage and endpoint the p50/p95/p99 latency, error rate and throughput
+are reported. An endpoint saturates at the first stage where its p95 exceeds
+--slo-ms or its error rate exceeds --max-error-rate; the node saturates when
+it cannot keep up with the offered rate (actions dropped at --max-in-flight,
+or under 90% of the offered rate completed).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from benchmarks import report
+
+DEFAULT_MIX = "dashboard=60,detail=25,create=10,delete=5"
+ACTIONS = ("dashboard", "detail", "create", "delete")
+CARRIERS = ("gls", "spain_correos_es", "dhlen")
+PASSWORD = "loadtestpassword123"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse ``action=weight,...`` into normalized weights."""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise ValueError(f"Unknown action {name!r}; expected one of {', '.join(ACTIONS)}")
+        weights[name] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The action mix needs a positive weight")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+class VirtualUser:
+    """A synthetic account with its token and known package ids."""
+
+    def __init__(self, username: str):
+        self.username = username
+        self.headers: Dict[str, str] = {}
+        self.package_ids: List[int] = []
+
+
+class StageStats:
+    """Latencies and errors per endpoint for one stage."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = 0
+        self.completed = 0
+        self.dropped = 0
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self) -> Dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(latencies), 4),
+                "p50_ms": round(report.percentile(latencies, 50) * 1000, 3),
+                "p95_ms": round(report.percentile(latencies, 95) * 1000, 3),
+                "p99_ms": round(report.percentile(latencies, 99) * 1000, 3),
+                "throughput_rps": round(len(latencies) / self.elapsed, 2) if self.elapsed else 0.0,
+            }
+        return {
+            "offered_rate": self.rate,
+            "achieved_rate": round(self.completed / self.elapsed, 2) if self.elapsed else 0.0,
+            "actions_started": self.started,
+            "actions_dropped": self.dropped,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "endpoints": endpoints,
+        }
+
+
+async def _request(client, stats: Optional[StageStats], endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception:
+        if stats is not None:
+            stats.record(endpoint, time.perf_counter() - started, ok=False)
+        return None
+    if stats is not None:
+        stats.record(endpoint, time.perf_counter() - started, ok=response.status_code < 400)
+    return response
+
+
+async def setup_users(client, count: int, packages_per_user: int, concurrency: int) -> List[VirtualUser]:
+    """Register, log in and seed ``count`` users; bcrypt makes this the slow part."""
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def setup(index: int) -> VirtualUser:
+        user = VirtualUser(f"lt{run_id}_{index}")
+        async with semaphore:
+            response = await client.post("/api/auth/register", json={
+                "email": f"{user.username}@loadtest.example.com",
+                "username": user.username,
+                "password": PASSWORD,
+            })
+            response.raise_for_status()
+            response = await client.post("/api/auth/login", data={"username": user.username, "password": PASSWORD})
+            response.raise_for_status()
+            user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            if packages_per_user:
+                body = "".join(
+                    json.dumps({
+                        "tracking_number": f"LT{run_id.upper()}{index:05d}{i:04d}ES",
+                        "carrier": CARRIERS[i % len(CARRIERS)],
+                        "description": f"Load test package {i}",
+                    }) + "\n"
+                    for i in range(packages_per_user)
+                )
+                response = await client.post(
+                    "/api/packages/import", content=body,
+                    headers={**user.headers, "Content-Type": "application/x-ndjson"},
+                )
+                response.raise_for_status()
+            response = await client.get("/api/packages/", params={"limit": 1000}, headers=user.headers)
+            response.raise_for_status()
+            user.package_ids = [package["id"] for package in response.json()]
+        return user
+
+    return list(await asyncio.gather(*(setup(i) for i in range(count))))
+
+
+async def run_action(client, stats: StageStats, user: VirtualUser, action: str, rng: random.Random) -> None:
+    headers = user.headers
+    if action == "delete" and len(user.package_ids) <= 1:
+        action = "create"  # keep a package around for detail views
+    if action == "detail" and not user.package_ids:
+        action = "dashboard"
+
+    if action == "dashboard":
+        await _request(client, stats, "GET /api/packages/", "GET", "/api/packages/", headers=headers)
+    elif action == "detail":
+        package_id = rng.choice(user.package_ids)
+        await _request(client, stats, "GET /api/packages/{id}", "GET", f"/api/packages/{package_id}", headers=headers)
+        await _request(
+            client, stats, "GET /api/packages/{id}/track", "GET", f"/api/packages/{package_id}/track", headers=headers
+        )
+    elif action == "create":
+        response = await _request(client, stats, "POST /api/packages/", "POST", "/api/packages/", headers=headers, json={
+            "tracking_number": f"LT{uuid.uuid4().hex[:12].upper()}ES",
+            "carrier": rng.choice(CARRIERS),
+            "description": "Load test package",
+        })
+        if response is not None and response.status_code == 201:
+            user.package_ids.append(response.json()["id"])
+    else:
+        package_id = user.package_ids.pop(rng.randrange(len(user.package_ids)))
+        await _request(client, stats, "DELETE /api/packages/{id}", "DELETE", f"/api/packages/{package_id}", headers=headers)
+    stats.completed += 1
+
+
+async def run_stage(
+    client, users: List[VirtualUser], mix: Dict[str, float], rate: float, duration: float,
+    max_in_flight: int, rng: random.Random,
+) -> StageStats:
+    """Start actions at ``rate`` per second for ``duration`` seconds and wait for them to finish."""
+    stats = StageStats(rate)
+    actions, weights = list(mix), list(mix.values())
+    in_flight = set()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    next_at = started
+    while next_at < started + duration:
+        delay = next_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_at += 1 / rate
+        if len(in_flight) >= max_in_flight:
+            stats.dropped += 1
+            continue
+        action = rng.choices(actions, weights)[0]
+        task = asyncio.create_task(run_action(client, stats, rng.choice(users), action, rng))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        stats.started += 1
+    await asyncio.gather(*in_flight)
+    stats.elapsed = loop.time() - started
+    return stats
+
+
+def find_saturation(stages: List[Dict], slo_ms: float, max_error_rate: float) -> Dict:
+    """First offered rate at which each endpoint, and the node as a whole, saturated."""
+    endpoints: Dict[str, Optional[float]] = {}
+    node = None
+    sustained = None
+    for stage in stages:
+        for endpoint, result in stage["endpoints"].items():
+            endpoints.setdefault(endpoint, None)
+            if endpoints[endpoint] is None and (result["p95_ms"] > slo_ms or result["error_rate"] > max_error_rate):
+                endpoints[endpoint] = stage["offered_rate"]
+        overloaded = stage["actions_dropped"] > 0 or stage["achieved_rate"] < 0.9 * stage["offered_rate"]
+        if node is None and overloaded:
+            node = stage["offered_rate"]
+        if node is None and all(v is None for v in endpoints.values()):
+            sustained = stage["offered_rate"]
+    return {"endpoints": endpoints, "node": node, "max_sustained_rate": sustained}
+
+
+async def run_load_test(args, transport=None) -> Dict:
+    import httpx
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, transport=transport, limits=limits, timeout=args.timeout
+    ) as client:
+        print(f"Setting up {args.users} users with {args.packages_per_user} packages each")
+        users = await setup_users(client, args.users, args.packages_per_user, args.setup_concurrency)
+        stages = []
+        for rate in args.rates:
+            stats = await run_stage(client, users, mix, rate, args.stage_seconds, args.max_in_flight, rng)
+            summary = stats.summary()
+            stages.append(summary)
+            print(
+                f"\n{rate:g} actions/s offered, {summary['achieved_rate']:g} achieved, "
+                f"{summary['actions_dropped']} dropped"
+            )
+            for endpoint, result in summary["endpoints"].items():
+                print(
+                    f"  {endpoint:<30} p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                    f"p99 {result['p99_ms']:>8.1f} ms  {result['throughput_rps']:>7.1f} req/s  "
+                    f"errors {result['error_rate']:.1%}"
+                )
+    saturation = find_saturation(stages, args.slo_ms, args.max_error_rate)
+    return {
+        "config": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "packages_per_user": args.packages_per_user,
+            "mix": mix,
+            "stage_seconds": args.stage_seconds,
+            "slo_ms": args.slo_ms,
+            "max_error_rate": args.max_error_rate,
+        },
+        "stages": stages,
+        "saturation": saturation,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--packages-per-user", type=int, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="action weights (dashboard, detail, create, delete)")
+    parser.add_argument("--rates", type=lambda s: [float(r) for r in s.split(",")], default=[5, 10, 25, 50, 100],
+                        help="comma-separated actions per second, one stage each")
+    parser.add_argument("--stage-seconds", type=float, default=30.0)
+    parser.add_argument("--max-in-flight", type=int, default=200, help="actions in flight before new ones are dropped")
+    parser.add_argument("--setup-concurrency", type=int, default=8)
+    parser.add_argument("--slo-ms", type=float, default=500.0, help="p95 latency objective per endpoint")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default="loadtest-results.json")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    results = asyncio.run(run_load_test(args))
+    report.write(args.output, results)
+
+    saturation = results["saturation"]
+    print()
+    for endpoint, rate in saturation["endpoints"].items():
+        print(f"{endpoint:<32} {'saturated at %g actions/s' % rate if rate is not None else 'within SLO'}")
+    if saturation["node"] is not None:
+        print(f"Node could not keep up at {saturation['node']:g} actions/s")
+    print(f"Highest rate within SLO: {saturation['max_sustained_rate']}")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
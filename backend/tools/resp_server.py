@@ -0,0 +1,149 @@
+"""Minimal in-memory server speaking the Redis protocol, for local runs and tests.
+
+Stands in for Redis behind ``CACHE_BACKEND=redis``. It implements just what
+the cache client uses: PING, AUTH, SELECT, GET, SET (with EX/PX), DEL, SCAN
+(MATCH/COUNT), DBSIZE and FLUSHDB. Keys live in one process-wide dict, so
+it is only a stand-in: no persistence, no eviction beyond TTLs.
+
+    cd backend
+    python -m tools.resp_server --port 6379
+
+and point the API at it::
+
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import fnmatch
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class RespStore:
+    """Keys with optional absolute expiry times."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes]) -> object:
+        self.commands += 1
+        command = args[0].upper().decode()
+        if command == "PING":
+            return "PONG"
+        if command in ("AUTH", "SELECT"):
+            return "OK"
+        if command == "GET":
+            return self._live(args[1])
+        if command == "SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[3:]]
+            for option, value in zip(options, args[4:]):
+                if option == b"EX":
+                    expires_at = self.clock() + int(value)
+                elif option == b"PX":
+                    expires_at = self.clock() + int(value) / 1000
+            self.data[args[1]] = (args[2], expires_at)
+            return "OK"
+        if command == "DEL":
+            deleted = 0
+            for key in args[1:]:
+                if self._live(key) is not None:
+                    del self.data[key]
+                    deleted += 1
+            return deleted
+        if command == "SCAN":
+            pattern = b"*"
+            for option, value in zip(args[2:], args[3:]):
+                if option.upper() == b"MATCH":
+                    pattern = value
+            keys = [key for key in list(self.data) if self._live(key) is not None and fnmatch.fnmatchcase(
+                key.decode("latin-1"), pattern.decode("latin-1"))]
+            return [b"0", keys]  # everything in one pass
+        if command == "DBSIZE":
+            return len(self.data)
+        if command == "FLUSHDB":
+            self.data.clear()
+            return "OK"
+        return Exception(f"ERR unknown command '{command}'")
+
+
+def _encode(reply: object) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command, e.g. from telnet
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def start_server(host: str = "127.0.0.1", port: int = 0, store: Optional[RespStore] = None):
+    """Start serving; returns the ``asyncio`` server (its port via ``server.sockets[0].getsockname()``)."""
+    store = store or RespStore()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await _read_command(reader)
+                if not args:
+                    break
+                writer.write(_encode(store.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    server.store = store
+    return server
+
+
+async def serve(host: str, port: int) -> None:
+    server = await start_server(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()